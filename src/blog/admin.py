@@ -7,9 +7,11 @@
 #       fecha: sábado, 29 de agosto de 2015
 
 # Modulo de administración
+from django.conf import settings
 from django.contrib import admin
 
 # Módulos de la aplicación
+from . import search
 from .models import Entry, Category
 
 
@@ -17,14 +19,21 @@ class EntryAdmin(admin.ModelAdmin):     # pylint: disable=R0904
     prepopulated_fields = {"slug": ("title",)}
     search_fields = ["title"]
     date_hierarchy = 'pub_date'
-    list_display = ('title', 'category', 'pub_date')
+    list_display = ('title', 'category', 'pub_date', 'rendering')
     list_filter = ('category', 'status')
     list_select_related = ('category',)
     icon = '<i class="material-icons">pages</i>'
 
     def save_model(self, request, obj, form, change):
         obj.author = request.user
-        obj.save()
+        # With the queue the Markdown is rendered by `manage.py run_jobs`.
+        obj.save(render=not settings.BLOG_RENDER_QUEUE)
+
+    def get_search_results(self, request, queryset, search_term):
+        # The search index instead of an unindexed icontains over the title.
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=search.matching(search_term)), False
 
 
 class CategoryAdmin (admin.ModelAdmin):   # pylint: disable=R0904
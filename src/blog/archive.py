@@ -0,0 +1,103 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.archive
+# description: Year and month index of the archive, with cached month lists
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import hashlib
+from collections import Counter
+from datetime import datetime
+
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .cache import archive_tag, generations, lookup, store
+from .models import ArchiveMonth, Entry
+
+FRAGMENT_PREFIX = 'blog:archive:'
+FRAGMENT_TEMPLATE = 'partials/_archive_month.html'
+
+
+def month_of(pub_date) -> tuple:
+    published = timezone.localtime(pub_date)
+    return published.year, published.month
+
+
+def month_range(year: int, month: int) -> tuple:
+    start = timezone.make_aware(datetime(year, month, 1))
+    end = timezone.make_aware(datetime(year + month // 12, month % 12 + 1, 1))
+    return start, end
+
+
+def is_closed(year: int, month: int) -> bool:
+    """ Past months only change when an old entry is edited. """
+    now = timezone.localtime()
+    return (year, month) < (now.year, now.month)
+
+
+def month_entries(year: int, month: int):
+    start, end = month_range(year, month)
+    return Entry.objects\
+        .filter(status=Entry.LIVE_STATUS, pub_date__gte=start, pub_date__lt=end)\
+        .select_related('category')\
+        .only('title', 'slug', 'pub_date', 'category__slug', 'category__icon')\
+        .order_by('-pub_date', '-id')
+
+
+def recount(year: int, month: int) -> None:
+    start, end = month_range(year, month)
+    count = Entry.objects.filter(status=Entry.LIVE_STATUS, pub_date__gte=start, pub_date__lt=end).count()
+    if count:
+        ArchiveMonth.objects.update_or_create(year=year, month=month, defaults={'count': count})
+    else:
+        ArchiveMonth.objects.filter(year=year, month=month).delete()
+
+
+def entry_changed(*entries) -> set:
+    """ Recounts the months of ``entries``, returns them. """
+    months = {month_of(entry.pub_date) for entry in entries if entry is not None}
+    for year, month in months:
+        recount(year, month)
+    return months
+
+
+def rebuild() -> int:
+    """ Recomputes the whole index in one pass, returns the number of months. """
+    dates = Entry.objects.filter(status=Entry.LIVE_STATUS).values_list('pub_date', flat=True)
+    counts = Counter(month_of(pub_date) for pub_date in dates.iterator())
+    stale = [
+        pk for pk, year, month in ArchiveMonth.objects.values_list('pk', 'year', 'month')
+        if (year, month) not in counts
+    ]
+    ArchiveMonth.objects.filter(pk__in=stale).delete()
+    for (year, month), count in counts.items():
+        ArchiveMonth.objects.update_or_create(year=year, month=month, defaults={'count': count})
+    return len(counts)
+
+
+def years() -> list:
+    """ ``(year, total, months)`` from the newest year, in one query. """
+    index = {}
+    for month in ArchiveMonth.objects.all():
+        index.setdefault(month.year, []).append(month)
+    return [(year, sum(month.count for month in months), months) for year, months in index.items()]
+
+
+def fragment(year: int, month: int) -> str:
+    """
+    The rendered entry list of a month. Closed months are rendered once and
+    cached until one of their entries or a category changes, only the
+    current month is rendered on every request.
+    """
+    if not is_closed(year, month):
+        return render_to_string(FRAGMENT_TEMPLATE, {'entries': month_entries(year, month)})
+    key = FRAGMENT_PREFIX + hashlib.md5(f'{year}-{month}'.encode('utf-8')).hexdigest()
+    current = generations((archive_tag(year, month), 'categories'))
+    html = lookup(key, current)
+    if html is None:
+        html = render_to_string(FRAGMENT_TEMPLATE, {'entries': month_entries(year, month)})
+        store(key, current, html)
+    return html
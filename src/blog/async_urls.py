@@ -0,0 +1,26 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.async_urls
+# description: The blog URL patterns with the async views, see blogApp.async_urls
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+from django.urls import path
+
+from . import async_views
+from .urls import urlpatterns as sync_urlpatterns
+
+ASYNC_VIEWS = {
+    'index': async_views.BlogIndex,
+    'category': async_views.CategoryDetail,
+    'entry': async_views.EntryDetail,
+    'sitemap': async_views.Archivo,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name].as_view(), name=pattern.name)
+    if getattr(pattern, 'name', None) in ASYNC_VIEWS else pattern
+    for pattern in sync_urlpatterns
+]
@@ -0,0 +1,101 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.async_views
+# description: Async versions of the busiest public views, served under ASGI
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import asyncio
+import inspect
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.utils.decorators import method_decorator
+
+from . import archive, homepage, models, related, views
+from .cache import AsyncCachedResponseMixin
+from .context_processors import category_snapshot
+from .instrumentation import query_budget
+from .validators import category_state, conditional, entries_state, entry_state
+
+# Each view subclasses its sync twin for the templates, querysets, cache tags
+# and pagination, and only replaces ``get()``. The context queries that don't
+# depend on each other are awaited together. Django runs the sync code of a
+# request, the ORM included, on one thread, so they still take turns on its
+# connection: what the async views buy is a worker that serves other
+# requests while one waits, not parallel queries.
+
+
+def gather(*calls):
+    """ Awaits the coroutines and the sync callables in ``calls`` together. """
+    return asyncio.gather(*(
+        call if inspect.isawaitable(call) else sync_to_async(call)() for call in calls
+    ))
+
+
+async def _all(queryset) -> list:
+    return [obj async for obj in queryset]
+
+
+@query_budget(8)
+@method_decorator(conditional(entries_state), name='dispatch')
+class BlogIndex(AsyncCachedResponseMixin, views.BlogIndex):
+    async def get(self, request, *args, **kwargs):
+        self.object_list = homepage.list_queryset()
+        context, slots, categories = await gather(
+            # The list below the first four, paginated like the sync view.
+            super(views.BlogIndex, self).get_context_data,
+            homepage.build,
+            category_snapshot,
+        )
+        context.update(
+            sticky=slots['sticky'], primeros=slots['primeros'], featured=slots['featured'], categories=categories
+        )
+        return self.render_to_response(context)
+
+
+@query_budget(8)
+@method_decorator(conditional(category_state), name='dispatch')
+class CategoryDetail(AsyncCachedResponseMixin, views.CategoryDetail):
+    async def get(self, request, *args, **kwargs):
+        # A missing category is a 404 before any list query.
+        category = await models.Category.objects.filter(slug=self.kwargs['slug']).afirst()
+        if category is None:
+            raise Http404(f"No category {self.kwargs['slug']}")
+        self.object_list = self.get_queryset()
+        context, featured, categories = await gather(
+            super(views.CategoryDetail, self).get_context_data,
+            _all(self.get_featured()),
+            category_snapshot,
+        )
+        context.update(featured=featured, category=category, categories=categories)
+        return self.render_to_response(context)
+
+
+@query_budget(7)
+@method_decorator(conditional(entry_state), name='dispatch')
+class EntryDetail(AsyncCachedResponseMixin, views.EntryDetail):
+    async def get(self, request, *args, **kwargs):
+        try:
+            self.object = await self.get_queryset().aget(slug=self.kwargs['slug'])
+        except models.Entry.DoesNotExist:
+            raise Http404(f"No entry {self.kwargs['slug']}")
+        entries, categories = await gather(partial(related.for_entry, self.object), category_snapshot)
+        context = super(views.EntryDetail, self).get_context_data(
+            object=self.object, related=entries, categories=categories
+        )
+        return self.render_to_response(context)
+
+
+@query_budget(5)
+@method_decorator(conditional(entries_state), name='dispatch')
+class Archivo(AsyncCachedResponseMixin, views.Archivo):
+    async def get(self, request, *args, **kwargs):
+        cats, years, categories = await gather(
+            _all(models.Category.objects.all()), archive.years, category_snapshot
+        )
+        context = super(views.Archivo, self).get_context_data(cats=cats, years=years, categories=categories, **kwargs)
+        return self.render_to_response(context)
@@ -0,0 +1,9 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.benchmarks
+# description: Synthetic corpora and timings of the public views
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
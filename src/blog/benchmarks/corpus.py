@@ -0,0 +1,148 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.benchmarks.corpus
+# description: Generates a reproducible synthetic corpus of entries
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import random
+from datetime import datetime, timedelta
+
+import pytz
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import transaction
+from django.utils.text import slugify
+from taggit.models import Tag, TaggedItem
+
+from .. import archive, neighbours, related, search, tagstats
+from ..models import Category, Entry
+
+SIZES = {'1k': 1_000, '10k': 10_000, '100k': 100_000}
+AUTHOR = 'benchmark@example.com'
+# The corpus ends here, so the same seed always gives the same dates.
+LAST_DATE = datetime(2026, 1, 1, 12, tzinfo=pytz.UTC)
+YEARS = 15
+
+CATEGORIES = (
+    ('Python', 'python'), ('Django', 'code'), ('JavaScript', 'js'), ('Bases de datos', 'database'),
+    ('Linux', 'linux'), ('Redes', 'network-wired'), ('Seguridad', 'shield'), ('Herramientas', 'wrench'),
+    ('Estadística', 'chart-line'), ('Opinión', 'comment'), ('Tutoriales', 'book'), ('Noticias', 'newspaper'),
+)
+WORDS = '''
+    servidor consulta índice caché plantilla modelo vista función clase módulo paquete proceso memoria
+    disco red protocolo cliente petición respuesta error prueba despliegue versión rama commit registro
+    usuario sesión formulario campo tabla columna fila transacción bloqueo archivo directorio ruta enlace
+    página sitio diseño estilo imagen documento texto búsqueda resultado rendimiento latencia carga hilo
+    cola tarea evento señal configuración entorno variable contenedor imagen volumen puerto dominio
+    certificado llave algoritmo estructura lista diccionario conjunto árbol grafo nodo arista peso costo
+'''.split()
+TAGS = [f'{a}-{b}' for a in WORDS[:30] for b in ('python', 'django', 'sql', 'web', 'linux')]
+CODE = {
+    'python': 'def {name}({arg}):\n    """ {text} """\n    return [x * 2 for x in {arg} if x]\n',
+    'javascript': 'const {name} = ({arg}) => {{\n  // {text}\n  return {arg}.map((x) => x * 2);\n}};\n',
+    'bash': '#!/bin/bash\n# {text}\nfor f in /var/log/{name}/*.log; do\n  gzip "$f"\ndone\n',
+    'sql': '-- {text}\nSELECT {arg}, count(*)\nFROM {name}\nGROUP BY {arg}\nORDER BY 2 DESC;\n',
+}
+
+
+def sentence(rng, words=12) -> str:
+    text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(words // 2, words * 2)))
+    return text[0].upper() + text[1:] + '.'
+
+
+def paragraph(rng) -> str:
+    return ' '.join(sentence(rng) for _ in range(rng.randint(2, 6)))
+
+
+def code_block(rng) -> str:
+    language = rng.choice(list(CODE))
+    code = CODE[language].format(name=rng.choice(WORDS[:40]), arg=rng.choice(WORDS[40:]), text=sentence(rng, 6))
+    return f'```{language}\n{code}```'
+
+
+def body(rng) -> str:
+    """ Markdown with headings, paragraphs, lists, links and code blocks. """
+    blocks = [paragraph(rng)]
+    for _ in range(rng.randint(1, 5)):
+        blocks.append(f'## {sentence(rng, 4)[:-1]}')
+        blocks.append(paragraph(rng))
+        kind = rng.random()
+        if kind < 0.5:
+            blocks.append(code_block(rng))
+        elif kind < 0.7:
+            blocks.append('\n'.join(f'* {sentence(rng, 5)}' for _ in range(rng.randint(2, 6))))
+        elif kind < 0.8:
+            blocks.append(f'Más en [la documentación](https://example.com/{rng.choice(WORDS)}).')
+    return '\n\n'.join(blocks)
+
+
+def entry(rng, n, categories, author) -> Entry:
+    title = sentence(rng, 4)[:-1]
+    status = rng.choices(
+        (Entry.LIVE_STATUS, Entry.DRAFT_STATUS, Entry.HIDDEN_STATUS), weights=(90, 7, 3)
+    )[0]
+    return Entry(
+        title=title,
+        slug=f'{slugify(title)[:40]}-{n}',
+        summary=paragraph(rng) if rng.random() < 0.3 else '',
+        body=body(rng),
+        extend=paragraph(rng) if rng.random() < 0.1 else '',
+        pub_date=LAST_DATE - timedelta(seconds=rng.randrange(YEARS * 365 * 24 * 3600)),
+        status=status,
+        featured=rng.random() < 0.02,
+        category=rng.choice(categories),
+        author=author,
+    )
+
+
+def clear() -> None:
+    """ Removes every entry and category, with everything derived from them. """
+    with transaction.atomic():
+        TaggedItem.objects.filter(content_type=ContentType.objects.get_for_model(Entry)).delete()
+        Entry.objects.all().delete()
+        Category.objects.all().delete()
+
+
+def generate(size: int, seed: int = 0, workers: int = 1, chunk_size: int = 1000, stdout=None) -> None:
+    """
+    Writes ``size`` entries with the same shape as the real ones. Rows are
+    inserted in bulk, without the save signals, and the derived data is
+    built afterwards by the same code the bulk commands use.
+    """
+    rng = random.Random(seed)
+    author, _ = get_user_model().objects.get_or_create(email=AUTHOR)
+    categories = [
+        Category.objects.create(name=name, slug=slugify(name), icon=icon, description=paragraph(rng))
+        for name, icon in CATEGORIES
+    ]
+    Tag.objects.bulk_create([Tag(name=name, slug=name) for name in TAGS], ignore_conflicts=True)
+    tags = list(Tag.objects.filter(name__in=TAGS).order_by('pk'))
+    # Few tags are on many entries, most are on a few.
+    tag_weights = [1 / (rank + 1) for rank in range(len(tags))]
+    content_type = ContentType.objects.get_for_model(Entry)
+
+    for start in range(0, size, chunk_size):
+        with transaction.atomic():
+            chunk = [
+                (entry(rng, n, categories, author), set(rng.choices(tags, tag_weights, k=rng.randint(1, 5))))
+                for n in range(start, min(start + chunk_size, size))
+            ]
+            entries = Entry.objects.bulk_create([created for created, _ in chunk])
+            TaggedItem.objects.bulk_create([
+                TaggedItem(content_type=content_type, object_id=created.pk, tag=tag)
+                for created, entry_tags in chunk
+                for tag in entry_tags
+            ])
+        if stdout is not None:
+            stdout.write(f'{start + len(entries)} of {size} entries inserted')
+
+    call_command('rerender_entries', force=True, workers=workers, stdout=stdout)
+    neighbours.rebuild(Entry)
+    archive.rebuild()
+    tagstats.rebuild()
+    search.rebuild()
+    related.build()
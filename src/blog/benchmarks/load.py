@@ -0,0 +1,126 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.benchmarks.load
+# description: Bursts of concurrent requests against the sync and async views
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import asyncio
+import queue
+import threading
+import time
+
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from ..cache import get_cache
+from .runner import PERCENTILES, percentile, scenarios
+
+# The scenarios served by the views that have an async version.
+SCENARIOS = ('index', 'index_deep', 'category', 'category_deep', 'entry', 'archive')
+ASYNC_URLCONF = 'blogApp.async_urls'
+
+
+def targets(sample=20) -> list:
+    """ The URLs of the load, for the corpus in the database. """
+    return [url for scenario in scenarios(sample) if scenario.name in SCENARIOS for url in scenario.targets]
+
+
+def _check(url, response):
+    if response.status_code != 200:
+        raise RuntimeError(f'{url} answered {response.status_code}')
+
+
+def _workers(target, args_of) -> None:
+    """ Runs ``target`` on a thread per worker, re-raises the first error. """
+    errors = []
+
+    def work(*args):
+        try:
+            target(*args)
+        except Exception as e:  # pylint: disable=W0703
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=work, args=args) for args in args_of]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def sync_burst(urls, workers) -> list:
+    """
+    Every request of ``urls`` arrives at once and ``workers`` sync workers,
+    like the gunicorn ones, take them one at a time. Returns the seconds from
+    the arrival of the burst to each response.
+    """
+    pending, latencies = queue.SimpleQueue(), []
+    for url in urls:
+        pending.put(url)
+    started = time.perf_counter()
+
+    def serve():
+        client = Client()
+        while True:
+            try:
+                url = pending.get_nowait()
+            except queue.Empty:
+                return
+            _check(url, client.get(url))
+            latencies.append(time.perf_counter() - started)
+
+    _workers(serve, [()] * workers)
+    return latencies
+
+
+def async_burst(urls, workers) -> list:
+    """
+    The same burst served by the async views, each worker an event loop
+    that takes every request it is given at once, like an ASGI worker.
+    """
+    latencies = []
+    started = time.perf_counter()
+
+    async def serve(assigned):
+        client = AsyncClient()
+
+        async def one(url):
+            _check(url, await client.get(url))
+            latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(one(url) for url in assigned))
+
+    with override_settings(ROOT_URLCONF=ASYNC_URLCONF):
+        _workers(lambda assigned: asyncio.run(serve(assigned)), [(urls[n::workers],) for n in range(workers)])
+    return latencies
+
+
+def run(requests=300, concurrency=30, workers=3, warm=False, sample=20) -> dict:
+    """
+    Sends ``requests`` in bursts of ``concurrency`` to the sync and to the
+    async views, with cold caches before every burst unless ``warm``.
+    Returns ``{'sync'|'async': {'rps': n, 'p50': ms, 'p90': ms, 'p99': ms}}``.
+    """
+    urls = targets(sample)
+    load = [urls[n % len(urls)] for n in range(requests)]
+    results = {}
+    for name, burst in (('sync', sync_burst), ('async', async_burst)):
+        latencies, elapsed = [], 0.0
+        for start in range(0, len(load), concurrency):
+            if not warm:
+                get_cache().clear()
+            started = time.perf_counter()
+            latencies.extend(burst(load[start:start + concurrency], workers))
+            elapsed += time.perf_counter() - started
+        results[name] = {
+            'rps': round(len(latencies) / elapsed, 1),
+            **{f'p{p}': round(percentile(latencies, p) * 1000, 2) for p in PERCENTILES},
+        }
+    return results
@@ -0,0 +1,87 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.benchmarks.plans
+# description: EXPLAIN of the hot queries, flags scans and sorts
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import re
+
+from django.db import connection
+from django.db.models import Count, Q
+
+from .. import archive, homepage
+from ..models import Category, Entry
+from ..pagination import after
+from ..sitemaps import segment_rows
+from ..views import CategoryDetail
+
+
+def hot_queries() -> dict:
+    """
+    The queries the public views run on every cache miss, built by the views
+    themselves, for the corpus in the database. Aggregates over every entry,
+    like the sitemap index, read the whole table by design and are cached.
+    """
+    live = Entry.objects.filter(status=Entry.LIVE_STATUS)
+    middle = live.order_by('pk')[live.count() // 2]
+    category = Category.objects\
+        .annotate(total=Count('entry_category', filter=Q(entry_category__status=Entry.LIVE_STATUS)))\
+        .order_by('-total')\
+        .first()
+    per_page = CategoryDetail.paginate_by
+    # The key of one of the last pages.
+    deep = live.filter(category=category).order_by('pub_date', 'id').values_list('pub_date', 'id')[min(per_page, category.total - 1)]
+    view = CategoryDetail(kwargs={'slug': category.slug})
+    published = middle.pub_date
+    featured, first = homepage.slots_querysets()
+    return {
+        'index': homepage.list_queryset()[:homepage.PAGE_SIZE],
+        'index_deep': homepage.list_queryset().filter(after((published, middle.pk)))[:homepage.PAGE_SIZE],
+        'index_featured': featured,
+        'index_first': first,
+        'category': view.get_queryset()[:per_page],
+        'category_deep': view.get_queryset().filter(after(deep))[:per_page],
+        'featured_sidebar': view.get_featured(),
+        'archive_month': archive.month_entries(*archive.month_of(published)),
+        'sitemap_segment': segment_rows(published.year),
+    }
+
+
+# Per database vendor, the plan lines of a scan of the entries table and of a sort.
+PATTERNS = {
+    'sqlite': (r'\bSCAN {table}\b(?! USING)', r'USE TEMP B-TREE FOR (ORDER BY|RIGHT PART OF ORDER BY)'),
+    'postgresql': (r'Seq Scan on {table}\b', r'(^|->)\s*Sort\s'),
+}
+
+
+def supported(vendor: str) -> bool:
+    return vendor in PATTERNS
+
+
+def problems(plan: str, vendor: str) -> list:
+    """ What is wrong in ``plan``: scans of the entries table and sorts. """
+    scan, sort = PATTERNS[vendor]
+    scan = re.compile(scan.format(table=re.escape(Entry._meta.db_table)))
+    sort = re.compile(sort)
+    found = []
+    for line in plan.splitlines():
+        if scan.search(line):
+            found.append(f'sequential scan: {line.strip()}')
+        if sort.search(line):
+            found.append(f'sort: {line.strip()}')
+    return found
+
+
+def check() -> dict:
+    """ ``{query: [problems]}`` of the hot queries with a bad plan. """
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    failures = {}
+    for name, queryset in hot_queries().items():
+        found = problems(queryset.explain(), connection.vendor)
+        if found:
+            failures[name] = found
+    return failures
@@ -0,0 +1,163 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.benchmarks.runner
+# description: Times the public views and compares them with a baseline
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import itertools
+import json
+import math
+import random
+import time
+from urllib.parse import urlencode
+
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..cache import get_cache
+from ..homepage import PAGE_SIZE, list_queryset
+from ..models import ArchiveMonth, Category, Entry, SearchTerm, TagStat
+from ..pagination import encode_cursor
+from ..views import CategoryDetail
+
+PERCENTILES = (50, 90, 99)
+# Timings are noisy, a scenario regresses when its p90 grows past this.
+TOLERANCE = 0.25
+
+
+def percentile(samples, p) -> float:
+    """ Nearest rank percentile of ``samples``. """
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def deep_pages(url, entries, per_page, pages=3) -> list:
+    """ The cursors of the last ``pages`` pages of the list of ``entries``, the list itself if it fits in one. """
+    keys = list(entries.order_by('pub_date', 'id').values_list('pub_date', 'id')[:per_page * pages + 1])
+    cursors = [f'{url}?after={encode_cursor(keys[per_page * n])}' for n in range(1, pages + 1) if per_page * n < len(keys)]
+    return cursors or [url]
+
+
+class Scenario:
+    """ A request, or a callable, timed ``runs`` times. """
+
+    def __init__(self, name, targets):
+        self.name = name
+        self.targets = targets
+
+    def __call__(self, client):
+        """ Runs one target, returns ``(seconds, queries)``. """
+        target = random.choice(self.targets)
+        if callable(target):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                target()
+                return time.perf_counter() - started, len(queries)
+        started = time.perf_counter()
+        response = client.get(target)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise RuntimeError(f'{target} answered {response.status_code}')
+        return elapsed, response.wsgi_request.metrics.queries
+
+
+def _save(entry):
+    original, edits = entry.body, itertools.count()
+
+    def save():
+        # A new body every time, so it is rendered; rolled back to keep the corpus.
+        with transaction.atomic():
+            entry.body = f'{original}\n\nEditado {next(edits)}.'
+            entry.save()
+            transaction.set_rollback(True)
+    return save
+
+
+def scenarios(sample=20) -> list:
+    """ The scenarios for the corpus in the database. """
+    live = Entry.objects.filter(status=Entry.LIVE_STATUS).select_related('category')
+    count = live.count()
+    if not count:
+        raise RuntimeError('The database has no LIVE entries, generate a corpus first.')
+    step = max(1, count // sample)
+    entries = [entry for n, entry in enumerate(live.order_by('pk').iterator()) if n % step == 0][:sample]
+
+    category = Category.objects.order_by('-pk').first()
+    url = reverse('blog:category', kwargs={'slug': category.slug})
+    months = list(ArchiveMonth.objects.order_by('year', 'month'))[-sample:]
+    years = sorted({entry.pub_date.year for entry in entries})
+    tags = TagStat.objects.select_related('tag')[:sample]
+    # The terms in most entries, the searches with the most postings to score.
+    search = reverse('blog:search')
+    common = SearchTerm.objects.order_by('-documents').values_list('term', flat=True)[:5]
+    return [
+        Scenario('index', [reverse('blog:index')]),
+        Scenario('index_deep', deep_pages(reverse('blog:index'), list_queryset(), PAGE_SIZE)),
+        Scenario('category', [url]),
+        Scenario('category_deep', deep_pages(url, live.filter(category=category), CategoryDetail.paginate_by)),
+        Scenario('entry', [entry.get_absolute_url() for entry in entries]),
+        Scenario('tag', [stat.get_absolute_url() for stat in tags]),
+        Scenario('tag_cloud', [reverse('blog:tag_list')]),
+        Scenario('archive', [reverse('blog:sitemap')]),
+        Scenario('archive_month', [month.get_absolute_url() for month in months]),
+        Scenario('sitemap', [reverse('blog:django.contrib.sitemaps.views.sitemap')]),
+        Scenario('sitemap_year', [reverse('blog:sitemap_segment', args=[year]) for year in years]),
+        Scenario('search_common', [f"{search}?{urlencode({'q': term})}" for term in common] or [search]),
+        Scenario('entry_save', [_save(entry) for entry in entries[:5]]),
+    ]
+
+
+def run(runs=50, warm=False, sample=20, seed=0) -> dict:
+    """
+    Times every scenario, with cold caches unless ``warm``. Returns
+    ``{scenario: {'p50': ms, 'p90': ms, 'p99': ms, 'queries': n}}`` where
+    queries is the most any run made.
+    """
+    random.seed(seed)
+    client = Client()
+    results = {}
+    for scenario in scenarios(sample):
+        timings, queries = [], 0
+        scenario(client)
+        for _ in range(runs):
+            if not warm:
+                get_cache().clear()
+            elapsed, count = scenario(client)
+            timings.append(elapsed)
+            queries = max(queries, count)
+        results[scenario.name] = {
+            **{f'p{p}': round(percentile(timings, p) * 1000, 2) for p in PERCENTILES},
+            'queries': queries,
+        }
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance=TOLERANCE) -> list:
+    """ The regressions of ``results`` against ``baseline``, as messages. """
+    regressions = []
+    for name, current in results.items():
+        saved = baseline.get(name)
+        if saved is None:
+            continue
+        if current['queries'] > saved['queries']:
+            regressions.append(f"{name}: {current['queries']} queries, baseline {saved['queries']}")
+        if current['p90'] > saved['p90'] * (1 + tolerance):
+            regressions.append(f"{name}: p90 {current['p90']:.1f} ms, baseline {saved['p90']:.1f} ms")
+    return regressions
+
+
+def load(path) -> dict:
+    with open(path, encoding='utf-8') as baseline:
+        return json.load(baseline)
+
+
+def save(results: dict, path) -> None:
+    with open(path, 'w', encoding='utf-8') as baseline:
+        json.dump(results, baseline, indent=2, sort_keys=True)
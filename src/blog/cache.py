@@ -0,0 +1,187 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.cache
+# description: Response cache with dependency tracked invalidation
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.timezone import localtime
+
+from . import compression, instrumentation
+
+GENERATION_PREFIX = 'blog:gen:'
+PAGE_PREFIX = 'blog:page:'
+
+
+def get_cache():
+    return caches[settings.BLOG_CACHE_ALIAS]
+
+
+# Dependencies are plain string tags. Each tag has a generation stored in the
+# cache; invalidating a tag deletes it and the next read creates a new one, so
+# anything stored with the old generation no longer matches. This works with
+# every cache backend, evicted generations simply look invalidated.
+
+def generations(tags) -> dict:
+    cache = get_cache()
+    keys = {GENERATION_PREFIX + tag: tag for tag in tags}
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), timeout=None)
+        found.update(cache.get_many(missing))
+    return {keys[key]: value for key, value in found.items()}
+
+
+def invalidate(*tags) -> None:
+    keys = [GENERATION_PREFIX + tag for tag in tags]
+    if not keys:
+        return
+    cache = get_cache()
+    cache.delete_many(keys)
+    # Again after commit, a reader may have cached the uncommitted state.
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def lookup(key: str, current: dict):
+    """ The value stored under ``key`` with the ``current`` generations, or None. """
+    cached = get_cache().get(key)
+    hit = cached is not None and cached['generations'] == current
+    instrumentation.cache_access(hit)
+    return cached['value'] if hit else None
+
+
+def store(key: str, current: dict, value) -> None:
+    get_cache().set(key, {'generations': current, 'value': value}, settings.BLOG_CACHE_TIMEOUT)
+
+
+def entry_tag(category_slug: str, slug: str) -> str:
+    return f'entry:{category_slug}/{slug}'
+
+
+def category_tag(slug: str) -> str:
+    return f'category:{slug}'
+
+
+def archive_tag(year: int, month: int) -> str:
+    return f'archive:{year}-{month:02d}'
+
+
+def sitemap_tag(year: int) -> str:
+    return f'sitemap:{year}'
+
+
+def feed_tag(category_slug=None) -> str:
+    return f'feed:{category_slug}' if category_slug is not None else 'feed'
+
+
+def tag_tag(slug: str) -> str:
+    return f'tag:{slug}'
+
+
+def feed_tags(entry) -> set:
+    """ Tags of the feeds that list ``entry``, only LIVE entries are listed. """
+    if entry.status != entry.LIVE_STATUS:
+        return set()
+    return {feed_tag(), feed_tag(entry.category.slug)}
+
+
+def entry_tags(entry, neighbours=None) -> set:
+    """ Tags of the pages that show ``entry`` or link to it. """
+    published = localtime(entry.pub_date)
+    tags = {
+        entry_tag(entry.category.slug, entry.slug),
+        category_tag(entry.category.slug),
+        sitemap_tag(published.year),
+        archive_tag(published.year, published.month),
+        'entries',
+    }
+    if entry.featured:
+        tags.add('featured')
+    if neighbours is None:
+        neighbours = (entry.previous_entry, entry.next_entry)
+    for neighbour in neighbours:
+        if neighbour is not None:
+            tags.add(entry_tag(neighbour.category.slug, neighbour.slug))
+            # Relinking changes the neighbour's lastmod.
+            tags.add(sitemap_tag(localtime(neighbour.pub_date).year))
+    return tags
+
+
+class CachedResponseMixin:
+    """
+    Caches the rendered response of a view. The page is stored with the
+    generations of the tags returned by ``get_cache_tags()``, read before
+    the view queries the database, and is served only while all of them
+    are still current. Only the query parameters in ``cache_params`` change
+    the page, any other one (``utm_source``, ``fbclid``) is served the same.
+    """
+    cache_tags = ()
+    cache_params = ()
+
+    def get_cache_tags(self):
+        return self.cache_tags
+
+    def get_cache_key(self) -> str:
+        params = sorted((name, value) for name, value in self.request.GET.items() if name in self.cache_params)
+        path = f'{self.request.path}?{urlencode(params)}' if params else self.request.path
+        return PAGE_PREFIX + hashlib.md5(path.encode('utf-8')).hexdigest()
+
+    def cached_response(self, request):
+        """ ``(key, generations, response)``, the response is None on a miss. """
+        key = self.get_cache_key()
+        current = generations(self.get_cache_tags())
+        cached = lookup(key, current)
+        return key, current, compression.response(request, cached) if cached is not None else None
+
+    def store_response(self, request, response, key, current):
+        if response.status_code != 200 or response.streaming:
+            return response
+
+        def store_rendered(response):
+            cached = compression.cached(response.content, response['Content-Type'])
+            store(key, current, cached)
+            compression.encode(request, response, cached)
+
+        if hasattr(response, 'add_post_render_callback'):
+            response.add_post_render_callback(store_rendered)
+        else:
+            store_rendered(response)
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+
+        key, current, response = self.cached_response(request)
+        if response is not None:
+            return response
+        return self.store_response(request, super().dispatch(request, *args, **kwargs), key, current)
+
+
+class AsyncCachedResponseMixin(CachedResponseMixin):
+    """
+    ``CachedResponseMixin`` for views with async handlers. The cache is read
+    and written on the thread that runs the ORM of the request.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await super(CachedResponseMixin, self).dispatch(request, *args, **kwargs)
+
+        key, current, response = await sync_to_async(self.cached_response)(request)
+        if response is not None:
+            return response
+        response = await super(CachedResponseMixin, self).dispatch(request, *args, **kwargs)
+        return await sync_to_async(self.store_response)(request, response, key, current)
@@ -0,0 +1,109 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.cards
+# description: Slim entry records for the lists
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.query import ValuesListIterable
+from taggit.models import TaggedItem
+
+from .models import Category, Entry
+
+CATEGORY_FIELDS = ('category__slug', 'category__name', 'category__icon')
+FIELDS = ('id', 'title', 'slug', 'cover', 'pub_date', 'featured', 'excerpt') + CATEGORY_FIELDS
+
+
+class CategoryCard:
+    """ The category of an ``EntryCard``: what the lists show of it. """
+    __slots__ = ('slug', 'name', 'icon')
+
+    def __init__(self, slug, name, icon):
+        self.slug = slug
+        self.name = name
+        self.icon = icon
+
+    __str__ = Category.__str__
+    get_absolute_url = Category.get_absolute_url
+
+
+class EntryCard:
+    """
+    An entry as the lists show it, with the interface the list templates use
+    of ``Entry`` but none of its large text columns.
+    """
+    __slots__ = ('pk', 'title', 'slug', 'cover', 'pub_date', 'featured', 'excerpt', 'category', 'tags')
+
+    def __init__(self, pk, title, slug, cover, pub_date, featured, excerpt, category):
+        self.pk = pk
+        self.title = title
+        self.slug = slug
+        self.cover = cover
+        self.pub_date = pub_date
+        self.featured = featured
+        self.excerpt = excerpt
+        self.category = category
+        self.tags = ()
+
+    @property
+    def id(self):
+        return self.pk
+
+    def __eq__(self, other):
+        # A card is its entry, like model instances are equal by primary key.
+        if isinstance(other, (EntryCard, Entry)):
+            return self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __repr__(self) -> str:
+        return f'<EntryCard: {self.title}>'
+
+    __str__ = Entry.__str__
+    get_absolute_url = Entry.get_absolute_url
+    resumen = Entry.resumen
+    imagen = Entry.imagen
+
+
+class CardIterable(ValuesListIterable):
+    def __iter__(self):
+        for *fields, slug, name, icon in super().__iter__():
+            yield EntryCard(*fields, CategoryCard(slug, name, icon))
+
+
+class TaggedCardIterable(CardIterable):
+    def __iter__(self):
+        entries = list(super().__iter__())
+        attach_tags(entries)
+        yield from entries
+
+
+def attach_tags(entries) -> None:
+    """ Sets the ``tags`` of the cards ``entries``, by name, in one query. """
+    by_pk = {}
+    for entry in entries:
+        entry.tags = []
+        by_pk[entry.pk] = entry
+    if not by_pk:
+        return
+    items = TaggedItem.objects\
+        .filter(content_type=ContentType.objects.get_for_model(Entry), object_id__in=by_pk)\
+        .select_related('tag')\
+        .order_by('tag__name')
+    for item in items:
+        by_pk[item.object_id].tags.append(item.tag)
+
+
+def cards(queryset, tags=False):
+    """
+    ``queryset`` of entries yielding ``EntryCard`` objects, in one query, and
+    one more for the tags of all of them with ``tags``.
+    """
+    queryset = queryset.values_list(*FIELDS)
+    queryset._iterable_class = TaggedCardIterable if tags else CardIterable
+    return queryset
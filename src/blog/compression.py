@@ -0,0 +1,106 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.compression
+# description: Compress once, serve the precompressed variants
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import gzip
+import re
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:     # pragma: no cover
+    brotli = None
+
+# Smaller bodies don't shrink enough to pay for the header.
+MIN_SIZE = 256
+# File suffix of each content coding, as nginx's gzip_static and brotli_static look them up.
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+ACCEPT_ENCODING = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def _gzip(content: bytes) -> bytes:
+    # No timestamp, the same content always gives the same bytes.
+    return gzip.compress(content, compresslevel=settings.BLOG_GZIP_LEVEL, mtime=0)
+
+
+def _brotli(content: bytes) -> bytes:
+    return brotli.compress(content, quality=settings.BLOG_BROTLI_QUALITY)
+
+
+def encoders() -> dict:
+    """ ``{content coding: compressor}`` of the codings available here. """
+    found = {}
+    if brotli is not None:
+        found['br'] = _brotli
+    found['gzip'] = _gzip
+    return found
+
+
+def compress(content: bytes) -> dict:
+    """ ``{content coding: compressed bytes}`` of the variants worth keeping. """
+    if len(content) < MIN_SIZE:
+        return {}
+    variants = {}
+    for coding, compressor in encoders().items():
+        compressed = compressor(content)
+        if len(compressed) < len(content):
+            variants[coding] = compressed
+    return variants
+
+
+def accepted(header: str) -> dict:
+    """ ``{content coding: q}`` of an ``Accept-Encoding`` header. """
+    codings = {}
+    for coding, q in ACCEPT_ENCODING.findall(header or ''):
+        try:
+            codings[coding.lower()] = float(q) if q else 1.0
+        except ValueError:
+            continue
+    return codings
+
+
+def negotiate(request, variants) -> str:
+    """ The best of ``variants`` the client accepts, None for the identity. """
+    codings = accepted(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    best, best_q = None, 0
+    for coding in variants:
+        q = codings.get(coding, codings.get('*', 0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def cached(content: bytes, content_type: str) -> dict:
+    """ What the caches store for a response: the identity and its variants. """
+    return {'content': content, 'content_type': content_type, 'encoded': compress(content)}
+
+
+def weaken_etag(response) -> None:
+    """ An encoded body is not byte for byte the identity, its ETag is weak. """
+    etag = response.get('ETag')
+    if etag and etag.startswith('"') and response.has_header('Content-Encoding'):
+        response['ETag'] = 'W/' + etag
+
+
+def encode(request, response, stored: dict):
+    """ Swaps the body of ``response`` for the stored variant the client takes. """
+    coding = negotiate(request, stored.get('encoded', {}))
+    if coding is not None:
+        response.content = stored['encoded'][coding]
+        response['Content-Encoding'] = coding
+        weaken_etag(response)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def response(request, stored: dict) -> HttpResponse:
+    """ The response for a stored page, in the best encoding the client takes. """
+    return encode(request, HttpResponse(stored['content'], content_type=stored['content_type']), stored)
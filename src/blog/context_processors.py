@@ -1,4 +1,30 @@
+from django.utils.functional import SimpleLazyObject
 
-def categories(request):
+SNAPSHOT_KEY = 'blog:categories'
+SNAPSHOT_TAGS = ('categories',)
+
+_snapshot = {'generations': None, 'categories': None}
+
+
+def category_snapshot():
+    """
+    The category list of the menu. Kept in this process and in the shared
+    cache, both checked against the generations of the tags.
+    """
+    from blog.cache import generations, lookup, store
     from blog.models import Category
-    return {'categories': Category.objects.all()}
\ No newline at end of file
+
+    current = generations(SNAPSHOT_TAGS)
+    if _snapshot['generations'] == current:
+        return _snapshot['categories']
+
+    snapshot = lookup(SNAPSHOT_KEY, current)
+    if snapshot is None:
+        snapshot = list(Category.objects.all())
+        store(SNAPSHOT_KEY, current, snapshot)
+    _snapshot.update(generations=current, categories=snapshot)
+    return snapshot
+
+
+def categories(request):
+    return {'categories': SimpleLazyObject(category_snapshot)}
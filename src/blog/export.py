@@ -0,0 +1,238 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.export
+# description: Static HTML export of the public pages, served by nginx
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.http import Http404
+from django.test import RequestFactory
+from django.urls import resolve, reverse, Resolver404
+from django.utils.timezone import localtime
+
+from . import compression
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.html'
+# Pages a request exports itself, larger batches go to ``manage.py run_jobs``.
+INLINE_PAGES = 5
+
+_pending = threading.local()
+
+
+class StaticExporter:
+    """
+    Renders public pages through their views and writes the responses
+    under ``STATIC_EXPORT_ROOT``, at the path nginx looks up for the URL.
+    Only the first page of paginated lists is exported, nginx sends any
+    request with a query string to Django.
+    """
+
+    def __init__(self, root=None, host=None):
+        root = root or settings.STATIC_EXPORT_ROOT
+        self.root = Path(root) if root else None
+        self.host = host or settings.STATIC_EXPORT_HOST
+        self.factory = RequestFactory()
+
+    @property
+    def enabled(self) -> bool:
+        return self.root is not None
+
+    def path_for(self, url: str) -> Path:
+        relative = url.lstrip('/')
+        if not relative or relative.endswith('/'):
+            relative += INDEX_FILE
+        return self.root / relative
+
+    def render(self, url: str):
+        request = self.factory.get(url, HTTP_HOST=self.host, secure=True)
+        request.user = AnonymousUser()
+        match = resolve(request.path_info)
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response = response.render()
+        return response
+
+    @staticmethod
+    def _replace(path: Path, content: bytes) -> None:
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.export-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+
+    def write(self, url: str, content: bytes) -> Path:
+        """
+        Writes the page and its ``.gz``/``.br`` variants next to it, for
+        nginx's ``gzip_static`` and ``brotli_static``. A variant that is not
+        written this time is removed, nginx would serve it stale otherwise.
+        """
+        path = self.path_for(url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        variants = compression.compress(content)
+        for coding, suffix in compression.SUFFIXES.items():
+            variant = path.with_name(path.name + suffix)
+            if coding in variants:
+                self._replace(variant, variants[coding])
+            else:
+                variant.unlink(missing_ok=True)
+        self._replace(path, content)
+        return path
+
+    def remove(self, url: str) -> None:
+        if self.enabled:
+            path = self.path_for(url)
+            path.unlink(missing_ok=True)
+            for suffix in compression.SUFFIXES.values():
+                path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+    def export(self, url: str) -> bool:
+        """
+        Writes the page for ``url``; pages that no longer render are removed
+        so nginx hands the request to Django. Errors are logged, never raised,
+        the export must not break the save that triggered it.
+        """
+        if not self.enabled:
+            return False
+        try:
+            response = self.render(url)
+        except (Resolver404, Http404):
+            self.remove(url)
+            return False
+        except Exception:   # pylint: disable=W0703
+            logger.exception('Static export of %s failed', url)
+            self.remove(url)
+            return False
+        if response.status_code != 200:
+            self.remove(url)
+            return False
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        self.write(url, content)
+        return True
+
+    def export_many(self, urls) -> int:
+        return sum(1 for url in urls if self.export(url))
+
+
+def site_pages() -> list:
+    return [
+        reverse('blog:index'),
+        reverse('blog:sitemap'),
+        reverse('blog:category_list'),
+        reverse('blog:django.contrib.sitemaps.views.sitemap'),
+    ]
+
+
+def tag_pages(slugs) -> set:
+    """ The pages of the tags ``slugs`` and the tag cloud. """
+    urls = {reverse('blog:tag', args=[slug]) for slug in slugs}
+    if urls:
+        urls.add(reverse('blog:tag_list'))
+    return urls
+
+
+def archive_month(entry) -> str:
+    published = localtime(entry.pub_date)
+    return reverse('blog:archive_month', kwargs={'year': published.year, 'month': published.month})
+
+
+def sitemap_segment(entry) -> str:
+    return reverse('blog:sitemap_segment', args=[localtime(entry.pub_date).year])
+
+
+def all_urls():
+    """ Every URL of the full export, lightest queries first. """
+    from .models import ArchiveMonth, Category, Entry, TagStat
+    from .sitemaps import segments
+    yield from site_pages()
+    for month in ArchiveMonth.objects.all():
+        yield month.get_absolute_url()
+    for year, _ in segments():
+        yield reverse('blog:sitemap_segment', args=[year])
+    for slug in Category.objects.values_list('slug', flat=True):
+        yield reverse('blog:category', args=[slug])
+    yield reverse('blog:tag_list')
+    for slug in TagStat.objects.values_list('tag__slug', flat=True):
+        yield reverse('blog:tag', args=[slug])
+    entries = Entry.objects\
+        .filter(status=Entry.LIVE_STATUS)\
+        .values_list('category__slug', 'slug')\
+        .order_by('-pub_date', '-id')
+    for category, slug in entries.iterator():
+        yield reverse('blog:entry', kwargs={'category': category, 'slug': slug})
+
+
+def entry_pages(entry, neighbours=None) -> set:
+    """ Pages that list or link to ``entry``, besides its own page. """
+    urls = set(site_pages())
+    urls.add(entry.category.get_absolute_url())
+    urls.add(sitemap_segment(entry))
+    urls.add(archive_month(entry))
+    if neighbours is None:
+        neighbours = (entry.previous_entry, entry.next_entry)
+    for neighbour in neighbours:
+        if neighbour is not None:
+            urls.add(neighbour.get_absolute_url())
+            # Relinking changes the neighbour's lastmod.
+            urls.add(sitemap_segment(neighbour))
+    return urls
+
+
+def export_urls(urls, root=None, host=None) -> int:
+    """ Entry point for the export processes. """
+    return StaticExporter(root, host).export_many(urls)
+
+
+def schedule(urls=(), removed=(), everything=False) -> None:
+    """
+    Queues pages to export once the current transaction commits, so a save
+    that touches several rows exports every affected page only once. Only
+    up to ``INLINE_PAGES`` pages are rendered by the request, the rest is
+    left to a job.
+    """
+    if not settings.STATIC_EXPORT_ROOT:
+        return
+    batch = getattr(_pending, 'batch', None)
+    if batch is None:
+        batch = _pending.batch = {'urls': set(), 'removed': set(), 'everything': False}
+    # Registered on every call: a rolled back transaction drops its callback,
+    # the batch is then flushed by the next commit instead.
+    transaction.on_commit(_flush)
+    batch['urls'].update(urls)
+    batch['removed'].update(removed)
+    batch['everything'] = batch['everything'] or everything
+
+
+def _flush() -> None:
+    batch = _pending.__dict__.pop('batch', None)
+    if batch is None:
+        return
+    exporter = StaticExporter()
+    for url in batch['removed'] - batch['urls']:
+        exporter.remove(url)
+    if batch['everything'] or len(batch['urls']) > INLINE_PAGES:
+        from . import jobs
+        payload = {'urls': sorted(batch['urls'])}
+        if batch['everything']:
+            # Not in the payload otherwise, a merged job keeps it set.
+            payload['everything'] = True
+        jobs.enqueue('export_pages', 'export', payload)
+    else:
+        exporter.export_many(sorted(batch['urls']))
+
+
+def export_pages(urls=(), everything=False) -> int:
+    """ Exports ``urls``, or every page with ``everything``. """
+    return StaticExporter().export_many(all_urls() if everything else sorted(urls))
@@ -0,0 +1,97 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.feeds
+# description: Cached RSS and Atom feeds, site wide and per category
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import hashlib
+
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.utils.feedgenerator import Atom1Feed
+
+from . import compression
+from .cache import feed_tag, generations, lookup, store
+from .models import Category, Entry
+
+FEED_PREFIX = 'blog:feed:'
+ITEMS = 20
+
+
+class ContentAtom1Feed(Atom1Feed):
+    """ Atom with the whole entry in ``<content>``, the summary stays in ``<summary>``. """
+
+    def add_item_elements(self, handler, item):
+        super().add_item_elements(handler, item)
+        if item.get('content'):
+            handler.addQuickElement('content', item['content'], {'type': 'html'})
+
+
+class CachedFeedMixin:
+    """
+    Serves the feed bytes from the cache while no LIVE entry in scope has
+    changed, see ``cache.feed_tag``. Only the slug of a category feed is read
+    from the URL.
+    """
+
+    def __call__(self, request, slug=None):
+        path = request.get_full_path()
+        key = FEED_PREFIX + hashlib.md5(path.encode('utf-8')).hexdigest()
+        current = generations((feed_tag(slug),))
+        cached = lookup(key, current)
+        if cached is None:
+            response = super().__call__(request, slug=slug)
+            cached = compression.cached(response.content, response['Content-Type'])
+            store(key, current, cached)
+        return compression.response(request, cached)
+
+
+class EntriesFeed(CachedFeedMixin, Feed):
+    description = 'Lo más reciente de toledano.org'
+
+    def get_object(self, request, slug=None):
+        return get_object_or_404(Category, slug=slug) if slug is not None else None
+
+    def title(self, category):
+        return f'toledano.org: {category.name}' if category is not None else 'toledano.org'
+
+    def link(self, category):
+        return category.get_absolute_url() if category is not None else '/'
+
+    def items(self, category):
+        entries = Entry.objects\
+            .filter(status=Entry.LIVE_STATUS)\
+            .select_related('category')\
+            .only(
+                'title', 'slug', 'pub_date', 'updated_at', 'summary_html', 'body_html',
+                'category__slug', 'category__name'
+            )
+        if category is not None:
+            entries = entries.filter(category=category)
+        return entries.order_by('-pub_date', '-id')[:ITEMS]
+
+    def item_title(self, entry):
+        return entry.title
+
+    def item_description(self, entry):
+        return entry.summary_html
+
+    def item_pubdate(self, entry):
+        return entry.pub_date
+
+    def item_updateddate(self, entry):
+        return entry.updated_at
+
+    def item_categories(self, entry):
+        return entry.category.name,
+
+
+class AtomEntriesFeed(EntriesFeed):
+    feed_type = ContentAtom1Feed
+    subtitle = EntriesFeed.description
+
+    def item_extra_kwargs(self, entry):
+        return {'content': entry.body_html}
@@ -0,0 +1,133 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.highlight
+# description: Cache of the Pygments highlighted code blocks
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pygments
+from django.conf import settings
+from markdown.extensions import codehilite
+from pygments import lexers
+from pygments.util import ClassNotFound
+
+
+class LRU:
+    """ A bounded mapping that drops the least recently used key. """
+
+    def __init__(self, size):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+blocks = LRU(settings.BLOG_HIGHLIGHT_CACHE_SIZE)
+# Lexers are looked up by name, or guessed from the code, once per process.
+_lexers = {}
+_guesses = LRU(settings.BLOG_HIGHLIGHT_CACHE_SIZE)
+_stats = {'memory_hits': 0, 'table_hits': 0, 'misses': 0}
+_NOT_FOUND = object()
+
+
+def stats() -> dict:
+    """ Hits and misses of this process since the last ``reset_stats``. """
+    return {**_stats, 'memory_size': len(blocks)}
+
+
+def reset_stats() -> None:
+    for name in _stats:
+        _stats[name] = 0
+
+
+def _options(options) -> str:
+    return repr(sorted(options.items()))
+
+
+def get_lexer_by_name(name, **options):
+    key = (name, _options(options))
+    lexer = _lexers.get(key)
+    if lexer is None:
+        try:
+            lexer = lexers.get_lexer_by_name(name, **options)
+        except ClassNotFound:
+            lexer = _NOT_FOUND
+        _lexers[key] = lexer
+    if lexer is _NOT_FOUND:
+        raise ClassNotFound(f'no lexer for alias {name!r} found')
+    return lexer
+
+
+def guess_lexer(text, **options):
+    key = hashlib.sha1(text.encode('utf-8')).hexdigest()
+    name = _guesses.get(key)
+    if name is None:
+        name = lexers.guess_lexer(text, **options).aliases[0]
+        _guesses.put(key, name)
+    return get_lexer_by_name(name, **options)
+
+
+def block_key(code, lexer, formatter) -> str:
+    """ The same code, lexer and formatter options always give the same HTML. """
+    return hashlib.sha1(repr((
+        pygments.__version__,
+        type(lexer).__name__, _options(lexer.options),
+        type(formatter).__name__, _options(formatter.options),
+        code,
+    )).encode('utf-8')).hexdigest()
+
+
+def highlight(code, lexer, formatter):
+    """ ``pygments.highlight`` through the memory cache and the table. """
+    from .models import HighlightedCode
+
+    key = block_key(code, lexer, formatter)
+    html = blocks.get(key)
+    if html is not None:
+        _stats['memory_hits'] += 1
+        return html
+    html = HighlightedCode.objects.filter(key=key).values_list('html', flat=True).first()
+    if html is not None:
+        _stats['table_hits'] += 1
+    else:
+        _stats['misses'] += 1
+        html = pygments.highlight(code, lexer, formatter)
+        HighlightedCode.objects.bulk_create([HighlightedCode(key=key, html=html)], ignore_conflicts=True)
+    blocks.put(key, html)
+    return html
+
+
+def install() -> None:
+    """
+    Routes the lookups and highlighting of ``codehilite``, used by fenced
+    and indented code blocks alike, through this module.
+    """
+    codehilite.get_lexer_by_name = get_lexer_by_name
+    codehilite.guess_lexer = guess_lexer
+    codehilite.highlight = highlight
@@ -0,0 +1,60 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.homepage
+# description: Single pass assembler for the blog index
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+from .cache import generations, lookup, store
+from .cards import cards
+from .models import Entry
+
+PRIMEROS = 4
+FEATURED = 5
+PAGE_SIZE = 6
+CACHE_TAGS = ('entries', 'categories')
+
+
+def index_queryset(tags=False):
+    """ The LIVE entries as ``EntryCard`` objects, newest first. """
+    return cards(Entry.objects.filter(status=Entry.LIVE_STATUS).order_by('-pub_date', '-id'), tags=tags)
+
+
+def slots_querysets() -> tuple:
+    """
+    The sticky entry with the sidebar, and the first four: the newest
+    featured entries and the newest regular ones, two slices each read in
+    the order of its own index.
+    """
+    return (
+        index_queryset().filter(featured=True)[:1 + FEATURED],
+        index_queryset().filter(featured=False)[:PRIMEROS],
+    )
+
+
+def _assemble() -> dict:
+    """ Fills the index slots, the paginated list lives in ``BlogIndex``. """
+    featured, regular = (list(queryset) for queryset in slots_querysets())
+    return {
+        'sticky': featured[0] if featured else None,
+        'featured': featured[1:],
+        'primeros': regular,
+    }
+
+
+def build() -> dict:
+    """ The index slots, cached until an entry or category changes. """
+    key = 'blog:homepage'
+    current = generations(CACHE_TAGS)
+    homepage = lookup(key, current)
+    if homepage is None:
+        homepage = _assemble()
+        store(key, current, homepage)
+    return homepage
+
+
+def list_queryset():
+    """ The paginated list below the first four, see ``BlogIndex``. """
+    return index_queryset(tags=True).filter(featured=False)
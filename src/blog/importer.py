@@ -0,0 +1,250 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.importer
+# description: Reads Markdown files with front matter into entries, for import_markdown
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import os
+import re
+from datetime import datetime, time
+
+import pytz
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.text import slugify
+from django.utils.timezone import make_aware
+from taggit.models import Tag, TaggedItem
+
+from . import archive, cache, export, neighbours, related, renderer, search, tagstats
+from .models import ArchiveMonth, Category, Entry, TagStat
+
+EXTENSIONS = ('.md', '.markdown')
+# The same zone ``Entry.save`` gives to naive dates.
+TIME_ZONE = pytz.timezone('Mexico/General')
+STATUSES = {
+    'live': Entry.LIVE_STATUS, 'published': Entry.LIVE_STATUS, 'publicado': Entry.LIVE_STATUS,
+    'draft': Entry.DRAFT_STATUS, 'borrador': Entry.DRAFT_STATUS,
+    'hidden': Entry.HIDDEN_STATUS, 'oculto': Entry.HIDDEN_STATUS,
+}
+TRUE = {'true', 'yes', 'y', '1', 'si', 'sí'}
+
+# Front matter is either the block of ``markdown.extensions.meta``, ``Key:
+# value`` lines up to the first blank line with indented continuations, or
+# the same lines between ``---`` fences, where list items may also be
+# written as ``- value``.
+FENCE = re.compile(r'^-{3}\s*$')
+END_FENCE = re.compile(r'^(-{3}|\.{3})\s*$')
+META_LINE = re.compile(r'^[ ]{0,3}(?P<key>[A-Za-z0-9_-]+):\s*(?P<value>.*)$')
+META_MORE = re.compile(r'^(?:[ ]{4}|\t)\s*(?:-\s+)?(?P<value>.*)$')
+LIST_ITEM = re.compile(r'^\s*-\s+(?P<value>.*)$')
+
+
+def files(root: str):
+    """ The Markdown files under ``root``, in a stable order, as they are found. """
+    for directory, subdirectories, names in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(names):
+            if name.lower().endswith(EXTENSIONS) and not name.startswith('.'):
+                yield os.path.join(directory, name)
+
+
+def front_matter(text: str):
+    """ Splits ``text`` into ``({key: [values]}, body)``. """
+    lines = text.lstrip('\ufeff').split('\n')
+    fenced = bool(lines) and FENCE.match(lines[0]) is not None
+    meta, key = {}, None
+    for n, line in enumerate(lines[1:] if fenced else lines, start=1 if fenced else 0):
+        if (END_FENCE.match(line) if fenced else not line.strip()):
+            return meta, '\n'.join(lines[n + 1:])
+        if fenced and not line.strip():
+            continue
+        match = META_LINE.match(line)
+        if match:
+            key = match['key'].lower()
+            meta[key] = [match['value'].strip()] if match['value'].strip() else []
+            continue
+        match = (LIST_ITEM if fenced else META_MORE).match(line)
+        if match and key is not None:
+            meta[key].append(match['value'].strip())
+            continue
+        if fenced:
+            raise ValueError(f'Unclosed or invalid front matter at line {n + 1}')
+        # Not a meta block, the whole file is the body.
+        return {}, text
+    if fenced:
+        raise ValueError('Unclosed front matter')
+    return meta, ''
+
+
+def _unquote(value: str) -> str:
+    if len(value) > 1 and value[0] == value[-1] and value[0] in '"\'':
+        return value[1:-1]
+    return value
+
+
+def _value(meta: dict, key: str, default=''):
+    values = meta.get(key)
+    return _unquote(' '.join(values).strip()) if values else default
+
+
+def _tags(meta: dict) -> list:
+    names = []
+    for value in meta.get('tags', []):
+        value = value.strip()
+        if value.startswith('[') and value.endswith(']'):
+            value = value[1:-1]
+        names.extend(_unquote(name.strip()) for name in value.split(','))
+    # TAGGIT_CASE_INSENSITIVE: the first spelling wins.
+    seen = {}
+    for name in names:
+        if name:
+            seen.setdefault(name.lower(), name[:100])
+    return list(seen.values())
+
+
+def _date(value: str):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value!r}')
+        parsed = datetime.combine(day, time())
+    if parsed.tzinfo is None:
+        parsed = make_aware(parsed, TIME_ZONE)
+    return parsed
+
+
+def parse(path: str, category: str = '', status: int = Entry.LIVE_STATUS) -> dict:
+    """
+    Reads a file into the field values of an entry, with the name of its
+    category in ``category`` and its tag names in ``tags``. ``category`` and
+    ``status`` are used when the front matter has none.
+    """
+    with open(path, encoding='utf-8') as f:
+        meta, body = front_matter(f.read())
+    title = _value(meta, 'title')
+    if not title:
+        raise ValueError('No title in the front matter')
+    if not _value(meta, 'date'):
+        raise ValueError('No date in the front matter')
+    category = _value(meta, 'category', category)
+    if not category:
+        raise ValueError('No category in the front matter')
+    if meta.get('status'):
+        name = _value(meta, 'status').lower()
+        if name not in STATUSES:
+            raise ValueError(f'Unknown status: {name!r}')
+        status = STATUSES[name]
+    elif _value(meta, 'draft').lower() in TRUE:
+        status = Entry.DRAFT_STATUS
+    return {
+        'title': title[:250],
+        'slug': slugify(_value(meta, 'slug') or title)[:50],
+        'pub_date': _date(_value(meta, 'date')),
+        'summary': _value(meta, 'summary'),
+        'body': body.strip('\n'),
+        'extend': '',
+        'cover': _value(meta, 'cover'),
+        'status': status,
+        'featured': _value(meta, 'featured').lower() in TRUE,
+        'category': category,
+        'category_slug': slugify(category)[:60],
+        'tags': _tags(meta),
+    }
+
+
+def render(items: list) -> list:
+    """ Adds the HTML to parsed files, in the worker processes of the import. """
+    for item in items:
+        item.update(renderer.render_entry(item, force=True))
+    return items
+
+
+def categories() -> dict:
+    return {category.slug: category for category in Category.objects.all()}
+
+
+def existing() -> set:
+    """ ``(category slug, slug)`` of the entries already in the database. """
+    return set(Entry.objects.values_list('category__slug', 'slug').iterator())
+
+
+def _tag_objects(names) -> dict:
+    """ The tags named ``names``, by lowercased name, created when missing. """
+    wanted = {name.lower(): name for name in names}
+    found = {
+        tag.lower: tag
+        for tag in Tag.objects.annotate(lower=Lower('name')).filter(lower__in=wanted)
+    }
+    missing = [name for lower, name in wanted.items() if lower not in found]
+    if missing:
+        Tag.objects.bulk_create([Tag(name=name, slug=Tag().slugify(name)) for name in missing], ignore_conflicts=True)
+        found.update({
+            tag.lower: tag
+            for tag in Tag.objects.annotate(lower=Lower('name')).filter(lower__in=[n.lower() for n in missing])
+        })
+        for name in missing:
+            if name.lower() not in found:
+                # Its slug is taken by another name: ``Tag.save`` finds a free one.
+                found[name.lower()] = Tag.objects.create(name=name)
+    return found
+
+
+def insert(items: list, author, known_categories: dict) -> int:
+    """
+    Inserts rendered files as entries with their tags in one transaction,
+    creating their missing categories. Returns the rows inserted.
+    """
+    content_type = ContentType.objects.get_for_model(Entry)
+    fields = {field.name for field in Entry._meta.concrete_fields}
+    with transaction.atomic():
+        for item in items:
+            if item['category_slug'] not in known_categories:
+                known_categories[item['category_slug']] = Category.objects.create(
+                    name=item['category'][:255], slug=item['category_slug']
+                )
+        entries = Entry.objects.bulk_create([
+            Entry(
+                author=author, category=known_categories[item['category_slug']],
+                **{name: value for name, value in item.items() if name in fields and name != 'category'}
+            )
+            for item in items
+        ])
+        tags = _tag_objects({name for item in items for name in item['tags']})
+        links = TaggedItem.objects.bulk_create([
+            TaggedItem(content_type=content_type, object_id=entry.pk, tag=tags[name.lower()])
+            for entry, item in zip(entries, items)
+            for name in item['tags']
+        ])
+    return len(entries) + len(links)
+
+
+def finish(started) -> None:
+    """
+    Builds what the save signals keep for each entry, for the whole archive
+    at once, and invalidates the pages that changed since ``started``. It
+    only looks at the database, so it may run again after an interrupted
+    import.
+    """
+    neighbours.rebuild(Entry)
+    archive.rebuild()
+    tagstats.rebuild()
+    search.rebuild()
+    related.refresh_pages(related.build())
+
+    tags = {'entries', 'featured', 'tags', cache.feed_tag()}
+    for slug in Category.objects.values_list('slug', flat=True):
+        tags.update((cache.category_tag(slug), cache.feed_tag(slug)))
+    for year, month in ArchiveMonth.objects.values_list('year', 'month'):
+        tags.update((cache.archive_tag(year, month), cache.sitemap_tag(year)))
+    tags.update(cache.tag_tag(slug) for slug in TagStat.objects.values_list('tag__slug', flat=True))
+    # The imported entries and the ones relinked to them.
+    changed = Entry.objects.filter(updated_at__gte=started).values_list('category__slug', 'slug')
+    tags.update(cache.entry_tag(category, slug) for category, slug in changed.iterator())
+    cache.invalidate(*tags)
+    export.schedule(everything=True)
@@ -0,0 +1,207 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.instrumentation
+# description: Per request SQL, template and cache metrics, query budgets
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import contextvars
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('blog.instrumentation')
+
+_metrics = contextvars.ContextVar('blog_metrics', default=None)
+
+
+class Metrics:
+    """ What a request cost, collected while it runs. """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.view = None
+        self.budget = None
+
+    @property
+    def total_time(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.queries > self.budget
+
+    def server_timing(self) -> str:
+        return ', '.join((
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ))
+
+    def as_dict(self) -> dict:
+        return {
+            'view': self.view,
+            'queries': self.queries,
+            'budget': self.budget,
+            'sql_ms': round(self.sql_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'total_ms': round(self.total_time * 1000, 2),
+        }
+
+
+def current():
+    """ The metrics of the running request, None outside a request. """
+    return _metrics.get()
+
+
+def cache_access(hit: bool) -> None:
+    metrics = _metrics.get()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+def _sql_timer(metrics):
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            metrics.sql_time += time.perf_counter() - started
+            metrics.queries += 1
+    return wrapper
+
+
+def _wrap_connections(metrics) -> ExitStack:
+    # Connections belong to a thread, wrap those of the thread running the ORM.
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(_sql_timer(metrics)))
+    return stack
+
+
+@contextmanager
+def _measuring(metrics):
+    token = _metrics.set(metrics)
+    try:
+        with _wrap_connections(metrics):
+            yield
+    finally:
+        _metrics.reset(token)
+
+
+def _log(request, response, metrics):
+    line = json.dumps({'path': request.path, 'status': response.status_code, **metrics.as_dict()})
+    if metrics.over_budget:
+        logger.warning(line)
+    else:
+        logger.info(line)
+
+
+def query_budget(queries: int):
+    """
+    Declares the most queries a view may run with cold caches. The budget
+    is logged by ``InstrumentationMiddleware`` and checked by the tests.
+    Works on view functions and on class based views.
+    """
+    def decorator(view):
+        view.query_budget = queries
+        return view
+    return decorator
+
+
+def budget_of(view_func):
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None:
+        budget = getattr(getattr(view_func, 'view_class', None), 'query_budget', None)
+    return budget
+
+
+class InstrumentationMiddleware:
+    """
+    Counts the SQL queries and their time, the template render time and the
+    blog cache hits of every request. They are sent in the ``Server-Timing``
+    header when ``BLOG_SERVER_TIMING`` is set and logged as a JSON line to
+    ``blog.instrumentation``, as a warning when the view exceeds its budget.
+    Under ASGI the queries are counted on the thread Django runs the ORM
+    of the request on.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = request.metrics = Metrics()
+        with _measuring(metrics):
+            response = self.get_response(request)
+        return self._finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = request.metrics = Metrics()
+        token = _metrics.set(metrics)
+        try:
+            stack = await sync_to_async(_wrap_connections)(metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _metrics.reset(token)
+        return self._finish(request, response, metrics)
+
+    def _finish(self, request, response, metrics):
+        if settings.BLOG_SERVER_TIMING:
+            response['Server-Timing'] = metrics.server_timing()
+        if response.streaming:
+            # The queries of a streamed body run while it is sent, they are
+            # logged once it is done but can't reach the header.
+            response.streaming_content = self._stream(request, response, metrics, response.streaming_content)
+        else:
+            _log(request, response, metrics)
+        return response
+
+    @staticmethod
+    def _stream(request, response, metrics, content):
+        with _measuring(metrics):
+            yield from content
+        _log(request, response, metrics)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = request.metrics
+        view = getattr(view_func, 'view_class', view_func)
+        metrics.view = f'{view.__module__}.{getattr(view, "__qualname__", type(view).__qualname__)}'
+        metrics.budget = budget_of(view_func)
+
+    def process_template_response(self, request, response):
+        # Called right before the response is rendered.
+        started = time.perf_counter()
+
+        def rendered(response):
+            request.metrics.template_time += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
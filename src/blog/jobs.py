@@ -0,0 +1,182 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.jobs
+# description: Database backed job queue, run by manage.py run_jobs
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import cache, export, search
+from .models import Entry, Job
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+# A job running longer than this is taken to belong to a worker that died.
+LOCK_TIMEOUT = timedelta(minutes=10)
+# Seconds between polls of an empty queue.
+POLL_INTERVAL = 1.0
+
+# The fields of an entry the Markdown is rendered from.
+SOURCE_FIELDS = ('summary', 'body', 'extend')
+
+HANDLERS = {}
+
+
+def handler(kind: str):
+    """ Registers the function that runs the jobs of ``kind``. """
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def merge(payload: dict, update: dict) -> dict:
+    """ Lists are joined without repeats, anything else is replaced. """
+    merged = dict(payload)
+    for name, value in update.items():
+        if isinstance(value, list) and isinstance(merged.get(name), list):
+            value = sorted(set(merged[name]) | set(value))
+        merged[name] = value
+    return merged
+
+
+def backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(2 ** attempts * 5, 3600))
+
+
+def enqueue(kind: str, key: str, payload=None) -> Job:
+    """
+    Queues a job in the current transaction, so it runs only if the caller
+    commits. A pending job with the same ``key`` absorbs the new payload.
+    """
+    payload = payload or {}
+    with transaction.atomic():
+        job = Job.objects.select_for_update().filter(key=key, status=Job.PENDING).first()
+        if job is None:
+            try:
+                with transaction.atomic():
+                    return Job.objects.create(kind=kind, key=key, payload=payload)
+            except IntegrityError:
+                # Queued by a concurrent save in the meantime.
+                job = Job.objects.select_for_update().get(key=key, status=Job.PENDING)
+        job.payload = merge(job.payload, payload)
+        job.run_after = timezone.now()
+        job.save(update_fields=['payload', 'run_after'])
+    return job
+
+
+def claim():
+    """ Locks the next job due, or one left running by a dead worker. """
+    now = timezone.now()
+    due = Job.objects\
+        .filter(Q(status=Job.PENDING, run_after__lte=now) | Q(status=Job.RUNNING, locked_until__lt=now))\
+        .order_by('run_after', 'pk')
+    for job in due[:10]:
+        taken = Job.objects\
+            .filter(pk=job.pk, status=job.status, locked_until=job.locked_until)\
+            .update(status=Job.RUNNING, locked_until=now + LOCK_TIMEOUT, attempts=F('attempts') + 1)
+        if taken:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def _retry(job, error: str) -> None:
+    job.last_error = error
+    if job.attempts >= MAX_ATTEMPTS:
+        job.status = Job.FAILED
+        job.save(update_fields=['status', 'last_error'])
+        return
+    job.status = Job.PENDING
+    job.run_after = timezone.now() + backoff(job.attempts)
+    try:
+        with transaction.atomic():
+            job.save(update_fields=['status', 'run_after', 'last_error'])
+    except IntegrityError:
+        # Queued again while it ran: the pending one takes over its payload.
+        enqueue(job.kind, job.key, job.payload)
+        job.delete()
+
+
+def run(job) -> bool:
+    """ Runs a claimed job; it is deleted once done, retried on errors. """
+    try:
+        with transaction.atomic():
+            HANDLERS[job.kind](**job.payload)
+    except Exception:   # pylint: disable=W0703
+        logger.exception('Job %s failed, attempt %s', job, job.attempts)
+        _retry(job, traceback.format_exc())
+        return False
+    job.delete()
+    return True
+
+
+def work(once=False, limit=None, stdout=None) -> int:
+    """ Runs jobs until the queue is empty if ``once``, forever otherwise. """
+    done = 0
+    while limit is None or done < limit:
+        job = claim()
+        if job is None:
+            if once:
+                break
+            time.sleep(POLL_INTERVAL)
+            continue
+        ok = run(job)
+        done += 1
+        if stdout is not None:
+            stdout.write(f"{'done' if ok else 'failed'}: {job}")
+    return done
+
+
+def publish(entry, tags=(), urls=(), removed=()) -> Job:
+    """
+    Queues the render of ``entry`` and the cache invalidation and export of
+    the pages it changed, see ``signals.entry_post_save``.
+    """
+    return enqueue('publish_entry', f'entry:{entry.pk}', {
+        'pk': entry.pk, 'tags': sorted(tags), 'urls': sorted(urls), 'removed': sorted(removed),
+    })
+
+
+@handler('publish_entry')
+def publish_entry(pk, tags=(), urls=(), removed=()):
+    entry = Entry.objects.select_related('category').filter(pk=pk).first()
+    if entry is not None and entry.rendering:
+        source = {field: getattr(entry, field) for field in SOURCE_FIELDS}
+        changes = entry.render()
+        fields = {field: getattr(entry, field) for field in changes}
+        if changes:
+            fields['updated_at'] = timezone.now()
+        # Only written if the source is still the one rendered, other
+        # updates of the row meanwhile do not matter.
+        updated = Entry.objects\
+            .filter(pk=pk, **source)\
+            .update(rendering=False, **fields)
+        if updated:
+            entry.__dict__.update(fields)
+            search.index_entry(entry)
+            tags = set(tags) | {cache.entry_tag(entry.category.slug, entry.slug)}
+        elif Entry.objects.filter(pk=pk, rendering=True).exists():
+            # Edited while rendering: the new source is rendered again.
+            enqueue('publish_entry', f'entry:{pk}', {
+                'pk': pk, 'tags': sorted(tags), 'urls': sorted(urls), 'removed': sorted(removed),
+            })
+            return
+    cache.invalidate(*tags)
+    export.schedule(urls, removed)
+
+
+@handler('export_pages')
+def export_pages(urls=(), everything=False):
+    export.export_pages(urls, everything)
@@ -0,0 +1,122 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.management.commands.benchmark
+# description: Generates a synthetic corpus and times the public views
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment
+
+from blog.benchmarks import corpus, load, plans, runner
+from blog.models import Entry
+
+
+def size(value: str) -> int:
+    return corpus.SIZES.get(value) or int(value)
+
+
+class Command(BaseCommand):
+    help = (
+        'Times the public views against the database in DATABASE_URL. Point it at a '
+        'scratch SQLite or PostgreSQL database, --generate fills it with a synthetic corpus.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--generate', type=size, metavar='SIZE',
+                            help='Generate a corpus of 1k, 10k, 100k or any number of entries first.')
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete the entries and categories already in the database before generating.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the corpus and of the samples.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Rendering processes used to generate the corpus.')
+        parser.add_argument('--explain', action='store_true',
+                            help='Check the query plans of the hot queries instead of timing the views.')
+        parser.add_argument('--load', action='store_true',
+                            help='Compare the sync and the async views under concurrent load instead.')
+        parser.add_argument('--requests', type=int, default=300, help='Requests sent by --load.')
+        parser.add_argument('--concurrency', type=int, default=30,
+                            help='Requests of each --load burst, all sent at once.')
+        parser.add_argument('--server-workers', type=int, default=3,
+                            help='Workers serving the --load bursts, blog.service runs 3.')
+        parser.add_argument('--runs', type=int, default=50, help='Timed runs per scenario.')
+        parser.add_argument('--warm', action='store_true', help='Keep the caches between runs.')
+        parser.add_argument('--baseline', help='JSON file with the results to compare with.')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Write the results to --baseline instead of comparing.')
+        parser.add_argument('--tolerance', type=float, default=runner.TOLERANCE,
+                            help='How much a p90 may grow over the baseline, 0.25 is 25%%.')
+
+    def handle(self, *args, **options):
+        if options['save_baseline'] and not options['baseline']:
+            raise CommandError('--save-baseline needs --baseline.')
+
+        if options['generate']:
+            if Entry.objects.exists():
+                if not options['replace']:
+                    raise CommandError('The database already has entries, pass --replace to delete them.')
+                corpus.clear()
+            started = time.monotonic()
+            corpus.generate(options['generate'], options['seed'], options['workers'], stdout=self.stdout)
+            self.stdout.write(f"Corpus of {options['generate']} entries in {time.monotonic() - started:.1f}s")
+
+        if options['explain']:
+            if not plans.supported(connection.vendor):
+                raise CommandError(
+                    f"Query plans of {connection.vendor} are not checked, only {', '.join(plans.PATTERNS)}."
+                )
+            failures = plans.check()
+            for name, found in failures.items():
+                self.stdout.write(self.style.ERROR(name))
+                for problem in found:
+                    self.stdout.write(f'  {problem}')
+            if failures:
+                raise CommandError(f'{len(failures)} hot queries scan or sort the entries.')
+            self.stdout.write(self.style.SUCCESS('Every hot query reads the entries through an index'))
+            return
+
+        # Lets the test client in, whatever ALLOWED_HOSTS says.
+        setup_test_environment()
+        if options['load']:
+            results = load.run(
+                options['requests'], options['concurrency'], options['server_workers'], options['warm'],
+            )
+            self.stdout.write(f"{'views':<16}{'req/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+            for name, result in results.items():
+                self.stdout.write(
+                    f"{name:<16}{result['rps']:>10.1f}{result['p50']:>10.1f}{result['p90']:>10.1f}{result['p99']:>10.1f}"
+                )
+            return
+
+        entries = Entry.objects.count()
+        results = runner.run(options['runs'], options['warm'], seed=options['seed'])
+        self.report(results)
+
+        current = {'entries': entries, 'warm': options['warm'], 'scenarios': results}
+        if options['baseline'] and options['save_baseline']:
+            runner.save(current, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+        elif options['baseline']:
+            baseline = runner.load(options['baseline'])
+            if (baseline['entries'], baseline['warm']) != (entries, options['warm']):
+                raise CommandError(
+                    f"The baseline is of {baseline['entries']} entries{' warm' if baseline['warm'] else ''}, "
+                    f"this run of {entries}{' warm' if options['warm'] else ''}."
+                )
+            regressions = runner.compare(results, baseline['scenarios'], options['tolerance'])
+            if regressions:
+                raise CommandError('Regressions against the baseline:\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+
+    def report(self, results):
+        self.stdout.write(f"{'scenario':<16}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'queries':>9}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<16}{result['p50']:>10.1f}{result['p90']:>10.1f}{result['p99']:>10.1f}{result['queries']:>9}"
+            )
@@ -0,0 +1,25 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.management.commands.build_related
+# description: Computes the related entries of every LIVE entry
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import related
+
+
+class Command(BaseCommand):
+    help = 'Computes the related entries of every LIVE entry by tag and category similarity.'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        changed = related.build()
+        related.refresh_pages(changed)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'{len(changed)} related lists changed in {elapsed:.1f}s'))
@@ -0,0 +1,56 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.management.commands.export_site
+# description: Full static export of the public pages
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from blog import export, renderer
+
+
+class Command(BaseCommand):
+    help = 'Exports every public page as static HTML for nginx.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--root', help='Document root, defaults to STATIC_EXPORT_ROOT.')
+        parser.add_argument('--host', help='Host name used to render, defaults to STATIC_EXPORT_HOST.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Rendering processes; 1 renders in this process.')
+        parser.add_argument('--chunk-size', type=int, default=100, help='Pages per chunk.')
+
+    def handle(self, *args, **options):
+        root = options['root'] or settings.STATIC_EXPORT_ROOT
+        if not root:
+            raise CommandError('Set STATIC_EXPORT_ROOT or pass --root.')
+        host = options['host'] or settings.STATIC_EXPORT_HOST
+
+        started = time.monotonic()
+        urls = list(export.all_urls())
+        chunk_size = options['chunk_size']
+        chunks = [urls[i:i + chunk_size] for i in range(0, len(urls), chunk_size)]
+
+        if options['workers'] > 1 and len(chunks) > 1:
+            connections.close_all()
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(options['workers'], mp_context=context,
+                                     initializer=renderer.setup_worker) as executor:
+                written = sum(executor.map(export.export_urls, chunks, [root] * len(chunks), [host] * len(chunks)))
+        else:
+            written = export.export_urls(urls, root, host)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{written} of {len(urls)} pages exported to {root} in {elapsed:.1f}s '
+            f'({len(urls) / elapsed if elapsed else 0:.0f} pages/s)'
+        ))
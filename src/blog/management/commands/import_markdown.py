@@ -0,0 +1,124 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.management.commands.import_markdown
+# description: Bulk import of a tree of Markdown files with front matter
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from blog import importer, renderer
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports a directory tree of Markdown files with title, date, category and tags front matter. '
+        'Entries already imported, by category and slug, are skipped, so an interrupted import '
+        'continues where it stopped when run again.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Directory with the .md files, read recursively.')
+        parser.add_argument('--author', required=True, help='Email of the user the entries belong to.')
+        parser.add_argument('--category', default='', help='Category of the files without one.')
+        parser.add_argument('--status', choices=sorted(importer.STATUSES), default='live',
+                            help='Status of the files without one.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Rendering processes; 1 renders in this process.')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Entries per transaction.')
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(options['path']):
+            raise CommandError(f"Not a directory: {options['path']}")
+        try:
+            self.author = get_user_model().objects.get(email=options['author'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with the email {options['author']}")
+        self.default_category = options['category']
+        self.default_status = importer.STATUSES[options['status']]
+
+        self.categories = importer.categories()
+        self.known = importer.existing()
+        self.imported = self.rows = self.skipped = self.failed = 0
+        self.started = timezone.now()
+        self.clock = time.monotonic()
+
+        chunks = self.chunked(self.parsed(options['path']), options['chunk_size'])
+        if options['workers'] > 1:
+            self.render_parallel(chunks, options['workers'])
+        else:
+            for chunk in chunks:
+                self.write(importer.render(chunk))
+
+        elapsed = time.monotonic() - self.clock
+        self.stdout.write(self.style.SUCCESS(
+            f'{self.imported} entries imported, {self.skipped} already there, {self.failed} failed '
+            f'in {elapsed:.1f}s ({self.rows / elapsed if elapsed else 0:.0f} rows/s)'
+        ))
+        self.stdout.write('Rebuilding links, archive, search index and related entries...')
+        importer.finish(self.started)
+
+    def parsed(self, root):
+        """ The files not imported yet, parsed, as they are found. """
+        for path in importer.files(root):
+            try:
+                item = importer.parse(path, self.default_category, self.default_status)
+            except ValueError as e:
+                self.failed += 1
+                self.stderr.write(f'{path}: {e}')
+                continue
+            key = (item['category_slug'], item['slug'])
+            if key in self.known:
+                self.skipped += 1
+                continue
+            # Two files with the same key: the first one wins.
+            self.known.add(key)
+            yield item
+
+    def render_parallel(self, chunks, workers):
+        # Rendering processes are spawned fresh, so they never share the
+        # database connection of this process.
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=renderer.setup_worker) as executor:
+            pending = set()
+            for chunk in chunks:
+                pending.add(executor.submit(importer.render, chunk))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.write(future.result())
+            for future in pending:
+                self.write(future.result())
+
+    def write(self, items):
+        self.rows += importer.insert(items, self.author, self.categories)
+        self.imported += len(items)
+        elapsed = time.monotonic() - self.clock
+        self.stdout.write(
+            f'{self.imported} entries, {self.skipped} skipped, {self.failed} failed, '
+            f'{self.imported / elapsed if elapsed else 0:.0f} entries/s, '
+            f'{self.rows / elapsed if elapsed else 0:.0f} rows/s',
+            ending='\r' if self.stdout.isatty() else '\n'
+        )
+
+    @staticmethod
+    def chunked(rows, size):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
@@ -0,0 +1,27 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.management.commands.rebuild_search_index
+# description: Indexes every entry for the built in search
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import search
+
+
+class Command(BaseCommand):
+    help = 'Indexes the entries whose text changed since they were last indexed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Index every entry, changed or not.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        indexed = search.rebuild(force=options['force'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'{indexed} entries indexed in {elapsed:.1f}s'))
@@ -0,0 +1,157 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.management.commands.rerender_entries
+# description: Bulk regeneration of the HTML rendered from Markdown
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from django.urls import reverse
+from django.utils.dateparse import parse_date
+
+from blog import cache, export, highlight, renderer, search
+from blog.models import Entry, Category
+
+
+class Command(BaseCommand):
+    help = 'Re-renders the Markdown fields of entries and categories.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only entries published on or after this date (YYYY-MM-DD).')
+        parser.add_argument('--category', help='Only entries of the category with this slug.')
+        parser.add_argument('--dry-run', action='store_true', help='Render but do not write anything.')
+        parser.add_argument('--force', action='store_true', help='Render even when the source hash matches.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Rendering processes; 1 renders in this process.')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Entries per chunk.')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.force = options['force']
+
+        entries = Entry.objects.order_by('pk')
+        categories = Category.objects.order_by('pk')
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError(f"Invalid date for --since: {options['since']}")
+            entries = entries.filter(pub_date__date__gte=since)
+        if options['category']:
+            entries = entries.filter(category__slug=options['category'])
+            categories = categories.filter(slug=options['category'])
+
+        self.written = set()
+        changed_categories = self.render_categories(categories)
+
+        started = time.monotonic()
+        self.seen = self.changed = 0
+        rows = entries.values('pk', *Entry.RENDERED_FIELDS).iterator(chunk_size=options['chunk_size'])
+        chunks = self.chunked(rows, options['chunk_size'])
+        if options['workers'] > 1:
+            self.render_parallel(chunks, options['workers'])
+        else:
+            for chunk in chunks:
+                self.write(renderer.render_entries(chunk, self.force), len(chunk), started)
+            stats = highlight.stats()
+            self.stdout.write(
+                f"Code blocks: {stats['memory_hits']} from memory, {stats['table_hits']} from the table, "
+                f"{stats['misses']} highlighted"
+            )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{self.seen} entries checked, {self.changed} '
+            f'{"would change" if self.dry_run else "updated"} in {elapsed:.1f}s '
+            f'({self.seen / elapsed if elapsed else 0:.0f} entries/s)'
+        ))
+        if not self.dry_run:
+            self.publish(changed_categories, options['chunk_size'])
+
+    def render_categories(self, categories):
+        changed = []
+        for category in categories.iterator():
+            if category.render(force=self.force):
+                category.updated_at = timezone.now()
+                changed.append(category)
+        if changed and not self.dry_run:
+            Category.objects.bulk_update(changed, ['description_html', 'description_hash', 'updated_at'])
+        self.stdout.write(f'{len(changed)} categories {"would change" if self.dry_run else "updated"}')
+        return changed
+
+    def render_parallel(self, chunks, workers):
+        # Rendering processes are spawned fresh, so they never share the
+        # database connection this process is streaming rows through.
+        connections.close_all()
+        started = time.monotonic()
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=renderer.setup_worker) as executor:
+            pending = {}
+            for chunk in chunks:
+                future = executor.submit(renderer.render_entries, chunk, self.force)
+                pending[future] = len(chunk)
+                if len(pending) >= workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.write(future.result(), pending.pop(future), started)
+            for future in list(pending):
+                self.write(future.result(), pending.pop(future), started)
+
+    def write(self, rendered, size, started):
+        self.seen += size
+        self.changed += len(rendered)
+        if rendered and not self.dry_run:
+            now = timezone.now()
+            Entry.objects.bulk_update(
+                [Entry(pk=pk, updated_at=now, **fields) for pk, fields in rendered],
+                list(renderer.ENTRY_HTML_FIELDS) + ['updated_at']
+            )
+            self.written.update(pk for pk, _ in rendered)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{self.seen} entries, {self.changed} changed, '
+            f'{self.seen / elapsed if elapsed else 0:.0f} entries/s',
+            ending='\r' if self.stdout.isatty() else '\n'
+        )
+
+    def publish(self, categories, size):
+        """
+        What the save signals do for each entry and category, which
+        ``bulk_update`` skips: invalidates their pages, reindexes the entries
+        and exports the pages.
+        """
+        tags, urls = set(), set()
+        if categories:
+            tags.add('categories')
+            urls.add(reverse('blog:category_list'))
+        for category in categories:
+            tags.add(cache.category_tag(category.slug))
+            urls.add(category.get_absolute_url())
+        pks = sorted(self.written)
+        for start in range(0, len(pks), size):
+            for entry in Entry.objects.select_related('category').filter(pk__in=pks[start:start + size]):
+                search.index_entry(entry)
+                tags |= cache.entry_tags(entry, ()) | cache.feed_tags(entry)
+                if entry.status == Entry.LIVE_STATUS:
+                    urls |= export.entry_pages(entry, ()) | {entry.get_absolute_url()}
+        cache.invalidate(*tags)
+        export.schedule(urls)
+
+    @staticmethod
+    def chunked(rows, size):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
@@ -0,0 +1,36 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.management.commands.run_jobs
+# description: Worker of the database job queue
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog import jobs
+from blog.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Runs the queued jobs: renders, cache invalidations and exports left by the admin saves.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty.')
+        parser.add_argument('--limit', type=int, help='Exit after running this many jobs.')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Queue the jobs that ran out of attempts again first.')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            retried = 0
+            for job in Job.objects.filter(status=Job.FAILED):
+                jobs.enqueue(job.kind, job.key, job.payload)
+                job.delete()
+                retried += 1
+            self.stdout.write(f'{retried} failed jobs queued again')
+        done = jobs.work(once=options['once'], limit=options['limit'], stdout=self.stdout)
+        pending = Job.objects.filter(status=Job.PENDING, run_after__lte=timezone.now()).count()
+        self.stdout.write(self.style.SUCCESS(f'{done} jobs run, {pending} due'))
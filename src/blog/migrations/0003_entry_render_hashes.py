@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_alter_entry_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='description_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='body_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='extend_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='summary_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+LIVE_STATUS = 1
+
+
+def link_entries(apps, schema_editor):
+    Entry = apps.get_model('blog', 'Entry')
+    rows = list(Entry.objects.order_by('pub_date', 'id').values_list('pk', 'status'))
+    links = {}
+    last_live = None
+    for pk, status in rows:
+        links[pk] = [last_live, None]
+        if status == LIVE_STATUS:
+            last_live = pk
+    last_live = None
+    for pk, status in reversed(rows):
+        links[pk][1] = last_live
+        if status == LIVE_STATUS:
+            last_live = pk
+    Entry.objects.bulk_update(
+        [Entry(pk=pk, previous_entry_id=p, next_entry_id=n) for pk, (p, n) in links.items()],
+        ['previous_entry', 'next_entry'],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_entry_render_hashes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entry',
+            name='next_entry',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='blog.entry'),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='previous_entry',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='blog.entry'),
+        ),
+        migrations.RunPython(link_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+import uuid
+
+LIVE_STATUS = 1
+
+
+def count_months(apps, schema_editor):
+    Entry = apps.get_model('blog', 'Entry')
+    ArchiveMonth = apps.get_model('blog', 'ArchiveMonth')
+    counts = {}
+    for pub_date in Entry.objects.filter(status=LIVE_STATUS).values_list('pub_date', flat=True).iterator():
+        published = timezone.localtime(pub_date) if settings.USE_TZ else pub_date
+        key = (published.year, published.month)
+        counts[key] = counts.get(key, 0) + 1
+    ArchiveMonth.objects.bulk_create([
+        ArchiveMonth(year=year, month=month, count=count) for (year, month), count in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_entry_neighbours'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idx', models.UUIDField(default=uuid.uuid4, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Mes del archivo',
+                'verbose_name_plural': 'Meses del archivo',
+                'ordering': ['-year', '-month'],
+                'unique_together': {('year', 'month')},
+            },
+        ),
+        migrations.RunPython(count_months, migrations.RunPython.noop),
+    ]
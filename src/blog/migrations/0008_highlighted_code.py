@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_related_entries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HighlightedCode',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('html', models.TextField()),
+            ],
+            options={
+                'verbose_name': 'Bloque de código',
+                'verbose_name_plural': 'Bloques de código',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+from django.template.defaultfilters import striptags, truncatechars_html
+
+EXCERPT_LENGTH = 186
+
+
+def fill_excerpts(apps, schema_editor):
+    Entry = apps.get_model('blog', 'Entry')
+    batch = []
+    for entry in Entry.objects.only('summary', 'body_html').iterator(chunk_size=500):
+        if entry.summary:
+            entry.excerpt = striptags(entry.summary)
+        else:
+            entry.excerpt = striptags(truncatechars_html(entry.body_html, EXCERPT_LENGTH))
+        batch.append(entry)
+        if len(batch) == 500:
+            Entry.objects.bulk_update(batch, ['excerpt'])
+            batch = []
+    Entry.objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_highlighted_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entry',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_entry_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(condition=models.Q(('status', 1)), fields=['-pub_date', '-id'], name='entry_live_date'),
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(condition=models.Q(('status', 1)), fields=['featured', '-pub_date', '-id'], name='entry_live_featured_date'),
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(condition=models.Q(('status', 1)), fields=['category', '-pub_date', '-id'], name='entry_live_category_date'),
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(condition=models.Q(('featured', True)), fields=['-pub_date', '-id'], name='entry_featured_date'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+LIVE_STATUS = 1
+
+
+def count_tags(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Entry = apps.get_model('blog', 'Entry')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    TagStat = apps.get_model('blog', 'TagStat')
+    content_type = ContentType.objects.filter(app_label='blog', model='entry').first()
+    if content_type is None:
+        return
+    dates = dict(Entry.objects.filter(status=LIVE_STATUS).values_list('pk', 'pub_date').iterator())
+    stats = {}
+    for tag, entry in TaggedItem.objects.filter(content_type=content_type).values_list('tag', 'object_id').iterator():
+        if entry in dates:
+            count, latest = stats.get(tag, (0, dates[entry]))
+            stats[tag] = (count + 1, max(latest, dates[entry]))
+    TagStat.objects.bulk_create([
+        TagStat(tag_id=tag, count=count, latest=latest) for tag, (count, latest) in stats.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_job_queue'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0005_auto_20220424_2025'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idx', models.UUIDField(default=uuid.uuid4, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('latest', models.DateTimeField()),
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stat', to='taggit.tag')),
+            ],
+            options={
+                'verbose_name': 'Uso de una etiqueta',
+                'verbose_name_plural': 'Uso de las etiquetas',
+                'ordering': ['-count', 'tag__name'],
+                'indexes': [models.Index(fields=['-count'], name='tagstat_count')],
+            },
+        ),
+        migrations.RunPython(count_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_featured_index_live'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(condition=models.Q(('featured', False), ('status', 1)), fields=['-pub_date', '-id'], name='entry_regular_date'),
+        ),
+    ]
@@ -8,35 +8,23 @@
 #     licence: MIT
 #      python: 3.10
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 
-import markdown
 from django.db import models
-from django.template.defaultfilters import truncatechars_html, striptags, safe
+from django.db.models import Q
+from django.template.defaultfilters import safe
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 from taggit.managers import TaggableManager
+from taggit.models import Tag
 from django.utils.timezone import make_aware
 import pytz
 from django.conf import settings
 
-
-MD_EXTENSIONS = [
-    'markdown.extensions.codehilite',
-    'markdown.extensions.meta',
-    'markdown.extensions.abbr',
-    'markdown.extensions.attr_list',
-    'markdown.extensions.def_list',
-    'markdown.extensions.fenced_code',
-    'markdown.extensions.footnotes',
-    'markdown.extensions.tables',
-    'markdown.extensions.admonition',
-    'markdown.extensions.sane_lists',
-    'markdown.extensions.extra',
-    'markdown.extensions.smarty',
-    'markdown.extensions.toc',
-]
+from . import renderer
+from .renderer import MD_EXTENSIONS  # noqa: F401
 
 
 class Traceability(models.Model):
@@ -64,6 +52,7 @@ class Category(Traceability):
     icon = models.CharField(max_length=20, blank=True, null=True)
     description = models.TextField(_('Description'), blank=True, null=True)
     description_html = models.TextField(editable=False, blank=True, null=True)
+    description_hash = models.CharField(max_length=40, editable=False, blank=True, default='')
 
     class Meta:
         ordering = ['slug']
@@ -71,13 +60,18 @@ class Category(Traceability):
         verbose_name_plural = _('Categories')
 
     def save(self, force_insert=False, force_update=False, **kwargs):
-        if self.description:
-            self.description_html = markdown.markdown(
-                self.description,
-                output_format='html',
-                extensions=MD_EXTENSIONS
-            )
-        super(Category, self).save(force_insert, force_update)
+        self.render()
+        super(Category, self).save(force_insert, force_update, **kwargs)
+
+    def render(self, force=False) -> list:
+        changes = renderer.render_category({
+            'description': self.description,
+            'description_html': self.description_html,
+            'description_hash': self.description_hash,
+        }, force=force)
+        for field, value in changes.items():
+            setattr(self, field, value)
+        return list(changes)
 
     def __str__(self) -> str:
         return self.name
@@ -98,6 +92,11 @@ class Entry(Traceability):
         (DRAFT_STATUS, 'Draft'),
         (HIDDEN_STATUS, 'Hidden'),
     )
+    RENDERED_FIELDS = (
+        'summary', 'body', 'extend',
+        'summary_html', 'summary_meta', 'body_html', 'extend_html', 'excerpt',
+        'summary_hash', 'body_hash', 'extend_hash',
+    )
 
     # Main fields
     title = models.CharField(_('Title'), max_length=250)
@@ -111,6 +110,13 @@ class Entry(Traceability):
     summary_meta = models.TextField(editable=False, blank=True)
     body_html = models.TextField(editable=False, blank=True)
     extend_html = models.TextField(editable=False, blank=True)
+    # Plain text shown in the lists, see renderer.excerpt
+    excerpt = models.TextField(editable=False, blank=True)
+
+    # Hashes of the Markdown sources last rendered into the HTML fields
+    summary_hash = models.CharField(max_length=40, editable=False, blank=True, default='')
+    body_hash = models.CharField(max_length=40, editable=False, blank=True, default='')
+    extend_hash = models.CharField(max_length=40, editable=False, blank=True, default='')
 
     # Metadata
     enable_comments = models.BooleanField(default=True)
@@ -118,11 +124,23 @@ class Entry(Traceability):
     slug = models.SlugField(unique_for_date='pub_date')
     status = models.IntegerField(choices=STATUS_CHOICES, default=LIVE_STATUS)
     featured = models.BooleanField(default=False)
+    # The HTML is behind the Markdown until blog.jobs renders it
+    rendering = models.BooleanField(_('Publishing'), default=False, editable=False)
 
     # Taxonomy
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='entry_category')
     tags = TaggableManager(blank=True)
 
+    # Chronological neighbours among the LIVE entries, kept by blog.neighbours
+    previous_entry = models.ForeignKey(
+        'self', null=True, blank=True, editable=False,
+        on_delete=models.SET_NULL, related_name='+'
+    )
+    next_entry = models.ForeignKey(
+        'self', null=True, blank=True, editable=False,
+        on_delete=models.SET_NULL, related_name='+'
+    )
+
     # Authoring metadata
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -137,38 +155,45 @@ class Entry(Traceability):
         ordering = ['-pub_date', '-id', ]
         unique_together = ('slug', 'category')
         get_latest_by = 'pub_date'
+        # The lists walk the LIVE (status=1) entries in the site order, see blog.benchmarks.plans.
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'], condition=Q(status=1), name='entry_live_date'),
+            models.Index(fields=['featured', '-pub_date', '-id'], condition=Q(status=1), name='entry_live_featured_date'),
+            models.Index(fields=['category', '-pub_date', '-id'], condition=Q(status=1), name='entry_live_category_date'),
+            models.Index(fields=['-pub_date', '-id'], condition=Q(featured=True, status=1), name='entry_featured_date'),
+            models.Index(fields=['-pub_date', '-id'], condition=Q(featured=False, status=1), name='entry_regular_date'),
+        ]
 
     def __str__(self) -> str:
         return self.title
 
-    def save(self, force_insert=False, force_update=False, **kwargs) -> None:
-
-        self.body_html = markdown.markdown(
-            self.body,
-            output_format='html',
-            extensions=MD_EXTENSIONS
-        )
-        if self.summary:
-            self.summary_html = markdown.markdown(
-                self.summary,
-                output_format='html',
-                extensions=MD_EXTENSIONS
-            )
-            self.summary_meta = safe(striptags(self.summary_html))
+    def save(self, force_insert=False, force_update=False, render=True, **kwargs) -> None:
+        """
+        With ``render=False`` the Markdown is left to ``blog.jobs`` and a stale
+        entry is saved with ``rendering`` set, see ``EntryAdmin.save_model``.
+        An entry that was never rendered has no HTML to show meanwhile, it is
+        always rendered here.
+        """
+        if render or not self.body_hash:
+            self.render()
+            self.rendering = False
         else:
-            self.summary_html = safe(truncatechars_html(self.body_html, 250))
-            self.summary_meta = striptags(self.summary_html)
-        if self.extend:
-            self.extend_html = markdown.markdown(
-                self.extend,
-                output_format='html',
-                extensions=MD_EXTENSIONS
-            )
+            self.rendering = self.rendering or renderer.is_stale({
+                field: getattr(self, field) for field in self.RENDERED_FIELDS
+            })
         if not self.slug:
             self.slug = slugify(self.title)
         if self.pub_date.tzinfo is None or self.pub_date.tzinfo.utcoffset(self.pub_date) is None:
             self.pub_date = make_aware(self.pub_date, pytz.timezone('Mexico/General'))
-        super(Entry, self).save(force_insert, force_update)
+        super(Entry, self).save(force_insert, force_update, **kwargs)
+
+    def render(self, force=False) -> list:
+        changes = renderer.render_entry({
+            field: getattr(self, field) for field in self.RENDERED_FIELDS
+        }, force=force)
+        for field, value in changes.items():
+            setattr(self, field, value)
+        return list(changes)
 
     def get_absolute_url(self) -> str:
         return reverse(
@@ -177,22 +202,13 @@ class Entry(Traceability):
         )
 
     def resumen(self):
-        if self.summary:
-            return safe(striptags(self.summary))
-        else:
-            return safe(striptags(truncatechars_html(self.body_html, 186)))
+        return safe(self.excerpt)
 
     def siguiente(self):
-        try:
-            return self.get_next_by_pub_date()
-        except self.DoesNotExist:
-            return None
+        return self.next_entry
 
     def anterior(self):
-        try:
-            return self.get_previous_by_pub_date()
-        except self.DoesNotExist:
-            return None
+        return self.previous_entry
 
     def imagen(self):
         if self.cover:
@@ -205,3 +221,149 @@ class Entry(Traceability):
         for tag in self.tags.all():
             tags.append(str(tag))
         return tags
+
+
+class ArchiveMonth(Traceability):
+    """
+    Number of LIVE entries published in a month, kept by ``blog.archive``.
+    Months without LIVE entries have no row.
+    """
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'Meses del archivo'
+        verbose_name = 'Mes del archivo'
+        ordering = ['-year', '-month']
+        unique_together = ('year', 'month')
+
+    def __str__(self) -> str:
+        return f'{self.year}-{self.month:02d}'
+
+    def first_day(self) -> date:
+        return date(self.year, self.month, 1)
+
+    def get_absolute_url(self) -> str:
+        return reverse('blog:archive_month', kwargs={'year': self.year, 'month': self.month})
+
+
+class TagStat(Traceability):
+    """
+    Number of LIVE entries with a tag and the date of the newest, kept by
+    ``blog.tagstats``. Tags without LIVE entries have no row.
+    """
+    tag = models.OneToOneField(Tag, related_name='stat', on_delete=models.CASCADE)
+    count = models.PositiveIntegerField(default=0)
+    latest = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = 'Uso de las etiquetas'
+        verbose_name = 'Uso de una etiqueta'
+        ordering = ['-count', 'tag__name']
+        indexes = [models.Index(fields=['-count'], name='tagstat_count')]
+
+    def __str__(self) -> str:
+        return f'{self.tag} ({self.count})'
+
+    def get_absolute_url(self) -> str:
+        return reverse('blog:tag', kwargs={'slug': self.tag.slug})
+
+
+class SearchDocument(models.Model):
+    """ An entry in the search index, kept by ``blog.search``. """
+    entry = models.OneToOneField(Entry, primary_key=True, related_name='search_document', on_delete=models.CASCADE)
+    length = models.PositiveIntegerField(default=0)
+    text_hash = models.CharField(max_length=40, default='')
+
+    class Meta:
+        verbose_name_plural = 'Documentos de búsqueda'
+        verbose_name = 'Documento de búsqueda'
+
+
+class SearchTerm(models.Model):
+    """ A stemmed term and the number of documents that contain it. """
+    term = models.CharField(max_length=64, unique=True)
+    documents = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'Términos de búsqueda'
+        verbose_name = 'Término de búsqueda'
+
+    def __str__(self) -> str:
+        return self.term
+
+
+class SearchPosting(models.Model):
+    """ The weighted frequency of a term in a document. """
+    term = models.ForeignKey(SearchTerm, related_name='postings', on_delete=models.CASCADE)
+    document = models.ForeignKey(SearchDocument, related_name='postings', on_delete=models.CASCADE)
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        verbose_name_plural = 'Apariciones'
+        verbose_name = 'Aparición'
+        unique_together = ('term', 'document')
+
+
+class RelatedEntry(models.Model):
+    """ The nearest entries to ``entry`` by tags and category, kept by ``blog.related``. """
+    entry = models.ForeignKey(Entry, related_name='related_entries', on_delete=models.CASCADE)
+    related = models.ForeignKey(Entry, related_name='+', on_delete=models.CASCADE)
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        verbose_name_plural = 'Entradas relacionadas'
+        verbose_name = 'Entrada relacionada'
+        ordering = ['entry', 'rank']
+        unique_together = ('entry', 'related')
+
+
+class HighlightedCode(models.Model):
+    """ A code block highlighted by Pygments, kept by ``blog.highlight``. """
+    key = models.CharField(max_length=40, primary_key=True)
+    html = models.TextField()
+
+    class Meta:
+        verbose_name_plural = 'Bloques de código'
+        verbose_name = 'Bloque de código'
+
+
+class Job(models.Model):
+    """
+    Work queued for ``manage.py run_jobs``, see ``blog.jobs``. Only one
+    pending job per ``key``: queuing it again merges the payloads.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    )
+
+    kind = models.CharField(max_length=40)
+    key = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'Trabajos'
+        verbose_name = 'Trabajo'
+        ordering = ['run_after', 'pk']
+        constraints = [
+            models.UniqueConstraint(fields=['key'], condition=Q(status='pending'), name='job_pending_key'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.kind} {self.key}'
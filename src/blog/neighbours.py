@@ -0,0 +1,110 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.neighbours
+# description: Denormalized previous/next links between LIVE entries
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+from django.db.models import Q
+from django.utils import timezone
+
+
+def _live(model):
+    return model.objects.filter(status=model.LIVE_STATUS)
+
+
+def find_previous(entry):
+    return _live(type(entry))\
+        .filter(Q(pub_date__lt=entry.pub_date) | Q(pub_date=entry.pub_date, pk__lt=entry.pk))\
+        .order_by('-pub_date', '-id')\
+        .values_list('pk', flat=True)\
+        .first()
+
+
+def find_next(entry):
+    return _live(type(entry))\
+        .filter(Q(pub_date__gt=entry.pub_date) | Q(pub_date=entry.pub_date, pk__gt=entry.pk))\
+        .order_by('pub_date', 'id')\
+        .values_list('pk', flat=True)\
+        .first()
+
+
+def link(entry) -> bool:
+    """
+    Stores the current neighbours of ``entry``, in the database and in the
+    instance. Returns whether they changed.
+    """
+    previous_id, next_id = find_previous(entry), find_next(entry)
+    if (previous_id, next_id) == (entry.previous_entry_id, entry.next_entry_id):
+        return False
+    entry.previous_entry_id, entry.next_entry_id = previous_id, next_id
+    # The neighbour links are part of the page, so the entry is modified.
+    type(entry).objects.filter(pk=entry.pk).update(
+        previous_entry=previous_id, next_entry=next_id, updated_at=timezone.now()
+    )
+    return True
+
+
+def linked_to(entry) -> set:
+    """ Entries whose links point at ``entry``. """
+    return set(
+        type(entry).objects
+        .filter(Q(previous_entry=entry.pk) | Q(next_entry=entry.pk))
+        .values_list('pk', flat=True)
+    )
+
+
+def relink(model, pks) -> set:
+    """ Recomputes the links of the given entries, returns those changed. """
+    changed = set()
+    entries = model.objects.filter(pk__in=[pk for pk in pks if pk is not None])\
+        .only('pk', 'pub_date', 'previous_entry', 'next_entry')
+    for entry in entries:
+        if link(entry):
+            changed.add(entry.pk)
+    return changed
+
+
+def entry_saved(entry, linked=()) -> set:
+    """
+    Relinks ``entry`` and every entry whose links may change with it: the
+    ones that pointed at it before the save, given in ``linked``, and its
+    new neighbours. Returns the pks of the other entries that changed.
+    """
+    link(entry)
+    return relink(type(entry), set(linked) | {entry.previous_entry_id, entry.next_entry_id})
+
+
+def entry_deleted(model, linked) -> set:
+    return relink(model, linked)
+
+
+def rebuild(model) -> int:
+    """ Recomputes every link in one ordered pass. Returns the rows updated. """
+    rows = list(
+        model.objects
+        .order_by('pub_date', 'id')
+        .values_list('pk', 'status', 'previous_entry', 'next_entry')
+    )
+    links = {}
+    last_live = None
+    for pk, status, _, _ in rows:
+        links[pk] = [last_live, None]
+        if status == model.LIVE_STATUS:
+            last_live = pk
+    last_live = None
+    for pk, status, _, _ in reversed(rows):
+        links[pk][1] = last_live
+        if status == model.LIVE_STATUS:
+            last_live = pk
+
+    now = timezone.now()
+    changed = [
+        model(pk=pk, previous_entry_id=links[pk][0], next_entry_id=links[pk][1], updated_at=now)
+        for pk, _, previous_id, next_id in rows
+        if (previous_id, next_id) != tuple(links[pk])
+    ]
+    model.objects.bulk_update(changed, ['previous_entry', 'next_entry', 'updated_at'], batch_size=500)
+    return len(changed)
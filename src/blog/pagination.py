@@ -0,0 +1,200 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.pagination
+# description: Keyset (cursor) pagination for entry lists
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.core.paginator import EmptyPage, InvalidPage, Page, Paginator
+from django.db.models import Q, Subquery
+from django.http import Http404
+from django.utils.functional import cached_property
+
+from .cache import generations, lookup, store
+
+
+def encode_cursor(key) -> str:
+    pub_date, pk = key
+    raw = f'{pub_date.isoformat()}|{pk}'.encode('utf-8')
+    return urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str):
+    try:
+        raw = urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8')
+        pub_date, pk = raw.split('|')
+        pub_date = datetime.fromisoformat(pub_date)
+        if pub_date.tzinfo is None:
+            raise ValueError(token)
+        return pub_date, int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidPage('Invalid cursor') from e
+
+
+def after(key) -> Q:
+    pub_date, pk = key
+    return Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+
+
+def before(key) -> Q:
+    pub_date, pk = key
+    return Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=pk)
+
+
+class KeysetPage(Page):
+    """
+    A page of a ``KeysetPaginator``. Pages reached by cursor have no
+    ``number``, they know their neighbours from the rows they read.
+    """
+
+    def __init__(self, object_list, number, paginator, has_next=None, has_previous=None):
+        super().__init__(object_list, number, paginator)
+        self.keys = [(entry.pub_date, entry.pk) for entry in object_list]
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self) -> bool:
+        return self._has_next if self._has_next is not None else super().has_next()
+
+    def has_previous(self) -> bool:
+        return self._has_previous if self._has_previous is not None else super().has_previous()
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.keys[-1]) if self.keys and self.has_next() else None
+
+    @property
+    def previous_cursor(self):
+        return encode_cursor(self.keys[0]) if self.keys and self.has_previous() else None
+
+
+class KeysetPaginator(Paginator):
+    """
+    Paginates a queryset in the site order, ``-pub_date, -id``, seeking from
+    the last key of the previous page instead of using OFFSET. Only the first
+    ``window`` pages are numbered: the keys that end them are read in one
+    bounded, projected query and cached under ``cache_tags``. Any page is
+    reachable by cursor, ``page_after()`` and ``page_before()``, with one
+    query and without that index. ``offset`` skips entries shown elsewhere,
+    like the first four of the index.
+    """
+    window = 10
+
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True,
+                 offset=0, cache_key=None, cache_tags=()):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        self.offset = offset
+        self.cache_key = cache_key
+        self.cache_tags = cache_tags
+
+    def _check_object_list_is_ordered(self):
+        pass
+
+    @cached_property
+    def index(self) -> dict:
+        current = generations(self.cache_tags) if self.cache_key else None
+        if self.cache_key:
+            index = lookup(self.cache_key, current)
+            if index is not None:
+                return index
+
+        size = self.window * self.per_page
+        keys = list(self._ordered().values_list('pub_date', 'id')[:self.offset + size + 1])
+        start = keys[self.offset - 1] if self.offset and len(keys) >= self.offset else None
+        keys = keys[self.offset:]
+        ends = keys[self.per_page - 1:size:self.per_page]
+        if len(keys) < size and len(keys) % self.per_page:
+            ends.append(keys[-1])
+        index = {'start': start, 'ends': ends, 'count': min(len(keys), size), 'more': len(keys) > size}
+        if self.cache_key:
+            store(self.cache_key, current, index)
+        return index
+
+    @cached_property
+    def count(self) -> int:
+        """ The entries of the numbered pages. """
+        return self.index['count']
+
+    @cached_property
+    def num_pages(self) -> int:
+        if self.count == 0 and not self.allow_empty_first_page:
+            return 0
+        return max(len(self.index['ends']), 1)
+
+    def _ordered(self):
+        return self.object_list.order_by('-pub_date', '-id')
+
+    def page(self, number):
+        number = self.validate_number(number)
+        cursor = self.index['ends'][number - 2] if number > 1 else self.index['start']
+        queryset = self._ordered()
+        if cursor is not None:
+            queryset = queryset.filter(after(cursor))
+        has_next = True if number == self.num_pages and self.index['more'] else None
+        return KeysetPage(list(queryset[:self.per_page]), number, self, has_next=has_next)
+
+    def page_after(self, token):
+        cursor = decode_cursor(token)
+        entries = list(self._ordered().filter(after(cursor))[:self.per_page + 1])
+        if not entries:
+            raise EmptyPage('That page contains no results')
+        return KeysetPage(entries[:self.per_page], None, self,
+                          has_next=len(entries) > self.per_page, has_previous=True)
+
+    def page_before(self, token):
+        cursor = decode_cursor(token)
+        queryset = self.object_list.filter(before(cursor)).order_by('pub_date', 'id')
+        if self.offset:
+            queryset = queryset.exclude(pk__in=Subquery(self._ordered().values('pk')[:self.offset]))
+        entries = list(queryset[:self.per_page + 1])
+        if not entries:
+            raise EmptyPage('That page contains no results')
+        return KeysetPage(entries[:self.per_page][::-1], None, self,
+                          has_next=True, has_previous=len(entries) > self.per_page)
+
+
+class KeysetPaginationMixin:
+    """
+    ``MultipleObjectMixin`` pagination through ``KeysetPaginator``. Pages are
+    reachable by number, ``?page=``, and by cursor, ``?after=``/``?before=``.
+    """
+    paginator_class = KeysetPaginator
+    paginate_offset = 0
+
+    def get_paginate_cache_key(self):
+        return None
+
+    def get_paginate_cache_tags(self):
+        return ()
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        return self.paginator_class(
+            queryset, per_page, orphans=orphans, allow_empty_first_page=allow_empty_first_page,
+            offset=self.paginate_offset, cache_key=self.get_paginate_cache_key(),
+            cache_tags=self.get_paginate_cache_tags(), **kwargs
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = self.get_paginator(
+            queryset, page_size, orphans=self.get_paginate_orphans(),
+            allow_empty_first_page=self.get_allow_empty()
+        )
+        params = self.request.GET
+        try:
+            if params.get('after'):
+                page = paginator.page_after(params['after'])
+            elif params.get('before'):
+                page = paginator.page_before(params['before'])
+            else:
+                number = self.kwargs.get(self.page_kwarg) or params.get(self.page_kwarg) or 1
+                if number == 'last':
+                    number = paginator.num_pages
+                page = paginator.page(number)
+        except InvalidPage as e:
+            raise Http404(f'Invalid page: {e}')
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,269 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.related
+# description: Related entries by tag and category similarity
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import math
+import threading
+
+import numpy as np
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from taggit.models import TaggedItem
+
+from . import cache, export
+from .models import Entry, RelatedEntry
+
+TOP_N = 5
+# The category is one more feature, lighter than a shared tag.
+CATEGORY_WEIGHT = 0.5
+# Cells of the similarity block computed at once, 64 MB of float32.
+BLOCK_CELLS = 2 ** 24
+
+_pending = threading.local()
+
+
+class Vectors:
+    """
+    L2 normalized sparse vectors of the LIVE entries. Tags are weighted by
+    their inverse document frequency, so a rare tag says more than a common
+    one. The features are stored by column, the entries having each of them,
+    which is all the similarity product needs.
+
+    With ``entries``, a queryset of LIVE entries, only their vectors are
+    loaded, still weighted by the frequencies of their tags in every LIVE
+    entry.
+    """
+
+    def __init__(self, entries=None):
+        live = Entry.objects.filter(status=Entry.LIVE_STATUS)
+        rows = list((live if entries is None else entries).order_by('pk').values_list('pk', 'category_id'))
+        self.pks = np.array([pk for pk, _ in rows], dtype=np.int64)
+        self.row = {pk: i for i, (pk, _) in enumerate(rows)}
+
+        features = {}
+        cells = [(i, ('category', category)) for i, (_, category) in enumerate(rows)]
+        content_type = ContentType.objects.get_for_model(Entry)
+        tagged = TaggedItem.objects.filter(content_type=content_type)
+        if entries is not None:
+            tagged = tagged.filter(object_id__in=entries.values('pk'))
+        for pk, tag in tagged.values_list('object_id', 'tag_id').iterator():
+            if pk in self.row:
+                cells.append((self.row[pk], ('tag', tag)))
+        for _, feature in cells:
+            features.setdefault(feature, len(features))
+
+        row_index = np.array([i for i, _ in cells], dtype=np.int64)
+        col_index = np.array([features[feature] for _, feature in cells], dtype=np.int64)
+        if entries is None:
+            total = len(rows)
+            frequency = np.bincount(col_index, minlength=len(features))
+        else:
+            total = live.count()
+            counts = _tag_frequencies([tag for kind, tag in features if kind == 'tag'])
+            frequency = {column: counts.get(tag, 1) for (kind, tag), column in features.items() if kind == 'tag'}
+        weights = np.empty(len(features), dtype=np.float32)
+        for (kind, _), column in features.items():
+            if kind == 'tag':
+                weights[column] = math.log(1 + total / frequency[column])
+            else:
+                weights[column] = CATEGORY_WEIGHT
+        values = weights[col_index]
+        norms = np.sqrt(np.bincount(row_index, values.astype(np.float64) ** 2, minlength=total))
+        values = (values / norms[row_index]).astype(np.float32)
+
+        # By column, for the product, and by row, to read an entry vector.
+        order = np.argsort(col_index, kind='stable')
+        self.col_rows, self.col_values = row_index[order], values[order]
+        self.col_start = np.concatenate(([0], np.cumsum(np.bincount(col_index, minlength=len(features)))))
+        order = np.argsort(row_index, kind='stable')
+        self.row_cols, self.row_values = col_index[order], values[order]
+        self.row_start = np.concatenate(([0], np.cumsum(np.bincount(row_index, minlength=total))))
+
+    def __len__(self) -> int:
+        return len(self.pks)
+
+    def similarities(self, rows) -> np.ndarray:
+        """ Cosine similarity of the given rows against every entry. """
+        scores = np.zeros((len(rows), len(self)), dtype=np.float32)
+        for i, row in enumerate(rows):
+            start, end = self.row_start[row], self.row_start[row + 1]
+            for column, value in zip(self.row_cols[start:end], self.row_values[start:end]):
+                first, last = self.col_start[column], self.col_start[column + 1]
+                scores[i, self.col_rows[first:last]] += value * self.col_values[first:last]
+            scores[i, row] = 0
+        return scores
+
+    def top(self, rows, n=TOP_N) -> dict:
+        """ ``{pk: [(related pk, score), ...]}`` for the given rows. """
+        result = {}
+        block = max(1, BLOCK_CELLS // max(len(self), 1))
+        for start in range(0, len(rows), block):
+            chunk = rows[start:start + block]
+            scores = self.similarities(chunk)
+            k = min(n, len(self) - 1)
+            for i, row in enumerate(chunk):
+                if k <= 0:
+                    result[int(self.pks[row])] = []
+                    continue
+                best = np.argpartition(-scores[i], k - 1)[:k]
+                best = best[scores[i, best] > 0]
+                # Higher score first, newer entry first on ties.
+                best = best[np.lexsort((-self.pks[best], -scores[i, best]))]
+                result[int(self.pks[row])] = [(int(self.pks[j]), float(scores[i, j])) for j in best]
+        return result
+
+
+def _tag_frequencies(tags) -> dict:
+    """ ``{tag: LIVE entries with it}`` of the given tags. """
+    frequencies = {}
+    live = Entry.objects.filter(status=Entry.LIVE_STATUS).values('pk')
+    content_type = ContentType.objects.get_for_model(Entry)
+    for batch in _batches(tags):
+        rows = TaggedItem.objects\
+            .filter(content_type=content_type, tag__in=batch, object_id__in=live)\
+            .values('tag')\
+            .annotate(entries=Count('id'))\
+            .values_list('tag', 'entries')
+        frequencies.update(rows)
+    return frequencies
+
+
+def _batches(pks, size=1000):
+    pks = sorted(pks)
+    for start in range(0, len(pks), size):
+        yield pks[start:start + size]
+
+
+def _current(pks) -> dict:
+    """ ``{pk: [(related pk, score), ...]}`` of the stored lists. """
+    lists = {pk: [] for pk in pks}
+    for batch in _batches(pks):
+        rows = RelatedEntry.objects.filter(entry__in=batch).order_by('entry', 'rank')
+        for entry, related, score in rows.values_list('entry', 'related', 'score'):
+            lists[entry].append((related, score))
+    return lists
+
+
+def store(lists: dict) -> set:
+    """ Writes the given lists, returns the entries whose list changed. """
+    current = _current(list(lists))
+    changed = {pk for pk, related in lists.items() if [r for r, _ in related] != [r for r, _ in current[pk]]}
+    with transaction.atomic():
+        for batch in _batches(changed):
+            RelatedEntry.objects.filter(entry__in=batch).delete()
+        RelatedEntry.objects.bulk_create([
+            RelatedEntry(entry_id=pk, related_id=related, score=score, rank=rank)
+            for pk in changed
+            for rank, (related, score) in enumerate(lists[pk])
+        ], batch_size=500)
+    return changed
+
+
+def build() -> set:
+    """ Computes every list, returns the entries whose list changed. """
+    vectors = Vectors()
+    lists = vectors.top(list(range(len(vectors))))
+    stale = RelatedEntry.objects.exclude(entry__status=Entry.LIVE_STATUS)
+    stale_pks = set(stale.values_list('entry', flat=True).distinct())
+    stale.delete()
+    return store(lists) | stale_pks
+
+
+def neighbourhood(pks):
+    """
+    The LIVE entries sharing a category or a tag with the entries ``pks``,
+    the only ones that can be similar to them.
+    """
+    content_type = ContentType.objects.get_for_model(Entry)
+    categories = Entry.objects.filter(pk__in=pks).values('category')
+    tags = TaggedItem.objects.filter(content_type=content_type, object_id__in=pks).values('tag')
+    tagged = TaggedItem.objects.filter(content_type=content_type, tag__in=tags).values('object_id')
+    return Entry.objects.filter(Q(category__in=categories) | Q(pk__in=tagged), status=Entry.LIVE_STATUS)
+
+
+def update(pks) -> set:
+    """
+    Recomputes the lists that may change when the tags, category or status
+    of the entries ``pks`` change: their own, the ones that list them, and
+    the ones they can now enter. Only the vectors of the entries similar to
+    those are loaded. Returns the entries whose list changed.
+    """
+    pks = set(pks)
+    listing = set(RelatedEntry.objects.filter(related__in=pks).values_list('entry', flat=True))
+    vectors = Vectors(neighbourhood(pks | listing))
+    stale = {pk for pk in pks if pk not in vectors.row}
+    RelatedEntry.objects.filter(entry__in=stale).delete()
+
+    # Every entry similar to these is loaded, their lists are recomputed.
+    seeds = {pk for pk in (pks - stale) | listing if pk in vectors.row}
+    lists = vectors.top(sorted(vectors.row[pk] for pk in seeds))
+    changed = sorted(vectors.row[pk] for pk in pks - stale)
+    if changed:
+        # An entry similar to a changed one may now list it. Its other
+        # candidates may not be loaded, so the changed entries are merged
+        # into its stored list.
+        scores = vectors.similarities(changed)
+        best = scores.max(axis=0)
+        candidates = [int(row) for row in np.flatnonzero(best > 0) if int(vectors.pks[row]) not in seeds]
+        stored = _current([int(vectors.pks[row]) for row in candidates])
+        for row in candidates:
+            pk = int(vectors.pks[row])
+            current = stored[pk]
+            if len(current) == TOP_N and best[row] <= min(score for _, score in current):
+                continue
+            merged = current + [
+                (int(vectors.pks[changed_row]), float(scores[i, row]))
+                for i, changed_row in enumerate(changed) if scores[i, row] > 0
+            ]
+            # Higher score first, newer entry first on ties.
+            lists[pk] = sorted(merged, key=lambda item: (-item[1], -item[0]))[:TOP_N]
+    return store(lists) | stale
+
+
+def schedule(*pks) -> None:
+    """ Updates the lists once the current transaction commits. """
+    batch = getattr(_pending, 'batch', None)
+    if batch is None:
+        batch = _pending.batch = set()
+    transaction.on_commit(_flush)
+    batch.update(pks)
+
+
+def _flush() -> None:
+    batch = _pending.__dict__.pop('batch', None)
+    if batch:
+        refresh_pages(update(batch))
+
+
+def refresh_pages(pks) -> None:
+    """ Marks the pages of entries whose list changed as modified. """
+    now = timezone.now()
+    for batch in _batches(pks):
+        # The related entries are part of the page, so the entry is modified.
+        Entry.objects.filter(pk__in=batch).update(updated_at=now)
+        pages = Entry.objects.filter(pk__in=batch).select_related('category')
+        cache.invalidate(*[cache.entry_tag(entry.category.slug, entry.slug) for entry in pages])
+        export.schedule({entry.get_absolute_url() for entry in pages if entry.status == Entry.LIVE_STATUS})
+
+
+def referrers(entry) -> list:
+    """ The entries that list ``entry`` as related. """
+    return list(
+        Entry.objects.filter(related_entries__related=entry.pk).select_related('category').distinct()
+    )
+
+
+def for_entry(entry) -> list:
+    """ The related entries of ``entry``, in one query. """
+    rows = RelatedEntry.objects\
+        .filter(entry=entry.pk, related__status=Entry.LIVE_STATUS)\
+        .select_related('related__category')\
+        .order_by('rank')
+    return [row.related for row in rows]
@@ -0,0 +1,195 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.renderer
+# description: Pooled Markdown renderer with source hashing
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import hashlib
+import queue
+from contextlib import contextmanager
+
+import django
+import markdown
+import pygments
+from django.template.defaultfilters import truncatechars_html, striptags, safe
+
+from . import highlight
+
+
+MD_EXTENSIONS = [
+    'markdown.extensions.codehilite',
+    'markdown.extensions.meta',
+    'markdown.extensions.abbr',
+    'markdown.extensions.attr_list',
+    'markdown.extensions.def_list',
+    'markdown.extensions.fenced_code',
+    'markdown.extensions.footnotes',
+    'markdown.extensions.tables',
+    'markdown.extensions.admonition',
+    'markdown.extensions.sane_lists',
+    'markdown.extensions.extra',
+    'markdown.extensions.smarty',
+    'markdown.extensions.toc',
+]
+OUTPUT_FORMAT = 'html'
+# Characters of the body shown in the lists when there is no summary.
+EXCERPT_LENGTH = 186
+ENTRY_HTML_FIELDS = (
+    'summary_html', 'summary_meta', 'body_html', 'extend_html', 'excerpt',
+    'summary_hash', 'body_hash', 'extend_hash',
+)
+
+# Anything that changes the generated HTML for the same source text must be
+# part of the fingerprint, so stored hashes stop matching when it changes.
+FINGERPRINT = hashlib.sha1(
+    repr((markdown.__version__, pygments.__version__, OUTPUT_FORMAT, MD_EXTENSIONS)).encode('utf-8')
+).hexdigest()
+
+
+class MarkdownPool:
+    """
+    Keeps ready to use ``Markdown`` instances, so the extensions are loaded
+    once per instance instead of once per document.
+    """
+
+    def __init__(self, extensions=None, size=4):
+        self.extensions = extensions or MD_EXTENSIONS
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _build(self) -> markdown.Markdown:
+        # Only when a document is rendered, importing this module changes nothing.
+        highlight.install()
+        return markdown.Markdown(extensions=self.extensions, output_format=OUTPUT_FORMAT)
+
+    @contextmanager
+    def acquire(self):
+        try:
+            md = self._idle.get_nowait()
+        except queue.Empty:
+            md = self._build()
+        try:
+            yield md
+        finally:
+            md.reset()
+            try:
+                self._idle.put_nowait(md)
+            except queue.Full:
+                pass
+
+    def convert(self, text: str) -> str:
+        with self.acquire() as md:
+            return md.convert(text)
+
+
+pool = MarkdownPool()
+
+
+def render(text: str) -> str:
+    return pool.convert(text)
+
+
+def source_hash(text) -> str:
+    return hashlib.sha1(f'{FINGERPRINT}:{text or ""}'.encode('utf-8')).hexdigest()
+
+
+def excerpt(summary: str, body_html: str) -> str:
+    """ The plain text shown for an entry in the lists. """
+    if summary:
+        return striptags(summary)
+    return striptags(truncatechars_html(body_html, EXCERPT_LENGTH))
+
+
+def render_entry(values: dict, force: bool = False) -> dict:
+    """
+    Renders the Markdown fields of an entry given as a dict of its field
+    values. Only the fields whose source hash differs from the stored one
+    are rendered; the returned dict holds the fields that changed.
+    """
+    changes = {}
+
+    body_hash = source_hash(values['body'])
+    if force or body_hash != values.get('body_hash'):
+        changes['body_html'] = render(values['body'])
+        changes['body_hash'] = body_hash
+    body_html = changes.get('body_html', values.get('body_html', ''))
+
+    if values['summary']:
+        summary_hash = source_hash(values['summary'])
+        if force or summary_hash != values.get('summary_hash'):
+            summary_html = render(values['summary'])
+            changes['summary_html'] = summary_html
+            changes['summary_meta'] = safe(striptags(summary_html))
+            changes['summary_hash'] = summary_hash
+    elif force or 'body_html' in changes or values.get('summary_hash'):
+        summary_html = safe(truncatechars_html(body_html, 250))
+        changes['summary_html'] = summary_html
+        changes['summary_meta'] = striptags(summary_html)
+        changes['summary_hash'] = ''
+
+    if values['summary'] or force or 'body_html' in changes or not values.get('excerpt'):
+        text = excerpt(values['summary'], body_html)
+        if text != values.get('excerpt'):
+            changes['excerpt'] = text
+
+    if values['extend']:
+        extend_hash = source_hash(values['extend'])
+        if force or extend_hash != values.get('extend_hash'):
+            changes['extend_html'] = render(values['extend'])
+            changes['extend_hash'] = extend_hash
+    elif values.get('extend_html') or values.get('extend_hash'):
+        changes['extend_html'] = ''
+        changes['extend_hash'] = ''
+
+    return changes
+
+
+def is_stale(values: dict) -> bool:
+    """ Whether ``render_entry`` would change the entry, without rendering it. """
+    if source_hash(values['body']) != values.get('body_hash'):
+        return True
+    if values['summary']:
+        if source_hash(values['summary']) != values.get('summary_hash'):
+            return True
+    elif values.get('summary_hash'):
+        return True
+    if values['extend']:
+        return source_hash(values['extend']) != values.get('extend_hash')
+    return bool(values.get('extend_html') or values.get('extend_hash'))
+
+
+def render_category(values: dict, force: bool = False) -> dict:
+    changes = {}
+    if values['description']:
+        description_hash = source_hash(values['description'])
+        if force or description_hash != values.get('description_hash'):
+            changes['description_html'] = render(values['description'])
+            changes['description_hash'] = description_hash
+    elif values.get('description_html') or values.get('description_hash'):
+        changes['description_html'] = None
+        changes['description_hash'] = ''
+    return changes
+
+
+def render_entries(rows, force: bool = False) -> list:
+    """
+    Renders a chunk of entries given as ``values()`` dicts, as done by the
+    worker processes of the bulk commands. Returns ``(pk, fields)`` pairs,
+    with every HTML field, for the entries whose HTML changed.
+    """
+    rendered = []
+    for row in rows:
+        changes = render_entry(row, force=force)
+        if changes:
+            fields = {field: row[field] for field in ENTRY_HTML_FIELDS}
+            fields.update(changes)
+            rendered.append((row['pk'], fields))
+    return rendered
+
+
+def setup_worker() -> None:
+    """ Initializer for rendering processes started with ``spawn``. """
+    django.setup()
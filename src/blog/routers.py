@@ -0,0 +1,133 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.routers
+# description: Sends the reads of the public views to a read replica
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import contextvars
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+REPLICA = 'replica'
+# The public pages show these, everything else (sessions, users, the
+# database cache) is always read from the primary.
+REPLICA_APPS = {'blog', 'taggit', 'flatpages', 'sites'}
+# What the admin edits. The tables the views fill on their own, like
+# HighlightedCode, and the job queue don't pin anybody.
+CONTENT_MODELS = {
+    'blog.category', 'blog.entry', 'taggit.tag', 'taggit.taggeditem', 'flatpages.flatpage', 'sites.site',
+}
+# URL namespace of the public views, the sitemaps and the feeds.
+PUBLIC_NAMESPACE = 'blog'
+PIN_COOKIE = 'replica_pin'
+
+_state = contextvars.ContextVar('blog_replica', default=None)
+
+
+class Reads:
+    """ Where the reads of the running request go. """
+
+    def __init__(self):
+        self.replica = False
+        self.wrote = False
+
+
+def enabled() -> bool:
+    return REPLICA in connections.settings
+
+
+class ReplicaRouter:
+    """
+    Reads go to the ``replica`` alias while ``ReplicaMiddleware`` says so for
+    the running request; writes, and anything read outside those requests,
+    like the admin, the static export and the management commands, use
+    ``default``.
+    """
+
+    def db_for_read(self, model, **hints):
+        reads = _state.get()
+        if reads is not None and reads.replica and model._meta.app_label in REPLICA_APPS:
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        reads = _state.get()
+        if reads is not None and model._meta.label_lower in CONTENT_MODELS:
+            # Read this request's own write back from the primary, and the
+            # next requests of the same client, see ``ReplicaMiddleware``.
+            reads.replica = False
+            reads.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        return True
+
+
+class ReplicaMiddleware:
+    """
+    Marks the GET and HEAD requests of the public views for the replica. A
+    request that wrote content pins its client to the primary for
+    ``BLOG_REPLICA_PIN`` seconds with a cookie, long enough for the replica
+    to catch up, so an editor sees their own change. Not used without a
+    ``replica`` database.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        reads = Reads()
+        token = _state.set(reads)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(response, request, reads)
+
+    async def __acall__(self, request):
+        reads = Reads()
+        token = _state.set(reads)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(response, request, reads)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        reads = _state.get()
+        if request.method in ('GET', 'HEAD') and request.resolver_match.namespace == PUBLIC_NAMESPACE:
+            reads.replica = PIN_COOKIE not in request.COOKIES
+            request.replica_reads = reads
+
+    def _finish(self, response, request, reads):
+        if reads.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.BLOG_REPLICA_PIN, secure=request.is_secure(), httponly=True,
+                samesite='Lax')
+        if response.streaming and hasattr(request, 'replica_reads'):
+            # A streamed body, like a sitemap segment, is read while it is sent.
+            response.streaming_content = self._stream(reads, response.streaming_content)
+        return response
+
+    @staticmethod
+    def _stream(reads, content):
+        _state.set(reads)
+        try:
+            yield from content
+        finally:
+            _state.set(None)
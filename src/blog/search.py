@@ -0,0 +1,181 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.search
+# description: Inverted index of the entries ranked with BM25
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import hashlib
+import math
+import re
+from collections import Counter
+from html import unescape
+
+from django.db import transaction
+from django.db.models import Avg, Case, Count, ExpressionWrapper, F, FloatField, Sum, Value, When
+from django.utils.html import strip_tags
+
+from .cache import generations, lookup, store
+from .cards import cards
+from .models import Entry, SearchDocument, SearchPosting, SearchTerm
+from .stemmer import fold, stem
+
+# Terms are stemmed words of the folded text. Each field counts as many times
+# as its weight, so a word in the title outweighs the same word in the body.
+FIELD_WEIGHTS = (('title', 3), ('summary_meta', 2), ('body_html', 1), ('extend_html', 1))
+HTML_FIELDS = ('body_html', 'extend_html')
+
+# BM25 parameters.
+K1 = 1.2
+B = 0.75
+
+MAX_TERM_LENGTH = 64
+RESULTS_PREFIX = 'blog:search:'
+WORD = re.compile(r'\w+')
+STOPWORDS = frozenset(fold(word) for word in '''
+    a al algo algunas algunos ante antes como con contra cual cuando de del desde donde durante e el
+    ella ellas ellos en entre era eran es esa esas ese eso esos esta estaba estas este esto estos fue
+    fueron ha han hasta hay la las le les lo los mas me mi mis mucho muy más nada ni no nos nosotros o
+    otra otras otro otros para pero poco por porque que quien se sea ser si sin sobre son su sus
+    también tambien te tiene todo todos tu tus un una uno unos y ya yo
+'''.split())
+
+
+def terms(text: str) -> list:
+    return [
+        stem(word)[:MAX_TERM_LENGTH]
+        for word in WORD.findall(fold(text))
+        if word not in STOPWORDS and (len(word) > 1 or word.isdigit())
+    ]
+
+
+def document_text(entry) -> dict:
+    text = {}
+    for field, _ in FIELD_WEIGHTS:
+        value = getattr(entry, field) or ''
+        if field in HTML_FIELDS:
+            value = unescape(strip_tags(value))
+        text[field] = value
+    return text
+
+
+def document_terms(text: dict) -> Counter:
+    counts = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        for term in terms(text[field]):
+            counts[term] += weight
+    return counts
+
+
+def _term_ids(names) -> dict:
+    SearchTerm.objects.bulk_create([SearchTerm(term=name) for name in names], ignore_conflicts=True)
+    return dict(SearchTerm.objects.filter(term__in=names).values_list('term', 'pk'))
+
+
+def index_entry(entry, force=False) -> bool:
+    """
+    Indexes ``entry`` when its text changed since it was last indexed.
+    Only the postings of the entry and the counts of its terms are written.
+    """
+    text = document_text(entry)
+    text_hash = hashlib.sha1(repr(sorted(text.items())).encode('utf-8')).hexdigest()
+    document = SearchDocument.objects.filter(entry=entry.pk).first()
+    if document is not None and document.text_hash == text_hash and not force:
+        return False
+
+    counts = document_terms(text)
+    with transaction.atomic():
+        if document is None:
+            document = SearchDocument.objects.create(entry_id=entry.pk)
+            previous = set()
+        else:
+            previous = set(document.postings.values_list('term_id', flat=True))
+            document.postings.all().delete()
+        ids = _term_ids(list(counts))
+        SearchPosting.objects.bulk_create([
+            SearchPosting(term_id=ids[term], document=document, frequency=frequency)
+            for term, frequency in counts.items()
+        ], batch_size=500)
+        current = set(ids.values())
+        SearchTerm.objects.filter(pk__in=current - previous).update(documents=F('documents') + 1)
+        SearchTerm.objects.filter(pk__in=previous - current).update(documents=F('documents') - 1)
+        document.length = sum(counts.values())
+        document.text_hash = text_hash
+        document.save()
+    return True
+
+
+def remove_entry(entry) -> None:
+    with transaction.atomic():
+        ids = SearchPosting.objects.filter(document=entry.pk).values_list('term_id', flat=True)
+        SearchTerm.objects.filter(pk__in=list(ids)).update(documents=F('documents') - 1)
+        SearchDocument.objects.filter(entry=entry.pk).delete()
+
+
+def rank(query: str, limit: int = 50, live=True) -> list:
+    """ ``(entry_id, score)`` of the best matches for ``query``, best first. """
+    wanted = set(terms(query))
+    if not wanted:
+        return []
+    found = dict(SearchTerm.objects.filter(term__in=wanted, documents__gt=0).values_list('pk', 'documents'))
+    if not found:
+        return []
+    stats = SearchDocument.objects.aggregate(total=Count('pk'), average=Avg('length'))
+    total, average = stats['total'], stats['average'] or 1
+    idf = {
+        pk: math.log(1 + (total - documents + 0.5) / (documents + 0.5))
+        for pk, documents in found.items()
+    }
+
+    # Scored and cut to the best ``limit`` by the database, only those rows come back.
+    weight = Case(*(When(term_id=pk, then=Value(value)) for pk, value in idf.items()), output_field=FloatField())
+    norm = Value(K1 * (1 - B)) + Value(K1 * B / average) * F('document__length')
+    score = ExpressionWrapper(
+        weight * F('frequency') * Value(K1 + 1) / (F('frequency') + norm), output_field=FloatField()
+    )
+    postings = SearchPosting.objects.filter(term__in=list(found))
+    if live:
+        postings = postings.filter(document__entry__status=Entry.LIVE_STATUS)
+    ranked = postings.values('document_id').annotate(score=Sum(score)).order_by('-score', 'document_id')
+    if limit is not None:
+        ranked = ranked[:limit]
+    return list(ranked.values_list('document_id', 'score'))
+
+
+def search(query: str, limit: int = 50) -> list:
+    """ The LIVE entries that best match ``query``, best first. """
+    ranked = rank(query, limit)
+    entries = {card.pk: card for card in cards(Entry.objects.filter(pk__in=[pk for pk, _ in ranked]), tags=True)}
+    return [entries[pk] for pk, _ in ranked if pk in entries]
+
+
+def cached_search(query: str, limit: int = 50) -> list:
+    """
+    ``search()`` cached by the terms of ``query``, so every spelling of the
+    same terms shares one entry and a query without terms is not stored.
+    """
+    wanted = sorted(set(terms(query)))
+    if not wanted:
+        return []
+    key = RESULTS_PREFIX + hashlib.md5(repr((wanted, limit)).encode('utf-8')).hexdigest()
+    current = generations(('entries', 'categories'))
+    results = lookup(key, current)
+    if results is None:
+        results = search(query, limit)
+        store(key, current, results)
+    return results
+
+
+def matching(query: str):
+    """ The pks of the entries with any term of ``query``, as a subquery. """
+    return SearchPosting.objects.filter(term__term__in=set(terms(query))).values('document')
+
+
+def rebuild(force=False) -> int:
+    """ Indexes every entry, returns the number of entries indexed. """
+    indexed = 0
+    for entry in Entry.objects.order_by('pk').iterator(chunk_size=500):
+        indexed += index_entry(entry, force=force)
+    return indexed
@@ -0,0 +1,185 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.signals
+# description: Keeps derived data in sync with Entry and Category changes
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from taggit.models import Tag
+
+from . import archive, cache, export, jobs, neighbours as links, related, search, tagstats
+from .models import Entry, Category
+
+NAVIGATION_FIELDS = ('name', 'slug', 'icon')
+
+
+def _neighbours(entry, pks=None) -> tuple:
+    if pks is None:
+        pks = (entry.previous_entry_id, entry.next_entry_id)
+    found = Entry.objects.select_related('category').in_bulk([pk for pk in pks if pk])
+    return tuple(found.get(pk) for pk in pks)
+
+
+@receiver(pre_save, sender=Entry)
+def entry_pre_save(sender, instance, raw=False, **kwargs):
+    instance._previous = None
+    if raw or instance.pk is None:
+        return
+    instance._previous = Entry.objects.select_related('category').filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=Entry)
+def entry_post_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous', None)
+    # Only LIVE entries are linked, so the entries pointing at this one
+    # before the save can only be its former neighbours.
+    linked = (previous.previous_entry_id, previous.next_entry_id) if previous is not None else ()
+    links.entry_saved(instance, linked)
+    archive.entry_changed(instance, previous)
+    # A new entry gets its tags after this save, see ``entry_tags_changed``.
+    tagged = tagstats.tags_of(instance) if previous is not None else {}
+    recounted = previous is not None and (previous.status, previous.pub_date) != (instance.status, instance.pub_date)
+    if recounted:
+        tagstats.recount(tagged)
+    if not instance.rendering:
+        search.index_entry(instance)
+
+    url = instance.get_absolute_url()
+    neighbours = _neighbours(instance)
+    urls, removed = export.entry_pages(instance, neighbours), set()
+    tags = cache.entry_tags(instance, neighbours) | cache.feed_tags(instance)
+    if previous is not None:
+        neighbours = _neighbours(previous)
+        urls |= export.entry_pages(previous, neighbours)
+        removed.add(previous.get_absolute_url())
+        tags |= cache.entry_tags(previous, neighbours) | cache.feed_tags(previous)
+    if instance.status == Entry.LIVE_STATUS:
+        urls.add(url)
+    else:
+        removed.add(url)
+    if Entry.LIVE_STATUS in (instance.status, previous.status if previous is not None else None):
+        tags |= {cache.tag_tag(slug) for slug in tagged.values()}
+        urls |= export.tag_pages(tagged.values())
+        if recounted:
+            tags.add('tags')
+    # The pages that list it as related show its title.
+    for referrer in related.referrers(instance):
+        tags.add(cache.entry_tag(referrer.category.slug, referrer.slug))
+        urls.add(referrer.get_absolute_url())
+    if previous is None or (previous.status, previous.category_id) != (instance.status, instance.category_id):
+        related.schedule(instance.pk)
+    if instance.rendering:
+        # The worker invalidates and exports once the HTML is rendered.
+        jobs.publish(instance, tags, urls, removed)
+        return
+    cache.invalidate(*tags)
+    export.schedule(urls, removed)
+
+
+@receiver(pre_delete, sender=Entry)
+def entry_pre_delete(sender, instance, **kwargs):
+    # Read before the links pointing at the entry are set to NULL.
+    instance._linked = links.linked_to(instance)
+    instance._tagged = tagstats.tags_of(instance)
+    search.remove_entry(instance)
+    related.schedule(instance.pk, *[referrer.pk for referrer in related.referrers(instance)])
+
+
+@receiver(post_delete, sender=Entry)
+def entry_post_delete(sender, instance, **kwargs):
+    linked = getattr(instance, '_linked', set())
+    links.entry_deleted(Entry, linked)
+    archive.entry_changed(instance)
+    tagged = getattr(instance, '_tagged', {})
+    tagstats.recount(tagged)
+    neighbours = _neighbours(instance, linked)
+    tags = cache.entry_tags(instance, neighbours) | cache.feed_tags(instance)
+    urls = export.entry_pages(instance, neighbours)
+    if instance.status == Entry.LIVE_STATUS:
+        tags |= {'tags', *(cache.tag_tag(slug) for slug in tagged.values())}
+        urls |= export.tag_pages(tagged.values())
+    cache.invalidate(*tags)
+    export.schedule(urls, {instance.get_absolute_url()})
+
+
+@receiver(m2m_changed, sender=Entry.tags.through)
+def entry_tags_changed(sender, instance, action, reverse, pk_set=None, **kwargs):
+    if reverse:
+        return
+    if action == 'pre_clear':
+        instance._cleared_tags = tagstats.tags_of(instance)
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action == 'post_clear':
+        changed = instance.__dict__.pop('_cleared_tags', {})
+    else:
+        changed = dict(Tag.objects.filter(pk__in=pk_set or ()).values_list('pk', 'slug'))
+    tagstats.recount(changed)
+    related.schedule(instance.pk)
+    # The pages show the tags of their entries, their validators only look
+    # at the entries.
+    instance.updated_at = timezone.now()
+    Entry.objects.filter(pk=instance.pk).update(updated_at=instance.updated_at)
+    tags = {cache.entry_tag(instance.category.slug, instance.slug)}
+    urls = set()
+    if instance.status == Entry.LIVE_STATUS:
+        # The lists show the tags of their entries.
+        slugs = set(changed.values()) | set(tagstats.tags_of(instance).values())
+        tags |= {'entries', 'tags', cache.category_tag(instance.category.slug)}
+        tags |= {cache.tag_tag(slug) for slug in slugs}
+        urls = {instance.get_absolute_url()} | export.entry_pages(instance, ()) | export.tag_pages(slugs)
+    if instance.rendering:
+        jobs.publish(instance, tags, urls)
+        return
+    cache.invalidate(*tags)
+    export.schedule(urls)
+
+
+@receiver(pre_save, sender=Category)
+def category_pre_save(sender, instance, raw=False, **kwargs):
+    instance._previous = None
+    if raw or instance.pk is None:
+        return
+    instance._previous = Category.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=Category)
+def category_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous', None)
+    tags = {'categories', cache.category_tag(instance.slug)}
+    if previous is not None:
+        tags.add(cache.category_tag(previous.slug))
+    navigation = created or previous is None or any(
+        getattr(previous, field) != getattr(instance, field) for field in NAVIGATION_FIELDS
+    )
+    if navigation:
+        # The feeds show the category name and link its entries by slug.
+        tags |= {cache.feed_tag(), cache.feed_tag(instance.slug)}
+        if previous is not None:
+            tags.add(cache.feed_tag(previous.slug))
+    cache.invalidate(*tags)
+    if navigation:
+        # The category menu is part of every page.
+        removed = {previous.get_absolute_url()} if previous is not None else set()
+        export.schedule(removed=removed, everything=True)
+    else:
+        export.schedule(export.site_pages() + [instance.get_absolute_url()])
+
+
+@receiver(post_delete, sender=Category)
+def category_post_delete(sender, instance, **kwargs):
+    cache.invalidate(
+        'categories', 'entries', 'featured', cache.category_tag(instance.slug),
+        cache.feed_tag(), cache.feed_tag(instance.slug)
+    )
+    export.schedule(removed={instance.get_absolute_url()}, everything=True)
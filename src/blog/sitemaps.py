@@ -1,21 +1,138 @@
-from django.contrib.sitemaps import Sitemap
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.sitemaps
+# description: Sitemap index with one cached segment per year
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import hashlib
+from xml.sax.saxutils import escape
+
+from django.db.models import Max
+from django.db.models.functions import ExtractYear
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.generic import View
+
+from . import compression
+from .cache import CachedResponseMixin, generations, lookup, sitemap_tag, store
+from .instrumentation import query_budget
 from .models import Entry
+from .validators import conditional, entries_state, missing, sitemap_state
+
+PROTOCOL = 'http'
+CONTENT_TYPE = 'application/xml; charset=utf-8'
+# The segments used to be cached as bare bytes.
+SEGMENT_PREFIX = 'blog:sitemap:v2:'
+# URLs written per chunk of the streamed response.
+CHUNK_SIZE = 500
+
+HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+URLSET = '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+SITEMAPINDEX = '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+
+
+def live_entries():
+    return Entry.objects.filter(status=Entry.LIVE_STATUS)
+
+
+def segments() -> list:
+    """ ``(year, lastmod)`` of every year with LIVE entries, oldest first. """
+    return list(
+        live_entries()
+        .annotate(year=ExtractYear('pub_date'))
+        .values_list('year')
+        .annotate(lastmod=Max('updated_at'))
+        .order_by('year')
+    )
+
+
+def segment_tags(year: int) -> tuple:
+    # The locations use the category slugs.
+    return sitemap_tag(year), 'categories'
+
+
+def _url(domain: str, path: str, lastmod) -> str:
+    return (
+        f'<url><loc>{escape(f"{PROTOCOL}://{domain}{path}")}</loc>'
+        f'<lastmod>{lastmod.date().isoformat()}</lastmod>'
+        '<changefreq>weekly</changefreq><priority>0.8</priority></url>\n'
+    )
+
+
+def segment_rows(year: int):
+    return live_entries()\
+        .filter(pub_date__year=year)\
+        .order_by('-pub_date', '-id')\
+        .values_list('category__slug', 'slug', 'updated_at')
+
+
+def segment_chunks(domain: str, year: int):
+    """ The segment for ``year`` as encoded chunks, from one projected query. """
+    urls = [HEADER, URLSET]
+    for category, slug, updated_at in segment_rows(year).iterator(chunk_size=2000):
+        path = reverse('blog:entry', kwargs={'category': category, 'slug': slug})
+        urls.append(_url(domain, path, updated_at))
+        if len(urls) >= CHUNK_SIZE:
+            yield ''.join(urls).encode('utf-8')
+            urls = []
+    urls.append('</urlset>\n')
+    yield ''.join(urls).encode('utf-8')
+
+
+@query_budget(3)
+@method_decorator(conditional(entries_state), name='dispatch')
+class SitemapIndex(CachedResponseMixin, View):
+    cache_tags = ('entries', 'categories')
+
+    def get_cache_key(self) -> str:
+        # The locations carry the host asked for, like the segments.
+        host = hashlib.md5(self.request.get_host().encode('utf-8')).hexdigest()
+        return f'{super().get_cache_key()}:{host}'
+
+    def get(self, request, *args, **kwargs):
+        domain = request.get_host()
+        parts = [HEADER, SITEMAPINDEX]
+        for year, lastmod in segments():
+            location = escape(f'{PROTOCOL}://{domain}{reverse("blog:sitemap_segment", args=[year])}')
+            parts.append(
+                f'<sitemap><loc>{location}</loc><lastmod>{lastmod.date().isoformat()}</lastmod></sitemap>\n'
+            )
+        parts.append('</sitemapindex>\n')
+        return HttpResponse(''.join(parts), content_type=CONTENT_TYPE)
 
 
-class BlogSitemap(Sitemap):
-    changefreq = "weekly"
-    priority = 0.8
-    protocol = 'http'
+@query_budget(3)
+@method_decorator(conditional(sitemap_state), name='dispatch')
+class SitemapSegment(View):
+    """
+    The entries published in one year. The response is streamed while it is
+    generated and the bytes are cached, so it is only generated again after
+    an entry of that year, or a category, changes.
+    """
 
-    def items(self):
-        return Entry.objects.all()
+    def get(self, request, year, *args, **kwargs):
+        # sitemap_state() already counted the entries of the year.
+        if missing(request):
+            raise Http404(f'No entries in {year}')
+        domain = request.get_host()
+        key = SEGMENT_PREFIX + hashlib.md5(f'{domain}/{year}'.encode('utf-8')).hexdigest()
+        current = generations(segment_tags(year))
+        cached = lookup(key, current)
+        if cached is not None:
+            return compression.response(request, cached)
 
-    def lastmod(self, entry):
-        return entry.pub_date
+        def stream():
+            chunks = []
+            for chunk in segment_chunks(domain, year):
+                chunks.append(chunk)
+                yield chunk
+            store(key, current, compression.cached(b''.join(chunks), CONTENT_TYPE))
 
-    def location(self, entry):
-        return reverse(
-            'blog:entry',
-            kwargs={'category': entry.category.slug, 'slug': entry.slug}
-        )
+        response = StreamingHttpResponse(stream(), content_type=CONTENT_TYPE)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
@@ -0,0 +1,166 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.stemmer
+# description: Spanish Snowball stemmer over accent folded words
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import unicodedata
+
+# The Snowball algorithm for Spanish, http://snowball.tartarus.org/, applied
+# to words already folded by ``fold()``: the suffixes are listed without
+# accents and the final accent removal step is not needed.
+
+VOWELS = frozenset('aeiou')
+
+PRONOUNS = ('selas', 'selos', 'sela', 'selo', 'las', 'les', 'los', 'nos', 'me', 'se', 'la', 'le', 'lo')
+GERUNDS = ('iendo', 'ando', 'ar', 'er', 'ir')
+
+STANDARD = (
+    'amientos', 'imientos', 'amiento', 'imiento', 'anzas', 'ismos', 'ables', 'ibles', 'istas',
+    'anza', 'icos', 'icas', 'ismo', 'able', 'ible', 'ista', 'osos', 'osas', 'ico', 'ica', 'oso', 'osa',
+)
+ADOR = ('aciones', 'adoras', 'adores', 'ancias', 'adora', 'acion', 'antes', 'ancia', 'ador', 'ante')
+
+Y_VERBS = ('yeron', 'yendo', 'yamos', 'yais', 'yan', 'yen', 'yas', 'yes', 'ya', 'ye', 'yo')
+VERBS = tuple(sorted((
+    'arian', 'arias', 'aran', 'aras', 'ariais', 'aria', 'areis', 'ariamos', 'aremos', 'ara', 'are',
+    'erian', 'erias', 'eran', 'eras', 'eriais', 'eria', 'ereis', 'eriamos', 'eremos', 'era', 'ere',
+    'irian', 'irias', 'iran', 'iras', 'iriais', 'iria', 'ireis', 'iriamos', 'iremos', 'ira', 'ire',
+    'aba', 'ada', 'ida', 'ia', 'iera', 'ad', 'ed', 'id', 'ase', 'iese', 'aste', 'iste', 'an', 'aban',
+    'ian', 'ieran', 'asen', 'iesen', 'aron', 'ieron', 'ado', 'ido', 'ando', 'iendo', 'ar', 'er', 'ir',
+    'as', 'abas', 'adas', 'idas', 'ias', 'ieras', 'ases', 'ieses', 'is', 'ais', 'abais', 'iais',
+    'arais', 'ierais', 'aseis', 'ieseis', 'asteis', 'isteis', 'ados', 'idos', 'amos', 'abamos',
+    'iamos', 'imos', 'aramos', 'ieramos', 'iesemos', 'asemos',
+), key=len, reverse=True))
+EN_VERBS = ('emos', 'eis', 'en', 'es')
+RESIDUAL = ('os', 'a', 'o', 'i')
+
+
+def fold(text: str) -> str:
+    """ Lower case without accents, ``ñ`` is kept. """
+    text = text.lower().replace('ñ', '\0')
+    text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    return text.replace('\0', 'ñ')
+
+
+def _region(word: str, start: int = 0) -> int:
+    """ Start of the region after the first non-vowel following a vowel. """
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _rv(word: str) -> int:
+    if len(word) < 2:
+        return len(word)
+    if word[1] not in VOWELS:
+        for i in range(2, len(word)):
+            if word[i] in VOWELS:
+                return i + 1
+        return len(word)
+    if word[0] in VOWELS:
+        for i in range(2, len(word)):
+            if word[i] not in VOWELS:
+                return i + 1
+        return len(word)
+    return 3
+
+
+def _ends(word: str, suffixes, start: int):
+    """ The longest of ``suffixes`` that ends ``word`` inside the region. """
+    for suffix in suffixes:
+        if word.endswith(suffix) and len(word) - len(suffix) >= start:
+            return suffix
+    return None
+
+
+def _standard(word: str, r1: int, r2: int):
+    """ Step 1, returns the new word or None when nothing was removed. """
+    def before(suffix, *preceding, region=r2):
+        stem = word[:-len(suffix)]
+        for p in preceding:
+            if stem.endswith(p) and len(stem) - len(p) >= region:
+                return stem[:-len(p)]
+        return stem
+
+    for suffix in ('amente',):
+        if word.endswith(suffix) and len(word) - len(suffix) >= r1:
+            stem = word[:-len(suffix)]
+            if stem.endswith('iv') and len(stem) - 2 >= r2:
+                stem = stem[:-2]
+                if stem.endswith('at') and len(stem) - 2 >= r2:
+                    stem = stem[:-2]
+                return stem
+            return before(suffix, 'os', 'ic', 'ad')
+    suffix = _ends(word, ('idades', 'idad'), r2)
+    if suffix:
+        return before(suffix, 'abil', 'ic', 'iv')
+    suffix = _ends(word, ('mente',), r2)
+    if suffix:
+        return before(suffix, 'ante', 'able', 'ible')
+    suffix = _ends(word, ('logias', 'logia'), r2)
+    if suffix:
+        return word[:-len(suffix)] + 'log'
+    suffix = _ends(word, ('uciones', 'ucion'), r2)
+    if suffix:
+        return word[:-len(suffix)] + 'u'
+    suffix = _ends(word, ('encias', 'encia'), r2)
+    if suffix:
+        return word[:-len(suffix)] + 'ente'
+    suffix = _ends(word, ADOR, r2)
+    if suffix:
+        return before(suffix, 'ic')
+    suffix = _ends(word, ('ivas', 'ivos', 'iva', 'ivo'), r2)
+    if suffix:
+        return before(suffix, 'at')
+    suffix = _ends(word, STANDARD, r2)
+    if suffix:
+        return word[:-len(suffix)]
+    return None
+
+
+def stem(word: str) -> str:
+    """ The stem of a folded word. """
+    if len(word) < 3:
+        return word
+    rv, r1 = _rv(word), _region(word)
+    r2 = _region(word, r1)
+
+    # Step 0: attached pronouns.
+    pronoun = _ends(word, PRONOUNS, rv)
+    if pronoun:
+        stem_ = word[:-len(pronoun)]
+        if _ends(stem_, GERUNDS, rv) or (stem_.endswith('uyendo') and len(stem_) - 5 >= rv):
+            word = stem_
+
+    # Step 1: standard suffixes, step 2: verb suffixes.
+    standard = _standard(word, r1, r2)
+    if standard is not None:
+        word = standard
+    else:
+        suffix = _ends(word, Y_VERBS, rv)
+        if suffix and word[:-len(suffix)].endswith('u'):
+            word = word[:-len(suffix)]
+        else:
+            suffix = _ends(word, EN_VERBS, rv)
+            verb = _ends(word, VERBS, rv)
+            if suffix and (verb is None or len(suffix) >= len(verb)):
+                word = word[:-len(suffix)]
+                if word.endswith('gu') and len(word) - 1 >= rv:
+                    word = word[:-1]
+            elif verb:
+                word = word[:-len(verb)]
+
+    # Step 3: residual suffix.
+    suffix = _ends(word, RESIDUAL, rv)
+    if suffix:
+        word = word[:-len(suffix)]
+    elif word.endswith('e') and len(word) - 1 >= rv:
+        word = word[:-1]
+        if word.endswith('gu') and len(word) - 1 >= rv:
+            word = word[:-1]
+    return word
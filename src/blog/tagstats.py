@@ -0,0 +1,73 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.tagstats
+# description: Per tag counts of LIVE entries, for the tag pages and the tag cloud
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import math
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, Max
+from taggit.models import TaggedItem
+
+from .models import Entry, TagStat
+
+# Tags shown in the cloud, the most used ones, and the font sizes they get.
+CLOUD_SIZE = 60
+WEIGHTS = 5
+
+
+def tags_of(entry) -> dict:
+    """ ``{pk: slug}`` of the tags of ``entry``. """
+    return dict(
+        TaggedItem.objects
+        .filter(content_type=ContentType.objects.get_for_model(Entry), object_id=entry.pk)
+        .values_list('tag', 'tag__slug')
+    )
+
+
+def _counts(entries) -> dict:
+    rows = entries\
+        .filter(status=Entry.LIVE_STATUS)\
+        .values('tags')\
+        .annotate(count=Count('pk'), latest=Max('pub_date'))\
+        .order_by()
+    return {row['tags']: (row['count'], row['latest']) for row in rows if row['tags'] is not None}
+
+
+def recount(tag_pks) -> None:
+    """ Recounts the tags ``tag_pks`` in one aggregate query. """
+    tag_pks = set(tag_pks)
+    if not tag_pks:
+        return
+    counts = _counts(Entry.objects.filter(tags__in=tag_pks))
+    TagStat.objects.filter(tag__in=tag_pks - set(counts)).delete()
+    for pk, (count, latest) in counts.items():
+        TagStat.objects.update_or_create(tag_id=pk, defaults={'count': count, 'latest': latest})
+
+
+def rebuild() -> int:
+    """ Recomputes every count in one pass, returns the number of tags. """
+    counts = _counts(Entry.objects.all())
+    TagStat.objects.exclude(tag__in=counts).delete()
+    for pk, (count, latest) in counts.items():
+        TagStat.objects.update_or_create(tag_id=pk, defaults={'count': count, 'latest': latest})
+    return len(counts)
+
+
+def cloud(size: int = CLOUD_SIZE) -> list:
+    """
+    The ``size`` most used tags by name, in one query, each with a
+    ``weight`` from 1 to ``WEIGHTS`` on a logarithmic scale of its count.
+    """
+    stats = list(TagStat.objects.select_related('tag').order_by('-count', 'tag__name')[:size])
+    if not stats:
+        return []
+    low, high = math.log(stats[-1].count), math.log(stats[0].count)
+    for stat in stats:
+        scale = (math.log(stat.count) - low) / (high - low) if high > low else 0
+        stat.weight = 1 + round(scale * (WEIGHTS - 1))
+    return sorted(stats, key=lambda stat: stat.tag.name.lower())
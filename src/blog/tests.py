@@ -8,20 +8,51 @@
 #     licence: MIT
 #      python: 3.10
 
-from datetime import datetime
+import gzip
+import pickle
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
 import factory
+import pygments
+import pygments.lexers
 import pytz
+from asgiref.sync import async_to_sync
 from django.conf import settings
-from django.test import TestCase
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.paginator import EmptyPage
+from django.core.management.base import CommandError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.http import HttpResponse
+from django.urls import resolve, reverse
+from django.utils import timezone
 from django.utils.timezone import make_aware
 from django.views.generic import TemplateView
+from taggit.models import Tag
 
 from profiles.models import User
-from .models import Category, Traceability, Entry
+from .models import (
+    ArchiveMonth, Category, Traceability, Entry, HighlightedCode, Job, RelatedEntry, SearchDocument, SearchTerm, TagStat
+)
 from django.contrib.admin.sites import AdminSite
 from django.test import RequestFactory
 from .admin import EntryAdmin, CategoryAdmin
+from .benchmarks import corpus, plans, runner as benchmark_runner
+from . import (
+    archive, compression, export, highlight, homepage, importer, jobs, neighbours, related, renderer, routers, search,
+    stemmer, tagstats, views
+)
+from .cache import get_cache
+from .cards import cards
+from .context_processors import categories, category_snapshot
+from .export import StaticExporter
+from .pagination import KeysetPaginator, encode_cursor
 from .views import IndexView
 from django.test import Client
 
@@ -193,6 +224,1496 @@ pellentesque eu, pretium *quis, sem.*''',
         self.assertEqual([tag.slug for tag in self.simple_entry.tags.all()], [])
 
 
+class RendererTest(TestCase):
+    def setUp(self) -> None:
+        self.user = UserFactory()
+        self.category = CategoryFactory(slug='renderer')
+        self.entry = Entry.objects.create(
+            title='Rendered Entry',
+            summary='A **summary**',
+            body='[TOC]\n\n# Title\n\nBody[^1]\n\n[^1]: Note',
+            extend='Extended *text*',
+            category=self.category,
+            author=self.user
+        )
+
+    def test_pool_matches_markdown(self):
+        import markdown
+        text = '# Title\n\nBody[^1]\n\n[^1]: Note'
+        expected = markdown.markdown(text, output_format='html', extensions=renderer.MD_EXTENSIONS)
+        self.assertEqual(renderer.render(text), expected)
+        self.assertEqual(renderer.render(text), expected)
+
+    def test_entry_hashes(self):
+        self.assertEqual(self.entry.body_hash, renderer.source_hash(self.entry.body))
+        self.assertEqual(self.entry.summary_hash, renderer.source_hash(self.entry.summary))
+        self.assertEqual(self.entry.extend_hash, renderer.source_hash(self.entry.extend))
+
+    def test_metadata_save_skips_rendering(self):
+        entry = Entry.objects.get(pk=self.entry.pk)
+        entry.featured = True
+        with mock.patch.object(renderer, 'render') as render:
+            entry.save()
+        render.assert_not_called()
+
+    def test_changed_body_renders_only_body(self):
+        entry = Entry.objects.get(pk=self.entry.pk)
+        entry.body = 'New _body_'
+        self.assertEqual(entry.render(), ['body_html', 'body_hash'])
+        self.assertEqual(entry.body_html, '<p>New <em>body</em></p>')
+
+    def test_cleared_extend(self):
+        entry = Entry.objects.get(pk=self.entry.pk)
+        entry.extend = ''
+        entry.save()
+        self.assertEqual(entry.extend_html, '')
+
+
+class HighlightTest(TestCase):
+    code = '```python\ndef answer():\n    return 42\n```'
+
+    def setUp(self):
+        highlight.blocks.clear()
+        highlight.reset_stats()
+
+    def test_same_html_as_pygments(self):
+        with mock.patch.multiple(
+            'markdown.extensions.codehilite', highlight=pygments.highlight,
+            get_lexer_by_name=pygments.lexers.get_lexer_by_name, guess_lexer=pygments.lexers.guess_lexer
+        ):
+            expected = renderer.pool._build().convert(self.code)
+        self.assertIn('<span class="k">def</span>', expected)
+        self.assertEqual(renderer.render(self.code), expected)
+        self.assertEqual(renderer.render(self.code), expected)
+
+    def test_repeated_blocks_hit_memory_then_table(self):
+        html = renderer.render(self.code)
+        self.assertEqual(renderer.render(self.code), html)
+        self.assertEqual(highlight.stats()['misses'], 1)
+        self.assertEqual(highlight.stats()['memory_hits'], 1)
+        self.assertEqual(HighlightedCode.objects.count(), 1)
+
+        highlight.blocks.clear()
+        with mock.patch.object(pygments, 'highlight') as pygments_highlight:
+            self.assertEqual(renderer.render(self.code), html)
+        pygments_highlight.assert_not_called()
+        self.assertEqual(highlight.stats()['table_hits'], 1)
+
+    def test_options_are_part_of_the_key(self):
+        renderer.render(self.code)
+        renderer.render('```javascript\ndef answer():\n    return 42\n```')
+        self.assertEqual(highlight.stats()['misses'], 2)
+
+    def test_lexers_are_looked_up_once(self):
+        python = highlight.get_lexer_by_name('python')
+        with self.assertRaises(ValueError):
+            highlight.get_lexer_by_name('no-such-language')
+        with mock.patch('pygments.lexers.get_lexer_by_name') as lookup:
+            self.assertIs(highlight.get_lexer_by_name('python'), python)
+            with self.assertRaises(ValueError):
+                highlight.get_lexer_by_name('no-such-language')
+        lookup.assert_not_called()
+
+    def test_unknown_language_is_guessed(self):
+        html = renderer.render('```no-such-language\n#!/bin/bash\necho hola\n```')
+        self.assertIn('hola', html)
+
+
+class RerenderEntriesTest(TestCase):
+    def setUp(self) -> None:
+        self.user = UserFactory()
+        self.category = CategoryFactory(slug='rerender', description='*Old*')
+        self.entry = Entry.objects.create(
+            title='Rerender Entry',
+            body='_Hello_ **World**',
+            category=self.category,
+            author=self.user
+        )
+        Entry.objects.filter(pk=self.entry.pk).update(body_html='stale', body_hash='')
+        Category.objects.filter(pk=self.category.pk).update(description_html='stale', description_hash='')
+
+    def test_rerender(self):
+        call_command('rerender_entries', workers=1, stdout=StringIO())
+        self.entry.refresh_from_db()
+        self.category.refresh_from_db()
+        self.assertEqual(self.entry.body_html, '<p><em>Hello</em> <strong>World</strong></p>')
+        self.assertEqual(self.category.description_html, '<p><em>Old</em></p>')
+
+    def test_rerender_refreshes_the_pages(self):
+        get_cache().clear()
+        url = self.entry.get_absolute_url()
+        self.assertContains(self.client.get(url), 'stale')
+        call_command('rerender_entries', workers=1, stdout=StringIO())
+        self.assertContains(self.client.get(url), '<em>Hello</em>')
+        self.assertContains(self.client.get(self.category.get_absolute_url()), '<em>Old</em>')
+        self.assertIn(self.entry.pk, [pk for pk, _ in search.rank('hello')])
+
+    def test_rerender_dry_run(self):
+        out = StringIO()
+        call_command('rerender_entries', workers=1, dry_run=True, stdout=out)
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.body_html, 'stale')
+        self.assertIn('1 would change', out.getvalue())
+
+    def test_rerender_category_filter(self):
+        call_command('rerender_entries', workers=1, category='other', stdout=StringIO())
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.body_html, 'stale')
+
+
+class StaticExportTest(TestCase):
+    def setUp(self) -> None:
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.settings = override_settings(STATIC_EXPORT_ROOT=self.root.name, STATIC_EXPORT_HOST='testserver')
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        self.user = UserFactory()
+        self.category = CategoryFactory(slug='export')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.entry = Entry.objects.create(
+                title='Exported Entry',
+                body='_Hello_ **World**',
+                featured=True,
+                category=self.category,
+                author=self.user
+            )
+            Entry.objects.create(
+                title='Exported Neighbour',
+                body='Neighbour',
+                category=self.category,
+                author=self.user
+            )
+        jobs.work(once=True)
+
+    def exported(self, url):
+        return StaticExporter().path_for(url)
+
+    def test_save_exports_affected_pages(self):
+        self.assertTrue(self.exported(self.entry.get_absolute_url()).is_file())
+        self.assertTrue(self.exported(self.category.get_absolute_url()).is_file())
+        self.assertTrue(self.exported('/').is_file())
+        self.assertTrue(Path(self.root.name, 'sitemap.xml').is_file())
+        self.assertIn('Exported Entry', self.exported(self.entry.get_absolute_url()).read_text())
+
+    def test_large_batches_are_left_to_a_job(self):
+        url = self.category.get_absolute_url()
+        self.exported(url).unlink()
+        with self.captureOnCommitCallbacks(execute=True):
+            export.schedule([url])
+        self.assertTrue(self.exported(url).is_file())
+        self.exported(url).unlink()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Renamed'
+            self.category.save()
+        self.assertFalse(self.exported(url).exists())
+        self.assertEqual(Job.objects.get().payload['everything'], True)
+        jobs.work(once=True)
+        self.assertIn('Renamed', self.exported(url).read_text())
+
+    def test_unpublished_entry_is_removed(self):
+        self.entry.status = Entry.DRAFT_STATUS
+        with self.captureOnCommitCallbacks(execute=True):
+            self.entry.save()
+        self.assertFalse(self.exported(self.entry.get_absolute_url()).exists())
+
+    def test_deleted_entry_is_removed(self):
+        url = self.entry.get_absolute_url()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.entry.delete()
+        self.assertFalse(self.exported(url).exists())
+
+    def test_export_site(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        call_command('export_site', root=root.name, host='testserver', workers=1, stdout=StringIO())
+        self.assertTrue(Path(root.name, 'index.html').is_file())
+        self.assertTrue(Path(root.name, 'archivo.html').is_file())
+        self.assertTrue(Path(root.name, 'category', 'index.html').is_file())
+
+    def test_export_writes_compressed_variants(self):
+        page = self.exported(self.entry.get_absolute_url())
+        variant = page.with_name(page.name + '.gz')
+        self.assertEqual(gzip.decompress(variant.read_bytes()), page.read_bytes())
+        if compression.brotli is not None:
+            variant = page.with_name(page.name + '.br')
+            self.assertEqual(compression.brotli.decompress(variant.read_bytes()), page.read_bytes())
+        StaticExporter().remove(self.entry.get_absolute_url())
+        self.assertEqual(list(page.parent.glob(page.name + '*')), [])
+
+
+class ResponseCacheTest(TestCase):
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.user = UserFactory()
+        self.category = CategoryFactory(slug='cached')
+        self.other = CategoryFactory(slug='uncached')
+        self.entry = Entry.objects.create(
+            title='Cached Entry',
+            body='_Hello_ **World**',
+            category=self.category,
+            author=self.user
+        )
+        self.unrelated = Entry.objects.create(
+            title='Unrelated Entry',
+            body='Other',
+            pub_date=make_aware(datetime(2020, 1, 1), pytz.timezone(settings.TIME_ZONE)),
+            category=self.other,
+            author=self.user
+        )
+        Entry.objects.create(
+            title='Neighbour Entry',
+            body='Between',
+            pub_date=make_aware(datetime(2021, 1, 1), pytz.timezone(settings.TIME_ZONE)),
+            category=self.other,
+            author=self.user
+        )
+        self.url = self.entry.get_absolute_url()
+        self.client.get(self.url)
+
+    def test_cache_hit_runs_no_queries(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Cached Entry')
+
+    def test_other_parameters_share_the_page(self):
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {'utm_source': 'feed', 'fbclid': 'x'})
+        self.client.get('/', {'page': 1})
+        with self.assertNumQueries(0):
+            self.client.get('/', {'utm_source': 'feed', 'page': 1})
+        # Declared ones are pages of their own.
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/')
+        self.assertTrue(queries)
+
+    def test_entry_change_evicts_page(self):
+        self.entry.title = 'Renamed Entry'
+        self.entry.save()
+        self.assertContains(self.client.get(self.url), 'Renamed Entry')
+
+    def test_unrelated_change_keeps_page(self):
+        self.unrelated.featured = True
+        self.unrelated.save()
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_tag_change_evicts_page(self):
+        self.entry.tags.add('cacheable')
+        self.assertContains(self.client.get(self.url), 'cacheable')
+
+    def test_category_change_evicts_page(self):
+        self.other.name = 'Renamed Category'
+        self.other.save()
+        self.assertContains(self.client.get(self.url), 'Renamed Category')
+
+    def test_cache_hit_is_served_compressed(self):
+        identity = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), identity.content)
+        self.assertFalse(identity.has_header('Content-Encoding'))
+        self.assertEqual(response['ETag'], 'W/' + identity['ETag'])
+
+
+class CompressionTest(TestCase):
+    def setUp(self) -> None:
+        self.factory = RequestFactory()
+
+    def negotiate(self, header, variants=('br', 'gzip')):
+        return compression.negotiate(self.factory.get('/', HTTP_ACCEPT_ENCODING=header), variants)
+
+    def test_negotiate(self):
+        self.assertEqual(self.negotiate('gzip, deflate, br'), 'br')
+        self.assertEqual(self.negotiate('br;q=0.5, gzip'), 'gzip')
+        self.assertEqual(self.negotiate('gzip', variants=('br',)), None)
+        self.assertEqual(self.negotiate('*;q=0.1'), 'br')
+        self.assertEqual(self.negotiate('br;q=0, gzip;q=0'), None)
+        self.assertEqual(self.negotiate(''), None)
+
+    def test_small_content_is_not_compressed(self):
+        self.assertEqual(compression.compress(b'<p>Hola</p>'), {})
+        self.assertIn('gzip', compression.compress(b'<p>Hola</p>' * 100))
+
+
+class NeighboursTest(TestCase):
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.user = UserFactory()
+        self.category = CategoryFactory(slug='neighbours')
+        self.first = self.create('First', 2020)
+        self.second = self.create('Second', 2021)
+        self.third = self.create('Third', 2022)
+
+    def create(self, title, year, **kwargs):
+        return Entry.objects.create(
+            title=title,
+            body=title,
+            pub_date=make_aware(datetime(year, 1, 1), pytz.timezone(settings.TIME_ZONE)),
+            category=self.category,
+            author=self.user,
+            **kwargs
+        )
+
+    def links(self, entry):
+        entry.refresh_from_db()
+        return entry.previous_entry_id, entry.next_entry_id
+
+    def test_links_on_insert(self):
+        self.assertEqual(self.links(self.first), (None, self.second.pk))
+        self.assertEqual(self.links(self.second), (self.first.pk, self.third.pk))
+        self.assertEqual(self.links(self.third), (self.second.pk, None))
+        self.assertEqual(self.second.anterior(), self.first)
+        self.assertEqual(self.second.siguiente(), self.third)
+
+    def test_pub_date_change(self):
+        self.first.pub_date = make_aware(datetime(2023, 1, 1), pytz.timezone(settings.TIME_ZONE))
+        self.first.save()
+        self.assertEqual(self.links(self.second), (None, self.third.pk))
+        self.assertEqual(self.links(self.third), (self.second.pk, self.first.pk))
+        self.assertEqual(self.links(self.first), (self.third.pk, None))
+
+    def test_only_live_entries_are_linked(self):
+        self.second.status = Entry.DRAFT_STATUS
+        self.second.save()
+        self.assertEqual(self.links(self.first), (None, self.third.pk))
+        self.assertEqual(self.links(self.third), (self.first.pk, None))
+        hidden = self.create('Hidden', 2024, status=Entry.HIDDEN_STATUS)
+        self.assertEqual(self.links(self.third), (self.first.pk, None))
+        self.assertEqual(self.links(hidden), (self.third.pk, None))
+
+    def test_delete(self):
+        self.second.delete()
+        self.assertEqual(self.links(self.first), (None, self.third.pk))
+        self.assertEqual(self.links(self.third), (self.first.pk, None))
+
+    def test_rebuild(self):
+        Entry.objects.update(previous_entry=None, next_entry=None)
+        self.assertEqual(neighbours.rebuild(Entry), 3)
+        self.assertEqual(self.links(self.second), (self.first.pk, self.third.pk))
+
+    def test_post_page_neighbour_queries(self):
+        with CaptureQueriesContext(connection) as lonely:
+            self.client.get(self.first.get_absolute_url())
+        get_cache().clear()
+        with CaptureQueriesContext(connection) as linked:
+            response = self.client.get(self.second.get_absolute_url())
+        self.assertContains(response, self.first.get_absolute_url())
+        self.assertContains(response, self.third.get_absolute_url())
+        self.assertEqual(len(linked), len(lonely))
+
+
+class CategorySnapshotTest(TestCase):
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.user = UserFactory()
+        self.category = CategoryFactory(name='Menu Category', slug='menu')
+        Entry.objects.create(title='Counted', body='Counted', category=self.category, author=self.user)
+        Entry.objects.create(
+            title='Draft', body='Draft', status=Entry.DRAFT_STATUS, category=self.category, author=self.user
+        )
+
+    def test_snapshot_lists_categories(self):
+        self.assertEqual([c.slug for c in category_snapshot()], ['menu'])
+
+    def test_snapshot_is_reused(self):
+        category_snapshot()
+        with self.assertNumQueries(0):
+            self.assertEqual(len(category_snapshot()), 1)
+
+    def test_snapshot_is_lazy(self):
+        with self.assertNumQueries(0):
+            categories(None)
+
+    def test_category_change_invalidates(self):
+        category_snapshot()
+        self.category.name = 'Renamed Menu'
+        self.category.save()
+        self.assertEqual(category_snapshot()[0].name, 'Renamed Menu')
+
+    def test_entry_change_keeps_snapshot(self):
+        category_snapshot()
+        Entry.objects.create(title='Another', body='Another', category=self.category, author=self.user)
+        with self.assertNumQueries(0):
+            category_snapshot()
+
+
+class EntryCardTest(TestCase):
+    def setUp(self) -> None:
+        self.user = UserFactory()
+        self.category = CategoryFactory(slug='cards', name='Cards', icon='code')
+        self.entry = Entry.objects.create(
+            title='Card', body='**Long** body ' * 100, cover='https://example.com/card.png',
+            category=self.category, author=self.user
+        )
+
+    def test_excerpt_is_rendered_on_save(self):
+        self.assertEqual(self.entry.excerpt, renderer.excerpt('', self.entry.body_html))
+        self.assertLessEqual(len(self.entry.excerpt), renderer.EXCERPT_LENGTH)
+        self.entry.summary = 'A *summary*'
+        self.entry.save()
+        self.assertEqual(self.entry.resumen(), 'A *summary*')
+
+    def test_same_interface_without_the_text_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            card = cards(Entry.objects.filter(pk=self.entry.pk)).get()
+        self.assertNotIn('body_html', queries[0]['sql'])
+        self.assertEqual(card, self.entry)
+        for method in ('get_absolute_url', 'imagen', 'resumen', '__str__'):
+            self.assertEqual(getattr(card, method)(), getattr(self.entry, method)())
+        self.assertEqual(str(card.category), 'Cards')
+        self.assertEqual(card.category.icon, 'code')
+        self.assertFalse(hasattr(card, '__dict__'))
+        self.assertEqual(pickle.loads(pickle.dumps(card)).get_absolute_url(), card.get_absolute_url())
+
+
+class HomepageTest(TestCase):
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.user = UserFactory()
+        self.category = CategoryFactory(slug='homepage')
+
+    def create(self, count, **kwargs):
+        created = []
+        start = self.category.entry_category.count()
+        for n in range(start, start + count):
+            created.append(Entry.objects.create(
+                title=f'Entry {n}', body=f'Entry {n}', category=self.category, author=self.user, **kwargs
+            ))
+        return created[::-1]
+
+    def test_slots(self):
+        featured = self.create(3, featured=True)
+        regular = self.create(12)
+        self.create(2, status=Entry.DRAFT_STATUS)
+        built = homepage.build()
+        self.assertEqual(built['sticky'], featured[0])
+        self.assertEqual(built['featured'], featured[1:])
+        self.assertEqual(built['primeros'], regular[:4])
+
+    def test_category_sidebar_is_live_only(self):
+        featured = self.create(1, featured=True)
+        self.create(1, featured=True, status=Entry.DRAFT_STATUS)
+        response = self.client.get(self.category.get_absolute_url())
+        self.assertEqual(list(response.context['featured']), featured)
+
+    def test_without_featured_entries(self):
+        self.create(2)
+        self.assertIsNone(homepage.build()['sticky'])
+        self.assertEqual(self.client.get('/').status_code, 200)
+
+    def test_build_is_cached(self):
+        self.create(3)
+        with self.assertNumQueries(2):
+            homepage.build()
+        with self.assertNumQueries(0):
+            homepage.build()
+
+    def test_index_queries_do_not_grow(self):
+        self.create(11, featured=True)
+        self.create(20)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/?page=2')
+        self.create(20)
+        get_cache().clear()
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/?page=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(many), len(few))
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.user = UserFactory()
+        self.category = CategoryFactory(slug='keyset')
+        now = timezone.now()
+        # Two entries share each date to exercise the id tie-breaker.
+        self.entries = [
+            Entry.objects.create(
+                title=f'Entry {n}', body=f'Entry {n}', category=self.category, author=self.user,
+                pub_date=now - timedelta(days=n // 2)
+            )
+            for n in range(17)
+        ]
+        self.ordered = list(Entry.objects.order_by('-pub_date', '-id'))
+
+    def paginator(self, offset=0):
+        return KeysetPaginator(Entry.objects.all(), 5, offset=offset, cache_key='blog:pages:test', cache_tags=('entries',))
+
+    def test_pages_by_number(self):
+        paginator = self.paginator()
+        self.assertEqual(paginator.count, 17)
+        self.assertEqual(paginator.num_pages, 4)
+        for number in paginator.page_range:
+            page = paginator.page(number)
+            self.assertEqual(list(page), self.ordered[(number - 1) * 5:number * 5])
+
+    def test_offset(self):
+        paginator = self.paginator(offset=4)
+        self.assertEqual(paginator.count, 13)
+        self.assertEqual(list(paginator.page(1)), self.ordered[4:9])
+        self.assertEqual(list(paginator.page(3)), self.ordered[14:])
+        self.assertFalse(paginator.page(1).has_previous())
+
+    def test_cursors(self):
+        paginator = self.paginator()
+        page = paginator.page(2)
+        following = paginator.page_after(page.next_cursor)
+        self.assertEqual(list(following), self.ordered[10:15])
+        self.assertTrue(following.has_next() and following.has_previous())
+        last = paginator.page_after(following.next_cursor)
+        self.assertEqual(list(last), self.ordered[15:])
+        self.assertFalse(last.has_next())
+        preceding = paginator.page_before(page.previous_cursor)
+        self.assertEqual(list(preceding), self.ordered[:5])
+        self.assertFalse(preceding.has_previous())
+        self.assertFalse(self.paginator(offset=4).page_before(encode_cursor((self.ordered[8].pub_date, self.ordered[8].pk))).has_previous())
+
+    def test_deep_page_costs_the_same(self):
+        paginator = self.paginator()
+        paginator.index
+        with self.assertNumQueries(1):
+            paginator.page(1)
+        with self.assertNumQueries(1):
+            paginator.page(4)
+        with self.assertNumQueries(0):
+            self.paginator().index
+        cursor = encode_cursor((self.ordered[14].pub_date, self.ordered[14].pk))
+        with self.assertNumQueries(1):
+            self.assertEqual(list(self.paginator().page_after(cursor)), self.ordered[15:])
+
+    def test_numbered_pages_window(self):
+        paginator = self.paginator()
+        paginator.window = 2
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(paginator.num_pages, 2)
+        self.assertIn('LIMIT 11', queries[0]['sql'])
+        page = paginator.page(2)
+        self.assertTrue(page.has_next())
+        self.assertEqual(list(paginator.page_after(page.next_cursor)), self.ordered[10:15])
+        with self.assertRaises(EmptyPage):
+            paginator.page(3)
+
+    def test_index_invalidated(self):
+        self.assertEqual(self.paginator().count, 17)
+        Entry.objects.create(title='Another', body='Another', category=self.category, author=self.user)
+        self.assertEqual(self.paginator().count, 18)
+
+    def test_views(self):
+        url = reverse('blog:category', kwargs={'slug': 'keyset'})
+        response = self.client.get(url, {'page': 2})
+        self.assertEqual(list(response.context['entries']), self.ordered[6:12])
+        cursor = response.context['page_obj'].next_cursor
+        self.assertContains(response, f'?after={cursor}')
+        response = self.client.get(url, {'after': cursor})
+        self.assertEqual(list(response.context['entries']), self.ordered[12:])
+        self.assertContains(response, '?before=')
+        self.assertNotContains(response, '?after=')
+        self.assertEqual(self.client.get(url, {'after': 'not-a-cursor'}).status_code, 404)
+        self.assertEqual(self.client.get(url, {'page': 9}).status_code, 404)
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.user = UserFactory()
+        self.category = CategoryFactory(slug='conditional')
+        self.entries = [
+            Entry.objects.create(
+                title=f'Entry {n}', body=f'Entry {n}', category=self.category, author=self.user, featured=n == 0
+            )
+            for n in range(3)
+        ]
+
+    def urls(self):
+        entry = Entry.objects.get(pk=self.entries[1].pk)
+        return [
+            '/', reverse('blog:category', kwargs={'slug': 'conditional'}), entry.get_absolute_url(),
+            reverse('blog:sitemap'), reverse('blog:django.contrib.sitemaps.views.sitemap'),
+        ]
+
+    def test_validators_sent(self):
+        for url in self.urls():
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertTrue(response.has_header('ETag'), url)
+            self.assertTrue(response.has_header('Last-Modified'), url)
+
+    def test_not_modified_before_rendering(self):
+        for url in self.urls():
+            etag = self.client.get(url)['ETag']
+            with mock.patch('django.template.response.SimpleTemplateResponse.render') as render, \
+                    self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, url)
+            render.assert_not_called()
+
+    def test_if_modified_since(self):
+        url = self.entries[1].get_absolute_url()
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_changes_are_detected(self):
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls()}
+        neighbour = Entry.objects.get(pk=self.entries[2].pk)
+        neighbour.title = 'Retitled'
+        neighbour.save()
+        for url, etag in etags.items():
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200, url)
+
+    def test_deletion_is_detected(self):
+        url = '/'
+        etag = self.client.get(url)['ETag']
+        Entry.objects.filter(pk=self.entries[2].pk).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class FeedTest(TestCase):
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.user = UserFactory()
+        self.django = CategoryFactory(slug='feed-django', name='Django')
+        self.linux = CategoryFactory(slug='feed-linux', name='Linux')
+        self.entry = Entry.objects.create(
+            title='Vistas genéricas', body='El **cuerpo** completo', summary='El resumen',
+            category=self.django, author=self.user
+        )
+        Entry.objects.create(title='Shell', body='Bash', category=self.linux, author=self.user)
+        Entry.objects.create(
+            title='Borrador', body='Borrador', category=self.django, author=self.user, status=Entry.DRAFT_STATUS
+        )
+
+    def test_site_feeds(self):
+        rss = self.client.get(reverse('blog:feed'))
+        self.assertEqual(rss.status_code, 200)
+        self.assertIn('application/rss+xml', rss['Content-Type'])
+        self.assertContains(rss, 'Vistas genéricas')
+        self.assertContains(rss, 'Shell')
+        self.assertNotContains(rss, 'Borrador')
+        atom = self.client.get(reverse('blog:feed_atom'))
+        self.assertIn('application/atom+xml', atom['Content-Type'])
+        self.assertContains(atom, '<summary type="html">&lt;p&gt;El resumen&lt;/p&gt;</summary>', html=False)
+        self.assertContains(atom, '<content type="html">&lt;p&gt;El &lt;strong&gt;cuerpo&lt;/strong&gt; completo&lt;/p&gt;</content>')
+
+    def test_category_feeds(self):
+        response = self.client.get(reverse('blog:category_feed_atom', args=['feed-linux']))
+        self.assertContains(response, 'Shell')
+        self.assertNotContains(response, 'Vistas genéricas')
+        self.assertEqual(self.client.get(reverse('blog:category_feed', args=['no-such-category'])).status_code, 404)
+
+    def test_polling_costs_nothing(self):
+        url = reverse('blog:feed_atom')
+        first = self.client.get(url)
+        self.assertTrue(first.has_header('Last-Modified'))
+        with self.assertNumQueries(0):
+            again = self.client.get(url)
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_regenerated_only_for_live_entries_in_scope(self):
+        site, linux = reverse('blog:feed'), reverse('blog:category_feed', args=['feed-linux'])
+        for url in (site, linux):
+            self.client.get(url)
+        Entry.objects.create(
+            title='Otro borrador', body='Borrador', category=self.django, author=self.user, status=Entry.DRAFT_STATUS
+        )
+        self.entry.title = 'Vistas basadas en clases'
+        self.entry.save()
+        with self.assertNumQueries(0):
+            self.client.get(linux)
+        self.assertContains(self.client.get(site), 'Vistas basadas en clases')
+
+
+class SitemapTest(TestCase):
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.user = UserFactory()
+        self.category = CategoryFactory(slug='sitemap')
+        self.old = [
+            Entry.objects.create(
+                title=f'Old {n}', body='Old', category=self.category, author=self.user,
+                pub_date=make_aware(datetime(2020, 6, n + 1))
+            )
+            for n in range(3)
+        ]
+        self.new = Entry.objects.create(
+            title='New', body='New', category=self.category, author=self.user,
+            pub_date=make_aware(datetime(2022, 6, 1))
+        )
+        self.draft = Entry.objects.create(
+            title='Draft', body='Draft', category=self.category, author=self.user,
+            pub_date=make_aware(datetime(2020, 7, 1)), status=Entry.DRAFT_STATUS
+        )
+
+    def segment(self, year):
+        response = self.client.get(reverse('blog:sitemap_segment', args=[year]))
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, content.decode('utf-8')
+
+    def test_index_lists_years(self):
+        response = self.client.get('/sitemap.xml')
+        self.assertContains(response, '/sitemap-2020.xml')
+        self.assertContains(response, '/sitemap-2022.xml')
+        self.assertNotContains(response, '/sitemap-2021.xml')
+
+    def test_index_per_host(self):
+        self.assertContains(self.client.get('/sitemap.xml'), 'http://testserver/sitemap-2020.xml')
+        response = self.client.get('/sitemap.xml', HTTP_HOST='localhost')
+        self.assertContains(response, 'http://localhost/sitemap-2020.xml')
+        self.assertNotContains(response, 'testserver')
+
+    def test_segment_lists_live_entries_of_the_year(self):
+        status, content = self.segment(2020)
+        self.assertEqual(status, 200)
+        for entry in self.old:
+            self.assertIn(entry.get_absolute_url(), content)
+        self.assertNotIn(self.draft.get_absolute_url(), content)
+        self.assertNotIn(self.new.get_absolute_url(), content)
+        updated_at = Entry.objects.get(pk=self.old[0].pk).updated_at
+        self.assertIn(f'<lastmod>{updated_at.date().isoformat()}</lastmod>', content)
+        with self.assertNoLogs('blog.instrumentation', 'WARNING'):
+            self.assertEqual(self.segment(2019)[0], 404)
+
+    def test_segment_queries_do_not_grow(self):
+        # The validators and the segment, one projected query.
+        with self.assertNumQueries(3):
+            self.client.get(reverse('blog:sitemap_segment', args=[2020])).getvalue()
+        with self.assertNumQueries(0):
+            self.client.get(reverse('blog:sitemap_segment', args=[2020]))
+
+    def test_only_changed_segment_regenerated(self):
+        self.segment(2020)
+        self.segment(2022)
+        entry = Entry.objects.get(pk=self.old[1].pk)
+        entry.title = 'Renamed'
+        entry.save()
+        with self.assertNumQueries(0):
+            self.segment(2022)
+        with self.assertNumQueries(3):
+            self.segment(2020)
+
+
+class ArchiveTest(TestCase):
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.user = UserFactory()
+        self.category = CategoryFactory(slug='archive')
+        self.old = [
+            Entry.objects.create(
+                title=f'Old {n}', body='Old', category=self.category, author=self.user,
+                pub_date=make_aware(datetime(2020, 6, n + 1, 12))
+            )
+            for n in range(3)
+        ]
+        self.current = Entry.objects.create(title='Current', body='Current', category=self.category, author=self.user)
+
+    def counts(self):
+        return {(month.year, month.month): month.count for month in ArchiveMonth.objects.all()}
+
+    def test_counts_kept_by_signals(self):
+        now = timezone.localtime()
+        self.assertEqual(self.counts(), {(2020, 6): 3, (now.year, now.month): 1})
+        entry = self.old[0]
+        entry.status = Entry.DRAFT_STATUS
+        entry.save()
+        self.assertEqual(self.counts()[(2020, 6)], 2)
+        entry.status = Entry.LIVE_STATUS
+        entry.pub_date = make_aware(datetime(2019, 1, 5, 12))
+        entry.save()
+        self.assertEqual(self.counts()[(2019, 1)], 1)
+        Entry.objects.get(pk=self.current.pk).delete()
+        self.assertNotIn((now.year, now.month), self.counts())
+
+    def test_rebuild(self):
+        expected = self.counts()
+        ArchiveMonth.objects.all().delete()
+        ArchiveMonth.objects.create(year=1999, month=1, count=7)
+        self.assertEqual(archive.rebuild(), 2)
+        self.assertEqual(self.counts(), expected)
+
+    def test_archive_index(self):
+        response = self.client.get(reverse('blog:sitemap'))
+        self.assertContains(response, reverse('blog:archive_month', kwargs={'year': 2020, 'month': 6}))
+        self.assertNotContains(response, self.old[0].get_absolute_url())
+
+    def test_month_page(self):
+        url = reverse('blog:archive_month', kwargs={'year': 2020, 'month': 6})
+        response = self.client.get(url)
+        for entry in self.old:
+            self.assertContains(response, entry.get_absolute_url())
+        self.assertNotContains(response, self.current.get_absolute_url())
+        self.assertEqual(self.client.get('/archivo/2020/7/').status_code, 404)
+        self.assertEqual(self.client.get('/archivo/2020/13/').status_code, 404)
+
+    def test_closed_month_fragment_is_cached(self):
+        archive.fragment(2020, 6)
+        with self.assertNumQueries(0):
+            archive.fragment(2020, 6)
+        entry = Entry.objects.get(pk=self.old[1].pk)
+        entry.title = 'Renamed'
+        entry.save()
+        self.assertIn('Renamed', archive.fragment(2020, 6))
+
+    def test_current_month_is_rendered(self):
+        now = timezone.localtime()
+        with self.assertNumQueries(1):
+            archive.fragment(now.year, now.month)
+        with self.assertNumQueries(1):
+            archive.fragment(now.year, now.month)
+
+
+class SearchTest(TestCase):
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.user = UserFactory()
+        self.category = CategoryFactory(slug='search')
+        self.django = self.create('Configuración de Django', 'Cómo configurar un servidor con Django y nginx.')
+        self.python = self.create('Programación en Python', 'Programando scripts para la administración.')
+        self.draft = self.create('Borrador sobre Django', 'Django', status=Entry.DRAFT_STATUS)
+
+    def create(self, title, body, **kwargs):
+        return Entry.objects.create(title=title, body=body, category=self.category, author=self.user, **kwargs)
+
+    def test_stemming_and_accent_folding(self):
+        self.assertEqual(stemmer.stem(stemmer.fold('Configuración')), stemmer.stem(stemmer.fold('configurar')))
+        self.assertEqual(search.search('configuracion'), [self.django])
+        self.assertEqual(search.search('PROGRAMAR'), [self.python])
+        self.assertEqual(search.search('de la'), [])
+
+    def test_ranking(self):
+        nginx = self.create('nginx', 'Servidor web nginx, nginx y más nginx.')
+        self.assertEqual(search.search('nginx'), [nginx, self.django])
+        # Scored and cut by the database, one query for the postings.
+        with self.assertNumQueries(3):
+            ranked = search.rank('nginx servidor', limit=1)
+        self.assertEqual([pk for pk, _ in ranked], [nginx.pk])
+
+    def test_drafts_only_in_admin(self):
+        self.assertNotIn(self.draft, search.search('django'))
+        self.assertIn(self.draft.pk, [pk for pk, _ in search.rank('django', live=False)])
+
+    def test_incremental_update(self):
+        entry = Entry.objects.get(pk=self.python.pk)
+        entry.title = 'Scripts de Bash'
+        entry.body = 'Automatización con bash.'
+        entry.save()
+        self.assertEqual(search.search('python'), [])
+        self.assertEqual(search.search('bash'), [entry])
+        self.assertEqual(SearchTerm.objects.get(term=stemmer.stem('python')).documents, 0)
+        with self.assertNumQueries(1):
+            self.assertFalse(search.index_entry(entry))
+
+    def test_delete(self):
+        Entry.objects.get(pk=self.django.pk).delete()
+        self.assertEqual(search.search('nginx'), [])
+        self.assertEqual(SearchTerm.objects.get(term='nginx').documents, 0)
+
+    def test_rebuild(self):
+        SearchDocument.objects.all().delete()
+        SearchTerm.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('3 entries indexed', out.getvalue())
+        self.assertEqual(search.search('servidor'), [self.django])
+
+    def test_view(self):
+        response = self.client.get(reverse('blog:search'), {'q': 'servidores'})
+        self.assertContains(response, self.django.get_absolute_url())
+        self.assertNotContains(response, self.python.get_absolute_url())
+        self.assertEqual(self.client.get(reverse('blog:search')).status_code, 200)
+
+    def test_cached_by_terms(self):
+        get_cache().clear()
+        self.assertEqual(search.cached_search('Servidores'), [self.django])
+        with self.assertNumQueries(0):
+            self.assertEqual(search.cached_search('  servidor  SERVIDORES '), [self.django])
+        response = self.client.get(reverse('blog:search'), {'q': 'SERVIDOR', 'utm': 'x'})
+        self.assertContains(response, 'SERVIDOR')
+        self.assertContains(response, self.django.get_absolute_url())
+
+    def test_admin_search(self):
+        admin = EntryAdmin(Entry, AdminSite())
+        queryset, distinct = admin.get_search_results(None, Entry.objects.all(), 'django')
+        self.assertEqual(set(queryset), {self.django, self.draft})
+        self.assertFalse(distinct)
+        self.assertFalse(admin.get_search_results(None, Entry.objects.all(), 'de la')[0].exists())
+
+
+class RelatedEntriesTest(TestCase):
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.user = UserFactory()
+        self.category = CategoryFactory(slug='related')
+        self.other = CategoryFactory(slug='related-other')
+        self.django = self.create('Django', ['django', 'python', 'web'])
+        self.orm = self.create('ORM', ['django', 'python', 'sql'])
+        self.flask = self.create('Flask', ['python', 'web'])
+        self.bash = self.create('Bash', ['shell'], category=self.other)
+
+    def create(self, title, tags, **kwargs):
+        kwargs.setdefault('category', self.category)
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = Entry.objects.create(title=title, body=title, author=self.user, **kwargs)
+            entry.tags.add(*tags)
+        return entry
+
+    def related(self, entry):
+        return related.for_entry(entry)
+
+    def test_similarity_order(self):
+        # Flask shares fewer tags but has no other, ORM also has sql.
+        self.assertEqual(self.related(self.django), [self.flask, self.orm])
+        self.assertEqual(self.related(self.bash), [])
+
+    def test_build_matches_incremental(self):
+        lists = {entry.pk: self.related(entry) for entry in Entry.objects.all()}
+        RelatedEntry.objects.all().delete()
+        call_command('build_related', stdout=StringIO())
+        self.assertEqual({entry.pk: self.related(entry) for entry in Entry.objects.all()}, lists)
+
+    def test_tag_change_updates_affected(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bash.tags.add('django', 'python', 'sql')
+        self.assertEqual(self.related(self.orm)[0], self.bash)
+        self.assertIn(self.bash, self.related(self.django))
+
+    def test_update_loads_the_neighbourhood(self):
+        self.assertEqual(set(related.neighbourhood({self.bash.pk})), {self.bash})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bash.tags.add('web')
+        self.assertEqual(set(related.neighbourhood({self.bash.pk})), {self.bash, self.django, self.flask})
+        self.assertEqual(self.related(self.bash), [self.flask, self.django])
+
+    def test_draft_and_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.orm.status = Entry.DRAFT_STATUS
+            self.orm.save()
+        self.assertEqual(self.related(self.django), [self.flask])
+        self.assertFalse(RelatedEntry.objects.filter(entry=self.orm).exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            Entry.objects.get(pk=self.flask.pk).delete()
+        self.assertEqual(self.related(self.django), [])
+
+    def test_post_page(self):
+        response = self.client.get(self.django.get_absolute_url())
+        self.assertContains(response, self.orm.get_absolute_url())
+        with self.assertNumQueries(1):
+            related.for_entry(self.django)
+
+    def test_page_refreshed_when_list_changes(self):
+        url = self.django.get_absolute_url()
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bash.tags.add('django', 'python', 'web')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.bash.get_absolute_url())
+
+
+class QueryBudgetMixin:
+    """ Requests a URL with cold caches and checks the view's query budget. """
+
+    def measure(self, url, **extra):
+        get_cache().clear()
+        response = self.client.get(url, **extra)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def assertQueryBudget(self, url, **extra):
+        response = self.measure(url, **extra)
+        metrics = response.wsgi_request.metrics
+        self.assertIsNotNone(metrics.budget, f'{metrics.view} declares no query budget')
+        self.assertLessEqual(
+            metrics.queries, metrics.budget,
+            f'{url} ran {metrics.queries} queries, {metrics.view} allows {metrics.budget}'
+        )
+        return response
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        categories = [CategoryFactory(slug=f'budget-{n}') for n in range(3)]
+        cls.entries = []
+        for n in range(40):
+            entry = Entry.objects.create(
+                title=f'Budget {n}', body=f'Budget {n}', author=cls.user, category=categories[n % 3],
+                featured=n % 7 == 0, pub_date=make_aware(datetime(2021 + n % 2, n % 12 + 1, 1))
+            )
+            entry.tags.add(f'tag-{n % 5}', f'tag-{n % 3}')
+            cls.entries.append(entry)
+
+    def urls(self):
+        entry = Entry.objects.order_by('pk')[20]
+        return [
+            '/',
+            '/?page=5',
+            reverse('blog:category', kwargs={'slug': 'budget-1'}),
+            reverse('blog:category', kwargs={'slug': 'budget-1'}) + '?page=2',
+            reverse('blog:category_list'),
+            reverse('blog:tag', args=['tag-1']),
+            reverse('blog:tag', args=['tag-1']) + '?page=2',
+            reverse('blog:tag_list'),
+            entry.get_absolute_url(),
+            reverse('blog:sitemap'),
+            reverse('blog:archive_month', kwargs={'year': 2021, 'month': 1}),
+            reverse('blog:search') + '?q=budget',
+            reverse('blog:django.contrib.sitemaps.views.sitemap'),
+            reverse('blog:sitemap_segment', args=[2021]),
+            reverse('blog:feed'),
+            reverse('blog:category_feed_atom', args=['budget-1']),
+        ]
+
+    def test_public_views_within_budget(self):
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.assertQueryBudget(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_missing_pages_within_budget(self):
+        urls = [
+            reverse('blog:category', kwargs={'slug': 'missing'}),
+            reverse('blog:tag', args=['missing']),
+            reverse('blog:sitemap_segment', args=[2019]),
+        ]
+        for url in urls:
+            with self.subTest(url=url), self.assertNoLogs('blog.instrumentation', 'WARNING'):
+                self.assertEqual(self.assertQueryBudget(url).status_code, 404)
+
+    def test_metrics_do_not_grow_with_the_corpus(self):
+        counts = {url: self.measure(url).wsgi_request.metrics.queries for url in self.urls()}
+        for n in range(20):
+            Entry.objects.create(title=f'More {n}', body='More', author=self.user, category=self.entries[0].category)
+        for url, count in counts.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.measure(url).wsgi_request.metrics.queries, count)
+
+    @override_settings(BLOG_SERVER_TIMING=True)
+    def test_server_timing(self):
+        get_cache().clear()
+        self.client.get('/')
+        response = self.client.get('/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('cache;desc=', response['Server-Timing'])
+        self.assertGreater(response.wsgi_request.metrics.cache_hits, 0)
+        self.assertEqual(response.wsgi_request.metrics.queries, 0)
+
+    def test_over_budget_is_logged(self):
+        with mock.patch.object(views.BlogIndex, 'query_budget', 0), \
+                self.assertLogs('blog.instrumentation', level='WARNING') as logs:
+            get_cache().clear()
+            self.client.get('/')
+        self.assertIn('"budget": 0', logs.output[0])
+
+
+@override_settings(ROOT_URLCONF='blogApp.async_urls')
+class AsyncViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.category = CategoryFactory(slug='async')
+        for n in range(15):
+            entry = Entry.objects.create(
+                title=f'Async {n}', body=f'Async {n}', author=cls.user, category=cls.category,
+                featured=n % 4 == 0, pub_date=make_aware(datetime(2022, n % 12 + 1, 1))
+            )
+            entry.tags.add(f'tag-{n % 3}')
+        cls.entry = entry
+
+    def setUp(self) -> None:
+        get_cache().clear()
+
+    def get(self, url, **extra):
+        response = async_to_sync(self.async_client.get)(url, **extra)
+        self.assertEqual(response.resolver_match.func.view_class.__module__, 'blog.async_views')
+        return response
+
+    def urls(self):
+        return [
+            '/', '/?page=2', reverse('blog:category', kwargs={'slug': 'async'}),
+            self.entry.get_absolute_url(), reverse('blog:sitemap'),
+        ]
+
+    def test_same_pages_as_the_sync_views(self):
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.get(url)
+                get_cache().clear()
+                with override_settings(ROOT_URLCONF='blogApp.urls'):
+                    expected = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, expected.content)
+                self.assertEqual(response['ETag'], expected['ETag'])
+
+    def test_within_budget_and_cached(self):
+        for url in self.urls():
+            with self.subTest(url=url):
+                metrics = self.get(url).asgi_request.metrics
+                self.assertTrue(metrics.view.startswith('blog.async_views.'))
+                self.assertLessEqual(metrics.queries, metrics.budget)
+                with self.assertNumQueries(0):
+                    response = self.get(url, headers={'Accept-Encoding': 'gzip'})
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertEqual(self.get(url, headers={'If-None-Match': response['ETag']}).status_code, 304)
+
+    def test_unknown_pages(self):
+        with self.assertNoLogs('blog.instrumentation', 'WARNING'):
+            self.assertEqual(self.get(reverse('blog:category', kwargs={'slug': 'missing'})).status_code, 404)
+            self.assertEqual(self.get('/async/missing').status_code, 404)
+
+
+class ReplicaRouterTest(TestCase):
+    def setUp(self) -> None:
+        self.factory = RequestFactory()
+
+    def respond(self, url, method='get', model=Entry, cookies=None, write=None):
+        """ The response of the view of ``url``, which says where a read of ``model`` goes. """
+        request = getattr(self.factory, method)(url)
+        request.resolver_match = resolve(url)
+        request.COOKIES.update(cookies or {})
+
+        def get_response(request):
+            middleware.process_view(request, None, (), {})
+            if write is not None:
+                write()
+            return HttpResponse(routers.ReplicaRouter().db_for_read(model) or 'default')
+
+        with mock.patch.object(routers, 'enabled', return_value=True):
+            middleware = routers.ReplicaMiddleware(get_response)
+        return middleware(request)
+
+    def route(self, url, **kwargs):
+        """ Where a read of ``model`` in the view of ``url`` goes. """
+        return self.respond(url, **kwargs).content.decode()
+
+    def test_public_reads_go_to_the_replica(self):
+        self.assertEqual(self.route('/'), 'replica')
+        self.assertEqual(self.route(reverse('blog:sitemap_segment', args=[2021])), 'replica')
+        self.assertEqual(self.route(reverse('blog:feed')), 'replica')
+        self.assertEqual(self.route('/', model=User), 'default')
+        self.assertEqual(self.route('/', method='post'), 'default')
+        self.assertEqual(self.route('/admin/'), 'default')
+        # Nothing is routed outside the request.
+        self.assertIsNone(routers.ReplicaRouter().db_for_read(Entry))
+
+    @override_settings(DATABASE_ROUTERS=['blog.routers.ReplicaRouter'], BLOG_REPLICA_PIN=5)
+    def test_write_pins_the_writer_to_the_primary(self):
+        response = self.respond('/admin/', method='post', write=lambda: CategoryFactory(slug='pinned'))
+        cookie = response.cookies[routers.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 5)
+        self.assertEqual(self.route('/', cookies={routers.PIN_COOKIE: cookie.value}), 'default')
+        # Everybody else keeps reading from the replica.
+        self.assertEqual(self.route('/'), 'replica')
+
+    @override_settings(DATABASE_ROUTERS=['blog.routers.ReplicaRouter'])
+    def test_other_writes_pin_nobody(self):
+        # The job worker writes outside any request.
+        CategoryFactory(slug='worker')
+        self.assertEqual(self.route('/'), 'replica')
+        # A view filling its own tables doesn't pin its client either.
+        response = self.respond('/', write=lambda: HighlightedCode.objects.create(key='k', html='<pre></pre>'))
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_not_used_without_a_replica(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            routers.ReplicaMiddleware(lambda request: HttpResponse())
+
+
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        corpus.generate(60, workers=1, chunk_size=25)
+
+    def test_corpus_is_reproducible(self):
+        self.assertEqual(Entry.objects.count(), 60)
+        self.assertTrue(Entry.objects.exclude(body_html='').exists())
+        self.assertTrue(Entry.objects.filter(body_html__contains='class="codehilite"').exists())
+        self.assertTrue(ArchiveMonth.objects.exists())
+        self.assertTrue(SearchDocument.objects.exists())
+        titles = list(Entry.objects.order_by('pk').values_list('title', flat=True))
+        corpus.clear()
+        corpus.generate(60, workers=1)
+        self.assertEqual(list(Entry.objects.order_by('pk').values_list('title', flat=True)), titles)
+
+    def test_run_and_compare(self):
+        results = benchmark_runner.run(runs=2, sample=3)
+        self.assertIn('entry_save', results)
+        self.assertGreater(results['entry']['queries'], 0)
+        self.assertEqual(benchmark_runner.compare(results, results), [])
+        worse = {name: {**result, 'queries': result['queries'] + 1} for name, result in results.items()}
+        self.assertEqual(len(benchmark_runner.compare(worse, results)), len(results))
+        # The rolled back saves leave the corpus as it was.
+        self.assertFalse(Entry.objects.filter(body__contains='Editado').exists())
+
+    def test_hot_queries_use_the_indexes(self):
+        self.assertEqual(plans.check(), {})
+
+    def test_plan_problems(self):
+        self.assertEqual(plans.problems('SCAN blog_entry USING INDEX entry_live_date', 'sqlite'), [])
+        self.assertEqual(len(plans.problems('SCAN blog_entry\nUSE TEMP B-TREE FOR ORDER BY', 'sqlite')), 2)
+        postgres = 'Limit\n  ->  Sort  (cost=1.1..1.2)\n        ->  Seq Scan on blog_entry  (cost=0..1)'
+        self.assertEqual(len(plans.problems(postgres, 'postgresql')), 2)
+        self.assertEqual(plans.problems('Limit\n  ->  Index Scan using entry_live_date on blog_entry', 'postgresql'), [])
+
+    def test_unsupported_vendor(self):
+        self.assertFalse(plans.supported('mysql'))
+        with mock.patch.object(connection, 'vendor', 'mysql'), self.assertRaisesMessage(CommandError, 'mysql'):
+            call_command('benchmark', explain=True, stdout=StringIO())
+
+    def test_percentile(self):
+        samples = list(range(1, 101))
+        self.assertEqual(benchmark_runner.percentile(samples, 50), 50)
+        self.assertEqual(benchmark_runner.percentile(samples, 99), 99)
+        self.assertEqual(benchmark_runner.percentile([3], 90), 3)
+
+
+class JobQueueTest(TestCase):
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.user = UserFactory()
+        self.category = CategoryFactory(slug='queued')
+        self.entry = Entry.objects.create(
+            title='Queued Entry', body='_Before_', category=self.category, author=self.user
+        )
+        self.url = self.entry.get_absolute_url()
+        self.client.get(self.url)
+
+    def edit(self, body):
+        self.entry.body = body
+        self.entry.save(render=False)
+
+    def test_save_queues_the_render(self):
+        self.edit('_After_')
+        self.entry.refresh_from_db()
+        self.assertTrue(self.entry.rendering)
+        self.assertIn('<em>Before</em>', self.entry.body_html)
+        self.assertContains(self.client.get(self.url), '<em>Before</em>')
+
+        self.assertEqual(jobs.work(once=True), 1)
+        self.entry.refresh_from_db()
+        self.assertFalse(self.entry.rendering)
+        self.assertIn('<em>After</em>', self.entry.body_html)
+        self.assertContains(self.client.get(self.url), '<em>After</em>')
+        self.assertTrue(search.search('after'))
+        self.assertFalse(Job.objects.exists())
+
+    def render_after(self, **fields):
+        """ Patches ``Entry.render`` to update the row first, as a concurrent request would. """
+        render = Entry.render
+
+        def patched(entry, *args, **kwargs):
+            Entry.objects.filter(pk=entry.pk).update(**fields)
+            return render(entry, *args, **kwargs)
+        return mock.patch.object(Entry, 'render', patched)
+
+    def test_bumped_while_rendering(self):
+        # related.refresh_pages and the neighbour links only touch updated_at.
+        self.edit('_After_')
+        with self.render_after(updated_at=timezone.now()):
+            jobs.work(once=True)
+        self.entry.refresh_from_db()
+        self.assertFalse(self.entry.rendering)
+        self.assertIn('<em>After</em>', self.entry.body_html)
+        self.assertFalse(Job.objects.exists())
+
+    def test_edited_while_rendering(self):
+        self.edit('_After_')
+        with self.render_after(body='_Again_'):
+            self.assertEqual(jobs.work(once=True, limit=1), 1)
+        self.assertTrue(Entry.objects.get(pk=self.entry.pk).rendering)
+        self.assertEqual(Job.objects.get().status, Job.PENDING)
+        jobs.work(once=True)
+        self.entry.refresh_from_db()
+        self.assertFalse(self.entry.rendering)
+        self.assertIn('<em>Again</em>', self.entry.body_html)
+
+    def test_repeated_saves_are_one_job(self):
+        self.edit('_One_')
+        self.entry.tags.add('queued')
+        self.edit('_Two_')
+        job = Job.objects.get()
+        self.assertEqual(job.payload['pk'], self.entry.pk)
+        self.assertIn(self.url, job.payload['urls'])
+        jobs.work(once=True)
+        self.entry.refresh_from_db()
+        self.assertIn('<em>Two</em>', self.entry.body_html)
+
+    def test_unchanged_source_is_not_queued(self):
+        self.entry.title = 'Renamed Entry'
+        self.entry.save(render=False)
+        self.assertFalse(self.entry.rendering)
+        self.assertFalse(Job.objects.exists())
+        self.assertContains(self.client.get(self.url), 'Renamed Entry')
+
+    def test_failed_jobs_are_retried(self):
+        self.edit('_Retried_')
+        with mock.patch.dict(jobs.HANDLERS, publish_entry=mock.Mock(side_effect=RuntimeError('down'))), \
+                self.assertLogs('blog.jobs', 'ERROR'):
+            self.assertEqual(jobs.work(once=True), 1)
+            job = Job.objects.get()
+            self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+            self.assertGreater(job.run_after, timezone.now())
+            self.assertIn('RuntimeError', job.last_error)
+            for _ in range(jobs.MAX_ATTEMPTS - 1):
+                Job.objects.update(run_after=timezone.now())
+                jobs.work(once=True)
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+        out = StringIO()
+        call_command('run_jobs', once=True, retry_failed=True, stdout=out)
+        self.assertIn('1 jobs run', out.getvalue())
+        self.entry.refresh_from_db()
+        self.assertIn('<em>Retried</em>', self.entry.body_html)
+
+    @override_settings(BLOG_RENDER_QUEUE=True)
+    def test_admin_save_returns_before_rendering(self):
+        request = RequestFactory().post('/admin')
+        request.user = self.user
+        self.entry.body = '_Admin_'
+        EntryAdmin(Entry, AdminSite()).save_model(request, self.entry, None, True)
+        self.assertTrue(Entry.objects.get(pk=self.entry.pk).rendering)
+        self.assertEqual(Job.objects.get().kind, 'publish_entry')
+
+
+class ImportMarkdownTest(TestCase):
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.user = UserFactory()
+        self.category = CategoryFactory(name='Python', slug='python')
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.write('2020/first.md', (
+            '---\ntitle: "First Import"\ndate: 2020-05-01 10:30\ncategory: Python\n'
+            'tags: [Django, sql]\n---\n_Imported_ body\n'
+        ))
+        self.write('2021/nested/second.md', (
+            'Title: Second Import\nDate: 2021-02-03\nCategory: Bases de datos\n'
+            'Tags: django,\n    postgres\nStatus: draft\n\nSecond body\n'
+        ))
+        self.write('broken.md', '---\ntitle: Broken\n')
+
+    def write(self, name, text):
+        path = Path(self.root.name, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding='utf-8')
+
+    def run_import(self):
+        out, err = StringIO(), StringIO()
+        call_command(
+            'import_markdown', self.root.name, author=self.user.email, workers=1, chunk_size=1, stdout=out, stderr=err
+        )
+        return out.getvalue(), err.getvalue()
+
+    def test_front_matter(self):
+        meta, body = importer.front_matter('Title: A\nTags: a,\n    b\n\nBody: not meta\n')
+        self.assertEqual(meta, {'title': ['A'], 'tags': ['a,', 'b']})
+        self.assertEqual(body, 'Body: not meta\n')
+        self.assertEqual(importer.front_matter('Just text\n\nMore'), ({}, 'Just text\n\nMore'))
+        with self.assertRaises(ValueError):
+            importer.front_matter('---\ntitle: A\n')
+
+    def test_imports_the_tree(self):
+        out, err = self.run_import()
+        self.assertIn('broken.md', err)
+        self.assertIn('2 entries imported, 0 already there, 1 failed', out)
+        self.assertIn('rows/s', out)
+
+        first = Entry.objects.get(slug='first-import')
+        self.assertEqual(first.category, self.category)
+        self.assertEqual(first.author, self.user)
+        self.assertIn('<em>Imported</em>', first.body_html)
+        self.assertEqual(first.pub_date, make_aware(datetime(2020, 5, 1, 10, 30), pytz.timezone('Mexico/General')))
+        self.assertEqual(sorted(first.tags.names()), ['Django', 'sql'])
+        second = Entry.objects.get(slug='second-import')
+        self.assertEqual((second.category.slug, second.status), ('bases-de-datos', Entry.DRAFT_STATUS))
+        # Tags are case insensitive: the second file reuses ``Django``.
+        self.assertEqual(sorted(second.tags.names()), ['Django', 'postgres'])
+        self.assertTrue(ArchiveMonth.objects.filter(year=2020, month=5).exists())
+        self.assertEqual(search.search('imported'), [first])
+        self.assertContains(self.client.get(first.get_absolute_url()), '<em>Imported</em>')
+
+    def test_import_resumes(self):
+        self.run_import()
+        self.write('2022/third.md', '---\ntitle: Third Import\ndate: 2022-01-01\ncategory: Python\n---\nThird\n')
+        out, _ = self.run_import()
+        self.assertIn('1 entries imported, 2 already there', out)
+        self.assertEqual(Entry.objects.count(), 3)
+
+
+class TagStatsTest(TestCase):
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.user = UserFactory()
+        self.category = CategoryFactory(slug='tagged')
+        self.entries = [
+            Entry.objects.create(
+                title=f'Tagged {n}', body=f'Tagged {n}', author=self.user, category=self.category,
+                pub_date=make_aware(datetime(2022, n + 1, 1))
+            )
+            for n in range(3)
+        ]
+        for entry in self.entries:
+            entry.tags.add('python')
+        self.entries[2].tags.add('django')
+
+    def stats(self):
+        return {stat.tag.name: (stat.count, stat.latest) for stat in TagStat.objects.select_related('tag')}
+
+    def test_counts_follow_the_entries(self):
+        newest = self.entries[2].pub_date
+        self.assertEqual(self.stats(), {'python': (3, newest), 'django': (1, newest)})
+        self.entries[2].status = Entry.DRAFT_STATUS
+        self.entries[2].save()
+        self.assertEqual(self.stats(), {'python': (2, self.entries[1].pub_date)})
+        self.entries[0].tags.remove('python')
+        self.entries[1].tags.clear()
+        self.assertEqual(self.stats(), {})
+        self.entries[1].tags.add('python')
+        self.entries[1].delete()
+        self.assertEqual(self.stats(), {})
+        TagStat.objects.create(tag=Tag.objects.get(name='django'), count=9, latest=newest)
+        self.assertEqual(tagstats.rebuild(), 0)
+        self.assertFalse(TagStat.objects.exists())
+
+    def test_cloud(self):
+        cloud = tagstats.cloud()
+        self.assertEqual(
+            [(stat.tag.name, stat.weight) for stat in cloud], [('django', 1), ('python', tagstats.WEIGHTS)]
+        )
+        response = self.client.get(reverse('blog:tag_list'))
+        self.assertContains(response, reverse('blog:tag', args=['python']))
+
+    def test_tag_changes_revalidate_the_lists(self):
+        urls = ['/', reverse('blog:category', kwargs={'slug': 'tagged'}), self.entries[0].get_absolute_url()]
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        self.entries[0].tags.add('celery')
+        for url, etag in etags.items():
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200, url)
+        self.assertContains(self.client.get(urls[1]), reverse('blog:tag', args=['celery']))
+
+    def test_tag_page(self):
+        url = reverse('blog:tag', args=['django'])
+        response = self.client.get(url)
+        self.assertContains(response, 'Tagged 2')
+        self.assertNotContains(response, 'Tagged 1')
+        self.entries[1].tags.add('django')
+        self.assertContains(self.client.get(url), 'Tagged 1')
+        self.assertEqual(self.client.get(reverse('blog:tag', args=['missing'])).status_code, 404)
+
+    def test_lists_prefetch_tags(self):
+        with self.assertNumQueries(2):
+            entries = list(cards(Entry.objects.order_by('pk'), tags=True))
+        self.assertEqual(
+            [[tag.name for tag in entry.tags] for entry in entries], [['python'], ['python'], ['django', 'python']]
+        )
+        self.assertContains(self.client.get(self.category.get_absolute_url()), reverse('blog:tag', args=['django']))
+
+
 class EntryAdminTest(TestCase):
     def setUp(self):
         super().__init__()
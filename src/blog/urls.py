@@ -8,27 +8,37 @@
 #     licence: MIT
 #      python: 3.10
 
-from django.contrib.sitemaps.views import sitemap
 from django.urls import path, include
 from django.views.generic.base import TemplateView
 
 from . import views
-from .sitemaps import BlogSitemap
+from .feeds import AtomEntriesFeed, EntriesFeed
+from .instrumentation import query_budget
+from .sitemaps import SitemapIndex, SitemapSegment
+from .validators import conditional, feed_state
 
 
-sitemaps = {
-    'blog': BlogSitemap,
-}
-
 urlpatterns = [
-    path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
+    path('sitemap.xml', SitemapIndex.as_view(), name='django.contrib.sitemaps.views.sitemap'),
+    path('sitemap-<int:year>.xml', SitemapSegment.as_view(), name='sitemap_segment'),
     path('ads.txt', TemplateView.as_view(template_name='blog/ads.txt', content_type='text/plain')),
     path('robots.txt', TemplateView.as_view(template_name='blog/robots.txt', content_type="text/plain")),
+    path('rss.xml', query_budget(3)(conditional(feed_state)(EntriesFeed())), name='feed'),
+    path('atom.xml', query_budget(3)(conditional(feed_state)(AtomEntriesFeed())), name='feed_atom'),
+    path('category/<str:slug>/rss.xml', query_budget(4)(conditional(feed_state)(EntriesFeed())),
+         name='category_feed'),
+    path('category/<str:slug>/atom.xml', query_budget(4)(conditional(feed_state)(AtomEntriesFeed())),
+         name='category_feed_atom'),
     path('category/', views.CategoryList.as_view(), name='category_list'),
     path('category/<str:slug>', views.CategoryDetail.as_view(), name='category'),
+    path('tag/', views.TagList.as_view(), name='tag_list'),
+    # Before the entries, it would match their pattern.
+    path('tag/<str:slug>', views.TagDetail.as_view(), name='tag'),
     path('<str:category>/<str:slug>', views.EntryDetail.as_view(), name='entry'),
     path('pages/', include('django.contrib.flatpages.urls')),
     path('archivo.html', views.Archivo.as_view(), name='sitemap'),
+    path('archivo/<int:year>/<int:month>/', views.ArchivoMonth.as_view(), name='archive_month'),
+    path('buscar/', views.Buscar.as_view(), name='search'),
     path('cv/', views.CVView.as_view(), name='cv'),
     path('', views.BlogIndex.as_view(), name='index'),
 ]
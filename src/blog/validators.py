@@ -0,0 +1,208 @@
+# coding: utf-8
+
+#         app: org.toledano.blog
+#      module: blog.validators
+# description: ETag and Last-Modified validators for conditional GET
+#      author: Javier Sanchez Toledano
+#        date: 2026-10-18
+#     licence: MIT
+#      python: 3.10
+import hashlib
+from calendar import timegm
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db.models import Count, Max, Q
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+
+from .archive import month_range
+from .cache import archive_tag, category_tag, entry_tag, feed_tag, generations, lookup, sitemap_tag, store, tag_tag
+from .compression import weaken_etag
+from .models import Category, Entry, RelatedEntry
+
+VALIDATORS_PREFIX = 'blog:validators:'
+
+# A validator function receives the same arguments as the view and returns a
+# tuple of ``(timestamp, count)`` pairs read with aggregate queries only. The
+# latest timestamp is the Last-Modified and a hash of the whole state is the
+# ETag, the counts catch deletions that leave the maxima unchanged. Every
+# view that shows the category menu depends on the category list. The result
+# is cached like the pages, under the tags given to ``depends_on()``.
+
+
+def depends_on(tags):
+    """ ``tags`` is a tuple or a function of the view arguments. """
+    def decorator(state):
+        state.tags = tags
+        return state
+    return decorator
+
+
+def _aggregate(queryset) -> tuple:
+    values = queryset.aggregate(latest=Max('updated_at'), total=Count('id'))
+    return values['latest'], values['total']
+
+
+def categories_state() -> tuple:
+    return _aggregate(Category.objects.all()),
+
+
+@depends_on(('entries', 'categories'))
+def entries_state(*args, **kwargs) -> tuple:
+    """ Every entry, for the index, the archive and the sitemap. """
+    return _aggregate(Entry.objects.all()), *categories_state()
+
+
+@depends_on(lambda slug, **kwargs: (category_tag(slug), 'featured', 'categories'))
+def category_state(slug, *args, **kwargs) -> tuple:
+    entries = Entry.objects.aggregate(
+        latest=Max('updated_at', filter=Q(category__slug=slug)),
+        total=Count('id', filter=Q(category__slug=slug, status=Entry.LIVE_STATUS)),
+        featured_latest=Max('updated_at', filter=Q(featured=True)),
+        featured_total=Count('id', filter=Q(featured=True, status=Entry.LIVE_STATUS)),
+    )
+    return (
+        (entries['latest'], entries['total']),
+        (entries['featured_latest'], entries['featured_total']),
+        *categories_state(),
+    )
+
+
+@depends_on(lambda year, **kwargs: (sitemap_tag(year), 'categories'))
+def sitemap_state(year, *args, **kwargs) -> tuple:
+    """ The LIVE entries of a sitemap segment, ``None`` for a year without any. """
+    entries = _aggregate(Entry.objects.filter(status=Entry.LIVE_STATUS, pub_date__year=year))
+    if not entries[1]:
+        return None
+    return entries, *categories_state()
+
+
+@depends_on(lambda year, month, **kwargs: (archive_tag(year, month), 'categories'))
+def archive_state(year, month, *args, **kwargs) -> tuple:
+    """ The LIVE entries of an archive month. """
+    if not 1 <= month <= 12:
+        return None
+    start, end = month_range(year, month)
+    entries = Entry.objects.filter(status=Entry.LIVE_STATUS, pub_date__gte=start, pub_date__lt=end)
+    return _aggregate(entries), *categories_state()
+
+
+@depends_on(lambda slug, **kwargs: (tag_tag(slug), 'categories'))
+def tag_state(slug, *args, **kwargs) -> tuple:
+    """ The LIVE entries with a tag. """
+    entries = Entry.objects.filter(status=Entry.LIVE_STATUS, tags__slug=slug)
+    return _aggregate(entries), *categories_state()
+
+
+@depends_on(lambda category, slug, **kwargs: (entry_tag(category, slug), 'categories'))
+def entry_state(category, slug, *args, **kwargs) -> tuple:
+    """ The entry, its category, its neighbours and related entries, whose titles it shows. """
+    row = Entry.objects\
+        .filter(category__slug=category, slug=slug)\
+        .values_list(
+            'pk', 'updated_at', 'category__updated_at',
+            'previous_entry__updated_at', 'next_entry__updated_at'
+        )\
+        .first()
+    if row is None:
+        return None
+    pk, *dates = row
+    related = RelatedEntry.objects.filter(entry=pk).aggregate(latest=Max('related__updated_at'), total=Count('id'))
+    return (
+        tuple((date, pk) for date in dates if date is not None)
+        + ((related['latest'], related['total']),)
+        + categories_state()
+    )
+
+
+@depends_on(lambda slug=None, **kwargs: (feed_tag(slug),))
+def feed_state(slug=None, *args, **kwargs) -> tuple:
+    """ The LIVE entries of a feed, the whole site or a category. """
+    entries = Entry.objects.filter(status=Entry.LIVE_STATUS)
+    if slug is not None:
+        entries = entries.filter(category__slug=slug)
+    return _aggregate(entries),
+
+
+def _compute(state, *args, **kwargs):
+    values = state(*args, **kwargs)
+    if values is None:
+        return None, None
+    dates = [date for date, _ in values if date is not None]
+    return hashlib.md5(repr(values).encode('utf-8')).hexdigest(), max(dates, default=None)
+
+
+def missing(request) -> bool:
+    """ Whether the state of the view said there is nothing to show. """
+    return getattr(request, '_blog_validators', None) == (None, None)
+
+
+def _validators(request, state, *args, **kwargs):
+    # condition() asks for the ETag and the date separately, compute once.
+    if not hasattr(request, '_blog_validators'):
+        tags = state.tags
+        if callable(tags):
+            tags = tags(*args, **kwargs)
+        key = VALIDATORS_PREFIX + hashlib.md5(repr((state.__name__, args, kwargs)).encode('utf-8')).hexdigest()
+        current = generations(tags)
+        validators = lookup(key, current)
+        if validators is None:
+            validators = _compute(state, *args, **kwargs)
+            store(key, current, validators)
+        request._blog_validators = validators
+    return request._blog_validators
+
+
+def conditional(state):
+    """
+    ``condition()`` for a view whose state is computed by ``state``: returns
+    304 Not Modified before the view runs when the client copy is current.
+    While the cached validators are current a revalidation runs no queries.
+    Async views get the same checks, with the validators read through
+    ``sync_to_async``.
+    """
+    def etag(request, *args, **kwargs):
+        return _validators(request, state, *args, **kwargs)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return _validators(request, state, *args, **kwargs)[1]
+
+    validated = condition(etag_func=etag, last_modified_func=last_modified)
+
+    def decorator(func):
+        if iscoroutinefunction(func):
+            return _async_conditional(state, func)
+
+        conditional_func = validated(func)
+
+        @wraps(func)
+        def inner(request, *args, **kwargs):
+            response = conditional_func(request, *args, **kwargs)
+            # Cached pages may come back precompressed, see blog.compression.
+            weaken_etag(response)
+            return response
+        return inner
+    return decorator
+
+
+def _async_conditional(state, func):
+    # What condition() does for GET and HEAD, the only methods of these views.
+    @wraps(func)
+    async def inner(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await func(request, *args, **kwargs)
+        etag, modified = await sync_to_async(_validators)(request, state, *args, **kwargs)
+        etag = quote_etag(etag) if etag is not None else None
+        modified = timegm(modified.utctimetuple()) if modified is not None else None
+        response = get_conditional_response(request, etag=etag, last_modified=modified)
+        if response is None:
+            response = await func(request, *args, **kwargs)
+        if modified and not response.has_header('Last-Modified'):
+            response['Last-Modified'] = http_date(modified)
+        if etag:
+            response.headers.setdefault('ETag', etag)
+        weaken_etag(response)
+        return response
+    return inner
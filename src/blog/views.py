@@ -7,65 +7,169 @@
 #     licence: MIT
 #      python: 3.10
 
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404, render
+from django.utils.decorators import method_decorator
 from django.views.generic import ListView, DetailView, TemplateView
 from django.db.models import Model
 
-from . import models
+from . import archive, homepage, models, related, search, tagstats
+from .cache import CachedResponseMixin, category_tag, entry_tag, tag_tag
+from .cards import cards
+from .instrumentation import query_budget
+from .pagination import KeysetPaginationMixin
+from .validators import archive_state, category_state, conditional, entries_state, entry_state, tag_state
 
 
 class CVView(TemplateView):
     template_name = 'resume.html'
 
 
-class BlogIndex(ListView):
-    queryset = models.Entry.objects.exclude(featured=True)[4:]
+@query_budget(8)
+@method_decorator(conditional(entries_state), name='dispatch')
+class BlogIndex(CachedResponseMixin, KeysetPaginationMixin, ListView):
     template_name = 'index.html'
     context_object_name = 'entries'
     model = models.Entry
-    paginate_by = 6
+    paginate_by = homepage.PAGE_SIZE
+    paginate_offset = homepage.PRIMEROS
+    cache_tags = ('entries', 'categories')
+    cache_params = ('page', 'after', 'before')
+
+    def get_paginate_cache_key(self):
+        return 'blog:pages:index'
+
+    def get_paginate_cache_tags(self):
+        return 'entries',
+
+    def get_queryset(self):
+        self.homepage = homepage.build()
+        return homepage.list_queryset()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['sticky'] = models.Entry.objects.filter(featured=True)[0]
-        context['primeros'] = models.Entry.objects.filter(featured=False)[:4]
-        context['featured'] = models.Entry.objects.filter(featured=True)[1:6]
+        context['sticky'] = self.homepage['sticky']
+        context['primeros'] = self.homepage['primeros']
+        context['featured'] = self.homepage['featured']
         return context
 
 
-class CategoryList(ListView):
+@query_budget(1)
+class CategoryList(CachedResponseMixin, ListView):
     model = models.Category
     template_name = 'blog/category_list.html'
     context_object_name = 'categories'
     paginate_by = 6
+    cache_tags = ('categories',)
+    cache_params = ('page',)
 
 
-class CategoryDetail(ListView):
+@query_budget(8)
+@method_decorator(conditional(category_state), name='dispatch')
+class CategoryDetail(CachedResponseMixin, KeysetPaginationMixin, ListView):
     model: Model = models.Entry
     template_name: str = 'category.html'
     context_object_name: str = 'entries'
     paginate_by: int = 6
     allow_empty: bool = True
     slug_field: str = 'slug'
+    cache_params = ('page', 'after', 'before')
+
+    def get_cache_tags(self):
+        return category_tag(self.kwargs['slug']), 'featured', 'categories'
+
+    def get_paginate_cache_key(self):
+        return f"blog:pages:{category_tag(self.kwargs['slug'])}"
+
+    def get_paginate_cache_tags(self):
+        return category_tag(self.kwargs['slug']),
 
     def get_queryset(self):
-        return models.Entry.objects\
-            .filter(category__slug=self.kwargs['slug'], status=models.Entry.LIVE_STATUS)\
-            .select_related('category')\
-            .order_by('-pub_date', '-id')
+        return cards(models.Entry.objects
+                     .filter(category__slug=self.kwargs['slug'], status=models.Entry.LIVE_STATUS)
+                     .order_by('-pub_date', '-id'), tags=True)
+
+    def get(self, request, *args, **kwargs):
+        # A missing category is a 404 before any list query.
+        self.category = get_object_or_404(models.Category, slug=self.kwargs['slug'])
+        return super().get(request, *args, **kwargs)
+
+    def get_featured(self):
+        return cards(models.Entry.objects
+                     .filter(featured=True, status=models.Entry.LIVE_STATUS)
+                     .order_by('-pub_date', '-id'))[:homepage.FEATURED]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['featured'] = models.Entry.objects.filter(featured=True)[:5]
-        context['category'] = models.Category.objects.get(slug=self.kwargs['slug'])
+        context['featured'] = self.get_featured()
+        context['category'] = self.category
         return context
 
 
-class EntryDetail(DetailView):
+@query_budget(3)
+class TagList(CachedResponseMixin, TemplateView):
+    template_name = 'tag_list.html'
+    cache_tags = ('tags', 'categories')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['cloud'] = tagstats.cloud()
+        return context
+
+
+@query_budget(7)
+@method_decorator(conditional(tag_state), name='dispatch')
+class TagDetail(CachedResponseMixin, KeysetPaginationMixin, ListView):
+    template_name = 'tag.html'
+    context_object_name = 'entries'
+    paginate_by = 6
+    cache_params = ('page', 'after', 'before')
+
+    def get_cache_tags(self):
+        return tag_tag(self.kwargs['slug']), 'categories'
+
+    def get_paginate_cache_key(self):
+        return f"blog:pages:{tag_tag(self.kwargs['slug'])}"
+
+    def get_paginate_cache_tags(self):
+        return tag_tag(self.kwargs['slug']),
+
+    def get(self, request, *args, **kwargs):
+        # Tags without LIVE entries have no stat and no page.
+        self.stat = get_object_or_404(models.TagStat.objects.select_related('tag'), tag__slug=self.kwargs['slug'])
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return cards(models.Entry.objects
+                     .filter(tags__slug=self.kwargs['slug'], status=models.Entry.LIVE_STATUS)
+                     .order_by('-pub_date', '-id'), tags=True)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['stat'] = self.stat
+        return context
+
+
+@query_budget(7)
+@method_decorator(conditional(entry_state), name='dispatch')
+class EntryDetail(CachedResponseMixin, DetailView):
     model = models.Entry
     template_name = 'post.html'
     context_object_name = 'entry'
 
+    def get_cache_tags(self):
+        return entry_tag(self.kwargs['category'], self.kwargs['slug']), 'categories'
+
+    def get_queryset(self):
+        return models.Entry.objects\
+            .filter(category__slug=self.kwargs['category'])\
+            .select_related('category', 'previous_entry__category', 'next_entry__category')\
+            .prefetch_related('tags')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['related'] = related.for_entry(self.object)
+        return context
+
 
 def error404(request, exception):
     response = render(request, "404.html")
@@ -79,13 +183,41 @@ def error500(request):
     return response
 
 
-class Archivo(TemplateView):
+@query_budget(5)
+@method_decorator(conditional(entries_state), name='dispatch')
+class Archivo(CachedResponseMixin, TemplateView):
     template_name = 'archivo.html'
+    cache_tags = ('entries', 'categories')
 
     def get_context_data(self, **kwargs):
         ctx = super(Archivo, self).get_context_data(**kwargs)
         ctx['cats'] = models.Category.objects.all()
-        ctx['entries'] = models.Entry.objects\
-            .order_by('-pub_date', '-id')\
-            .filter(status=models.Entry.LIVE_STATUS)
+        ctx['years'] = archive.years()
+        return ctx
+
+
+@query_budget(6)
+class Buscar(TemplateView):
+    # The page echoes the query as typed, so only the results are cached,
+    # by the terms of the query, see ``search.cached_search()``.
+    template_name = 'buscar.html'
+
+    def get_context_data(self, **kwargs):
+        ctx = super(Buscar, self).get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()[:200]
+        ctx['query'] = query
+        ctx['entries'] = search.cached_search(query) if query else []
+        return ctx
+
+
+@query_budget(5)
+@method_decorator(conditional(archive_state), name='dispatch')
+class ArchivoMonth(TemplateView):
+    template_name = 'archivo_month.html'
+
+    def get_context_data(self, **kwargs):
+        ctx = super(ArchivoMonth, self).get_context_data(**kwargs)
+        year, month = self.kwargs['year'], self.kwargs['month']
+        ctx['month'] = get_object_or_404(models.ArchiveMonth, year=year, month=month)
+        ctx['fragment'] = archive.fragment(year, month)
         return ctx
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogApp.settings')
+# Serve the async views of the blog, see blogApp/async_urls.py.
+os.environ.setdefault('BLOG_ASYNC_VIEWS', 'true')
 
 application = get_asgi_application()
@@ -0,0 +1,13 @@
+"""
+The site URLs with the async views of the blog, the ``ROOT_URLCONF`` when
+``BLOG_ASYNC_VIEWS`` is set, as it is under ASGI. See ``blogApp/asgi.py``.
+"""
+from django.urls import include, path
+
+from .urls import handler404, handler500, urlpatterns as sync_urlpatterns  # noqa: F401
+
+urlpatterns = [
+    path('', include(('blog.async_urls', 'blog'), namespace='blog'))
+    if getattr(pattern, 'namespace', None) == 'blog' else pattern
+    for pattern in sync_urlpatterns
+]
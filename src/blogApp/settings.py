@@ -34,6 +34,8 @@ LOCAL_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    'blog.instrumentation.InstrumentationMiddleware',
+    'blog.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -44,7 +46,9 @@ MIDDLEWARE = [
     'django.contrib.flatpages.middleware.FlatpageFallbackMiddleware',
 ]
 
-ROOT_URLCONF = 'blogApp.urls'
+# The ASGI entry point serves the async versions of the busiest views.
+BLOG_ASYNC_VIEWS = env.bool('BLOG_ASYNC_VIEWS', default=False)
+ROOT_URLCONF = 'blogApp.async_urls' if BLOG_ASYNC_VIEWS else 'blogApp.urls'
 
 TEMPLATES = [
     {
@@ -66,9 +70,42 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'blogApp.wsgi.application'
 
+# Persistent connections, checked before each request reuses them. Under
+# ASGI every request runs on a new thread and can't reuse them, blog-asgi.service
+# sets DATABASE_CONN_MAX_AGE=0, put PgBouncer in front to pool them there.
+DATABASE_CONN_MAX_AGE = env.int('DATABASE_CONN_MAX_AGE', default=60)
 DATABASES = {
-    'default': env.db(),
+    'default': {**env.db(), 'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE, 'CONN_HEALTH_CHECKS': True},
 }
+# The public views and the sitemaps read from DATABASE_REPLICA_URL when it
+# is set, see blog.routers. Two SQLite files work locally, copy the primary
+# to the replica after migrating it.
+if env('DATABASE_REPLICA_URL', default=None):
+    DATABASES['replica'] = {
+        **env.db('DATABASE_REPLICA_URL'), 'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE, 'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['blog.routers.ReplicaRouter']
+# Seconds the reads of a client that wrote content go to the primary, for the replica to catch up.
+BLOG_REPLICA_PIN = env.int('BLOG_REPLICA_PIN', default=5)
+
+# Cache
+# Use a shared backend (memcached, redis, database) in production so every
+# gunicorn worker sees the same pages and invalidations.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+BLOG_CACHE_ALIAS = env('BLOG_CACHE_ALIAS', default='default')
+BLOG_CACHE_TIMEOUT = env.int('BLOG_CACHE_TIMEOUT', default=60 * 60 * 24)
+# Admin saves leave the Markdown render, the cache invalidation and the
+# export to `manage.py run_jobs`, see blog.jobs. Run the worker when set.
+BLOG_RENDER_QUEUE = env.bool('BLOG_RENDER_QUEUE', default=False)
+# Highlighted code blocks kept in memory by each process, see blog.highlight.
+BLOG_HIGHLIGHT_CACHE_SIZE = env.int('BLOG_HIGHLIGHT_CACHE_SIZE', default=2048)
+# Cached pages and exported files are compressed once, when they are stored,
+# so the highest levels cost nothing per request, see blog.compression.
+BLOG_GZIP_LEVEL = env.int('BLOG_GZIP_LEVEL', default=9)
+BLOG_BROTLI_QUALITY = env.int('BLOG_BROTLI_QUALITY', default=11)
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -105,3 +142,29 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # https://django-taggit.readthedocs.io/en/latest/index.html
 TAGGIT_CASE_INSENSITIVE = True
 TAGGIT_STRIP_UNICODE_WHEN_SLUGIFYING = True
+
+# Static export
+# Public pages written here are served by nginx without reaching Django,
+# see conf/blog_nginx.conf. The export is disabled when unset. Changes
+# touching more than a few pages are exported by `manage.py run_jobs`.
+STATIC_EXPORT_ROOT = env('STATIC_EXPORT_ROOT', default=None)
+STATIC_EXPORT_HOST = env('STATIC_EXPORT_HOST', default='toledano.org')
+
+# Instrumentation
+# SQL, template and cache metrics of every request, see
+# blog.instrumentation. Server-Timing exposes them to the browser.
+BLOG_SERVER_TIMING = env.bool('BLOG_SERVER_TIMING', default=DEBUG)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'blog.instrumentation': {
+            'handlers': ['console'],
+            'level': env('BLOG_INSTRUMENTATION_LOG_LEVEL', default='WARNING'),
+            'propagate': False,
+        },
+    },
+}